@@ -0,0 +1,34 @@
+import importlib
+
+# Public names and the modules they come from. They are imported on first
+# use, so that `python -m alys.client` starts without asyncio, the lexer
+# and the span engine.
+exports = {
+    "iter_html_async": "alys.async_render",
+    "render_async": "alys.async_render",
+    "render": "alys.pipeline",
+    "Renderer": "alys.pipeline",
+    "render_section": "alys.pipeline",
+    "render_to": "alys.pipeline",
+    "Limits": "alys.limits",
+    "SpanCache": "alys.span_cache",
+    "Stats": "alys.stats",
+    "dump_tokens": "alys.token_io",
+    "load_tokens": "alys.token_io",
+}
+
+__all__ = list(exports)
+
+
+def __getattr__(name: str):
+    module = exports.get(name)
+    if module is None:
+        raise AttributeError(f"module 'alys' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(exports))
+
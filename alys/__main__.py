@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+
+from alys import build, server
+from alys.span_transformer import engines
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value}")
+    return number
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m alys", description="markdown to html")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="convert a directory tree of markdown files")
+    build_parser.add_argument("src_dir", help="directory searched for .md and .markdown files")
+    build_parser.add_argument("out_dir", help="directory the .html files are written to")
+    build_parser.add_argument(
+        "-j", "--jobs", type=positive_int, default=os.cpu_count() or 1, help="worker processes (default: all cores)"
+    )
+    build_parser.add_argument("--engine", choices=engines, default="regex", help="span engine")
+    build_parser.set_defaults(run=build.main)
+
+    serve_parser = commands.add_parser(
+        "serve", help="render documents sent over a unix socket, see `python -m alys.client`"
+    )
+    serve_parser.add_argument("--socket", required=True, help="path of the unix socket to listen on")
+    serve_parser.add_argument("--engine", choices=engines, default="regex", help="span engine")
+    serve_parser.add_argument(
+        "--untrusted", action="store_true", help="render within the limits for untrusted input, see alys.limits"
+    )
+    serve_parser.set_defaults(run=server.main)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import asyncio
+from collections.abc import AsyncIterable, AsyncIterator
+from concurrent.futures import Executor
+
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer, span_tags
+from alys.token import Token
+
+# Lines lexed between two returns to the event loop.
+default_yield_every = 64
+# Blocks at least this long have their spans transformed in the executor.
+default_executor_chars = 16 * 1024
+
+
+def transform_content(content: str, engine: str) -> str:
+    # Runs in the executor, so it only takes and returns plain values and
+    # works with process pools as well as thread pools.
+    return SpanTransformer(Lexer(), engine=engine).span_html(content)
+
+
+def decode_line(line: bytes) -> str:
+    line = str(line, "utf-8")
+    if line.endswith("\r\n"):
+        return line[:-2] + "\n"
+    return line
+
+
+async def iter_html_async(
+    stream: AsyncIterable[str | bytes],
+    engine: str = "regex",
+    yield_every: int = default_yield_every,
+    executor: Executor | None = None,
+    executor_chars: int = default_executor_chars,
+) -> AsyncIterator[str]:
+    # Renders the lines of an asyncio.StreamReader or any async iterator of
+    # str or bytes lines block by block, like BlockTransformer.iter_html.
+    if yield_every < 1:
+        raise ValueError(f"expected a positive number of lines, got {yield_every}")
+    lexer = Lexer()
+    spans = SpanTransformer(lexer, engine=engine)
+    blocks = BlockTransformer(lexer)
+    loop = asyncio.get_running_loop()
+
+    async def render_token(token: Token) -> str | None:
+        if token.tag in span_tags:
+            if executor is not None and len(token.content) >= executor_chars:
+                token.content = token.html = await loop.run_in_executor(
+                    executor, transform_content, token.content, engine
+                )
+            else:
+                spans.transform_spans(token)
+        return blocks.render_next(token)
+
+    lines = 0
+    async for line in stream:
+        if isinstance(line, bytes):
+            line = decode_line(line)
+        lexer.lex(line)
+        if len(lexer.tokens) > 1:
+            for token in lexer.drain():
+                html = await render_token(token)
+                if html is not None:
+                    yield html
+        lines += 1
+        if lines == yield_every:
+            lines = 0
+            await asyncio.sleep(0)
+
+    for token in lexer.drain_all():
+        html = await render_token(token)
+        if html is not None:
+            yield html
+    html = blocks.close_nesting()
+    if html is not None:
+        yield html
+
+
+async def render_async(
+    stream: AsyncIterable[str | bytes],
+    engine: str = "regex",
+    yield_every: int = default_yield_every,
+    executor: Executor | None = None,
+    executor_chars: int = default_executor_chars,
+) -> str:
+    blocks = iter_html_async(stream, engine, yield_every, executor, executor_chars)
+    return "\n".join([html async for html in blocks])
@@ -1,62 +1,307 @@
+from collections.abc import Callable, Iterable, Iterator
+from html import escape
+import io
+
 from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer
 from alys.token import Tag, Token
 
+Renderer = Callable[[Token], str | None]
+
+# Characters rendered before they are written out, see render_to.
+default_buffer_size = 64 * 1024
+
+heading_tags = {
+    tag: (f"<h{level}>", f"</h{level}>")
+    for level, tag in enumerate([Tag.H1, Tag.H2, Tag.H3, Tag.H4, Tag.H5, Tag.H6], start=1)
+}
+
 
 class BlockTransformer:
-    def __init__(self, lexer: Lexer):
+    def __init__(self, lexer: Lexer, escape: bool = True, spans: SpanTransformer | None = None):
         self.lexer = lexer
         self.tokens = lexer.tokens
         self.html = []
-    
+        self.escape = escape
+        # With a SpanTransformer, the spans of a token are rendered when its
+        # block is, instead of by SpanTransformer.iter_spans, see text.
+        self.spans = spans
+        # Blockquotes open around the tokens rendered so far, and whether the
+        # next token is the content of the latest BLOCKQUOTE token's line.
+        self.quote_depth = 0
+        self.quoted = False
+        # Open lists, outermost first, as [tag, closing tag of the item the
+        # next list goes in], and the html of the latest item, not yet
+        # returned.
+        self.lists: list[list[str]] = []
+        self.pending_item: str | None = None
+        # Whether any of the above is open, see iter_html.
+        self.nested = False
+        # Tokens rendered to html by iter_html so far, including a held back
+        # list item.
+        self.rendered = 0
+        self.renderers: dict[Tag, Renderer] = {
+            Tag.P: self.handle_paragraph,
+            Tag.INDENTEDCODE: self.handle_code_block,
+            Tag.BACKTICKCODE: self.handle_code_block,
+            Tag.HR: self.handle_hr,
+            Tag.LI: self.handle_list,
+        }
+        for tag in heading_tags:
+            self.renderers[tag] = self.handle_heading
+
+    def reset(self) -> None:
+        # Drops the html and the open nesting of the previous document.
+        self.html.clear()
+        self.close_nesting()
+        self.rendered = 0
+
     def transform(self) -> str:
-        for token in self.tokens:
-            self.transform_block(token)
-    
+        self.tokens = self.lexer.get_tokens()
+        self.html.extend(self.iter_html(self.tokens))
+
     def get_html(self) -> str:
-        return "\n".join(self.html)
-    
+        # The html built by transform and transform_block, written out the
+        # way render_to writes blocks.
+        out = io.StringIO()
+        write_blocks(out.write, self.html, default_buffer_size)
+        return out.getvalue()
+
+    def render_to(
+        self,
+        writer,
+        tokens: Iterable[Token] | None = None,
+        buffer_size: int = default_buffer_size,
+        binary: bool | None = None,
+        encoding: str = "utf-8",
+    ) -> None:
+        # Writes the blocks of `tokens` (the lexer's tokens by default)
+        # separated by newlines to a text or binary file-like object or a
+        # socket, at least buffer_size characters at a time. The writer is
+        # neither flushed nor closed.
+        write = output_function(writer, binary, encoding)
+        if tokens is None:
+            tokens = self.lexer.get_tokens()
+        write_blocks(write, self.iter_html(tokens), buffer_size)
+
+    def iter_html(self, tokens: Iterable[Token]) -> Iterator[str]:
+        # Tokens outside blockquotes and lists skip render_next.
+        renderers = self.renderers
+        render_next = self.render_next
+        blockquote = Tag.BLOCKQUOTE
+        li = Tag.LI
+        self.close_nesting()
+        self.rendered = 0
+        for token in tokens:
+            tag = token.tag
+            if self.nested or tag is blockquote or tag is li:
+                html = render_next(token)
+            else:
+                renderer = renderers.get(tag)
+                if renderer is None:
+                    continue
+                html = renderer(token)
+                if html is None:
+                    continue
+                self.rendered += 1
+            if html is not None:
+                yield html
+        html = self.close_nesting()
+        if html is not None:
+            yield html
+
+    def render_next(self, token: Token) -> str | None:
+        # iter_html one token at a time, for callers that get the tokens
+        # one by one: the block of `token` with the blockquotes and lists
+        # opened or closed before it. Call close_nesting after the last
+        # token. A BLOCKQUOTE token sets the depth of the block after it
+        # (and of a BR following that), any other token closes the
+        # blockquotes. LI tokens open and close the lists down to their
+        # depth, any other token closes the lists.
+        tag = token.tag
+        pieces = []
+        if tag is Tag.BLOCKQUOTE:
+            depth = token.depth or 1
+            if depth == self.quote_depth:
+                self.quoted = True
+                return None
+            if self.lists:
+                self.close_lists(pieces)
+            nest_blockquotes(pieces, self.quote_depth, depth)
+            self.quote_depth = depth
+            self.quoted = True
+            self.nested = True
+            return "\n".join(pieces)
+
+        html = self.render_block(token)
+        if html is not None:
+            self.rendered += 1
+        if self.quoted:
+            self.quoted = False
+        elif self.quote_depth and tag is not Tag.BR:
+            if self.lists:
+                self.close_lists(pieces)
+            nest_blockquotes(pieces, self.quote_depth, 0)
+            self.quote_depth = 0
+        if tag is Tag.LI:
+            self.add_item(pieces, token, html)
+        elif self.lists and tag is not Tag.BR:
+            self.close_lists(pieces)
+            if html is not None:
+                pieces.append(html)
+        elif not pieces:
+            return html
+        elif html is not None:
+            pieces.append(html)
+        self.nested = self.quote_depth > 0 or len(self.lists) > 0
+        return "\n".join(pieces) or None
+
+    def add_item(self, pieces: list[str], token: Token, html: str | None) -> None:
+        # The latest item is held back until the next one, which tells
+        # whether the item ends or a nested list goes inside it.
+        depth = token.depth or 1
+        kind = "ol" if token.ordered else "ul"
+        lists = self.lists
+        item = self.pending_item
+        if item is not None:
+            if depth > len(lists) and item.endswith("</li>"):
+                pieces.append(item[:-len("</li>")])
+                lists[-1][1] = "</li>"
+            else:
+                pieces.append(item)
+        while len(lists) > depth:
+            self.close_list(pieces)
+        if lists and len(lists) == depth and lists[-1][0] != kind:
+            # A sibling list of the other kind, inside the same item.
+            pieces.append(f"</{lists.pop()[0]}>")
+        while len(lists) < depth:
+            pieces.append(f"<{kind}>")
+            if len(lists) < depth - 1:
+                # An item to hold a list more than one level deeper.
+                pieces.append("<li>")
+                lists.append([kind, "</li>"])
+            else:
+                lists.append([kind, ""])
+        self.pending_item = html
+
+    def close_list(self, pieces: list[str]) -> None:
+        # Closes the deepest list and the item of the list around it that
+        # holds it.
+        kind = self.lists.pop()[0]
+        pieces.append(f"</{kind}>")
+        if self.lists and self.lists[-1][1]:
+            pieces.append(self.lists[-1][1])
+            self.lists[-1][1] = ""
+
+    def close_lists(self, pieces: list[str]) -> None:
+        if self.pending_item is not None:
+            pieces.append(self.pending_item)
+            self.pending_item = None
+        while self.lists:
+            self.close_list(pieces)
+
+    def close_nesting(self) -> str | None:
+        pieces = []
+        self.close_lists(pieces)
+        nest_blockquotes(pieces, self.quote_depth, 0)
+        self.quote_depth = 0
+        self.quoted = False
+        self.nested = False
+        return "\n".join(pieces) or None
+
     def transform_block(self, token: Token):
-        self.handle_heading(token)
-        self.handle_paragraph(token)
-        self.handle_code_block(token)
-        self.handle_blockquote(token)
-        self.handle_hr(token)
-        self.handle_list(token)
-    
-    def handle_list(self, token: Token):
-        if token.tag == Tag.LI:
-            self.html.append(f"<li>{token.content}</li>")
-            return
-    
-    def handle_hr(self, token: Token):
-        if token.tag == Tag.HR:
-            self.html.append("<hr>")
-    
-    def handle_blockquote(self, token: Token):
-        if token.tag == Tag.BLOCKQUOTE:
-            self.html.append(f"<blockquote>{token.content}</blockquote>")
-    
-    def handle_code_block(self, token: Token):
-        if token.tag == Tag.INDENTEDCODE:
-            self.html.append(f"<pre><code>{token.content}</code></pre>")
-
-    def handle_paragraph(self, token: Token):
-        if token.tag == Tag.P:
-            self.html.append(f"<p>{token.content}</p>")
-    
-    def handle_heading(self, token: Token):
-        if token.tag == Tag.H1:
-            self.html.append(f"<h1>{token.content}</h1>")
-        if token.tag == Tag.H2:
-            self.html.append(f"<h2>{token.content}</h2>")
-        if token.tag == Tag.H3:
-            self.html.append(f"<h3>{token.content}</h3>")
-        if token.tag == Tag.H4:
-            self.html.append(f"<h4>{token.content}</h4>")
-        if token.tag == Tag.H5:
-            self.html.append(f"<h5>{token.content}</h5>")
-        if token.tag == Tag.H6:
-            self.html.append(f"<h6>{token.content}</h6>")
-    
-        
-    
\ No newline at end of file
+        html = self.render_block(token)
+        if html is not None:
+            self.html.append(html)
+
+    def render_block(self, token: Token) -> str | None:
+        renderer = self.renderers.get(token.tag)
+        if renderer is None:
+            return None
+        return renderer(token)
+
+    def register(self, tag: Tag, renderer: Renderer) -> None:
+        # BLOCKQUOTE tokens only open and close the nesting around the
+        # blocks after them, see render_next, they have no html of their own.
+        if tag is Tag.BLOCKQUOTE:
+            raise ValueError(f"expected a tag rendered on its own, got {tag}, which render_next nests")
+        self.renderers[tag] = renderer
+
+    def text(self, token: Token) -> str:
+        # The html of a paragraph, heading or list item: the spans rendered
+        # by a SpanTransformer before, or now by self.spans without changing
+        # the token, or else the escaped content.
+        html = token.html
+        if html is not None:
+            return html
+        if self.spans is not None:
+            return self.spans.span_html(token.content)
+        if self.escape:
+            return escape(token.content, quote=False)
+        return token.content
+
+    def handle_list(self, token: Token) -> str:
+        return f"<li>{self.text(token)}</li>"
+
+    def handle_hr(self, token: Token) -> str:
+        return "<hr>"
+
+    def handle_code_block(self, token: Token) -> str:
+        content = escape(token.content, quote=False) if self.escape else token.content
+        return f"<pre><code>{content}</code></pre>"
+
+    def handle_paragraph(self, token: Token) -> str:
+        return f"<p>{self.text(token)}</p>"
+
+    def handle_heading(self, token: Token) -> str:
+        open_tag, close_tag = heading_tags[token.tag]
+        return f"{open_tag}{self.text(token)}{close_tag}"
+
+
+def nest_blockquotes(pieces: list[str], depth: int, new_depth: int) -> None:
+    # Adds the tags going from `depth` nested blockquotes to `new_depth`.
+    if new_depth > depth:
+        pieces.extend(["<blockquote>"] * (new_depth - depth))
+    elif new_depth < depth:
+        pieces.extend(["</blockquote>"] * (depth - new_depth))
+
+
+def write_blocks(write: Callable[[str], None], blocks: Iterable[str], buffer_size: int) -> None:
+    # Writes `blocks` separated by newlines, at least buffer_size characters
+    # at a time.
+    pending = []
+    pending_size = 0
+    separator = ""
+    for html in blocks:
+        pending.append(separator)
+        pending.append(html)
+        separator = "\n"
+        pending_size += len(html) + 1
+        if pending_size >= buffer_size:
+            write("".join(pending))
+            pending.clear()
+            pending_size = 0
+    if pending:
+        write("".join(pending))
+
+
+def output_function(writer, binary: bool | None, encoding: str) -> Callable[[str], None]:
+    if hasattr(writer, "sendall"):
+        return lambda text: writer.sendall(text.encode(encoding))
+    if binary is None:
+        binary = isinstance(writer, (io.RawIOBase, io.BufferedIOBase))
+    if not binary:
+        return writer.write
+    if isinstance(writer, io.RawIOBase):
+        return lambda text: write_all(writer, text.encode(encoding))
+    return lambda text: writer.write(text.encode(encoding))
+
+
+def write_all(writer: io.RawIOBase, data: bytes) -> None:
+    # Unbuffered writes can be partial.
+    view = memoryview(data)
+    while view:
+        written = writer.write(view)
+        if written is None:
+            raise BlockingIOError(f"expected a blocking writer, got {writer}")
+        view = view[written:]
@@ -0,0 +1,154 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from alys.pipeline import render_to
+from alys.span_cache import SpanCache
+
+markdown_suffixes = {".md", ".markdown"}
+
+# Smallest amount of markdown sent to a worker at once, so that thousands
+# of small files are not dominated by inter-process overhead.
+min_chunk_bytes = 256 * 1024
+chunks_per_job = 8
+
+
+class BuildResult:
+    def __init__(self) -> None:
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.failures: list[tuple[str, str]] = []
+
+    def add(self, files: int, size: int, failures: list[tuple[str, str]]) -> None:
+        self.files += files
+        self.bytes += size
+        self.failures.extend(failures)
+
+    def summary(self) -> str:
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"built {self.files} files ({self.bytes / 1e6:.1f} MB) in {self.seconds:.2f} s, "
+            f"{self.files / seconds:.0f} files/s, {self.bytes / 1e6 / seconds:.1f} MB/s"
+        )
+
+
+def find_sources(src_dir: Path) -> list[tuple[Path, int]]:
+    sources = []
+    for root, _, names in os.walk(src_dir):
+        for name in sorted(names):
+            path = Path(root, name)
+            if path.suffix in markdown_suffixes:
+                sources.append((path, path.stat().st_size))
+    return sources
+
+
+def output_path(src_dir: Path, out_dir: Path, path: Path) -> Path:
+    return (out_dir / path.relative_to(src_dir)).with_suffix(".html")
+
+
+def chunk_sources(sources: list[tuple[Path, int]], jobs: int) -> list[list[Path]]:
+    total = sum(size for _, size in sources)
+    target = max(total // (jobs * chunks_per_job), min_chunk_bytes)
+    chunks = []
+    chunk = []
+    chunk_bytes = 0
+    for path, size in sources:
+        chunk.append(path)
+        chunk_bytes += size
+        if chunk_bytes >= target:
+            chunks.append(chunk)
+            chunk = []
+            chunk_bytes = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write_atomic(path: Path, write: Callable, mode: int) -> None:
+    # `write` is called with the temporary text file, which replaces `path`
+    # once it is complete. mkstemp creates it readable by its owner only, it
+    # gets `mode` instead, see build.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def build_chunk(
+    src_dir: Path, out_dir: Path, paths: list[Path], engine: str, mode: int
+) -> tuple[int, int, list[tuple[str, str]]]:
+    files = 0
+    size = 0
+    failures = []
+    # Pages of a site repeat navigation lines, list items and boilerplate.
+    cache = SpanCache()
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                write_atomic(
+                    output_path(src_dir, out_dir, path),
+                    lambda out: render_to(f, out, engine=engine, cache=cache),
+                    mode,
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            failures.append((str(path), str(e)))
+            continue
+        except Exception as e:
+            # A document the renderer fails on, such as one nested too
+            # deeply, fails alone instead of its whole chunk.
+            failures.append((str(path), f"{type(e).__name__}: {e}"))
+            continue
+        files += 1
+        size += path.stat().st_size
+    return files, size, failures
+
+
+def build(src_dir: str | os.PathLike, out_dir: str | os.PathLike, jobs: int = 1, engine: str = "regex") -> BuildResult:
+    src_dir = Path(src_dir)
+    out_dir = Path(out_dir)
+    if not src_dir.is_dir():
+        raise NotADirectoryError(f"expected a source directory, got {src_dir}")
+    if jobs < 1:
+        raise ValueError(f"expected a positive number of jobs, got {jobs}")
+    # The mode open would give a new file, read once: os.umask can only be
+    # read by setting it.
+    mode = 0o666 & ~current_umask()
+
+    start = time.perf_counter()
+    result = BuildResult()
+    chunks = chunk_sources(find_sources(src_dir), jobs)
+    if jobs == 1:
+        for chunk in chunks:
+            result.add(*build_chunk(src_dir, out_dir, chunk, engine, mode))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(build_chunk, src_dir, out_dir, chunk, engine, mode) for chunk in chunks]
+            for future in futures:
+                result.add(*future.result())
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def main(args) -> int:
+    result = build(args.src_dir, args.out_dir, jobs=args.jobs, engine=args.engine)
+    for path, error in result.failures:
+        print(f"{path}: {error}", file=sys.stderr)
+    print(result.summary())
+    return 1 if result.failures else 0
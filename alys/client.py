@@ -0,0 +1,141 @@
+import socket
+import sys
+
+# Client side of `python -m alys serve`, and the framing both sides share.
+# Nothing but socket is imported here, not even argparse or struct, so that
+# a client process starts in little more than the time of a bare
+# interpreter, see benchmarks/bench_server.py.
+#
+# A request is a 4-byte big-endian length and the markdown as UTF-8. The
+# response is a status byte, a 4-byte big-endian length and the html as
+# UTF-8, or the error message if the status is status_error. A connection
+# can carry any number of requests, one after the other.
+length_size = 4
+status_ok = 0
+status_error = 1
+
+usage = "usage: python -m alys.client --socket PATH [-o OUTPUT] [FILE]"
+
+
+class Client:
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        try:
+            self.socket.connect(path)
+        except OSError:
+            self.socket.close()
+            raise
+
+    def render(self, markdown: str | bytes) -> str:
+        if isinstance(markdown, str):
+            markdown = markdown.encode("utf-8")
+        try:
+            self.socket.sendall(pack_length(len(markdown)) + markdown)
+        except BrokenPipeError:
+            # the server closes the connection on a request that is too
+            # large, its response says why
+            pass
+        status = recv_exact(self.socket, 1)[0]
+        body = str(recv_frame(self.socket), "utf-8")
+        if status != status_ok:
+            raise ValueError(f"expected the server to render the document, got {body}")
+        return body
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def render_remote(markdown: str | bytes, path: str) -> str:
+    with Client(path) as client:
+        return client.render(markdown)
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError(f"expected {size} more bytes, got the end of the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    return recv_exact(sock, unpack_length(recv_exact(sock, length_size)))
+
+
+def pack_length(size: int) -> bytes:
+    return size.to_bytes(length_size, "big")
+
+
+def unpack_length(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def parse_args(argv: list[str]) -> dict[str, str | None]:
+    # `--socket PATH [-o OUTPUT] [FILE]`, parsed by hand since argparse
+    # takes longer to import than a request takes to render.
+    args = {"socket": None, "output": None, "file": "-"}
+    files = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ("--socket", "-o", "--output"):
+            if i + 1 == len(argv):
+                raise ValueError(f"expected a path after {arg}, got nothing")
+            args["socket" if arg == "--socket" else "output"] = argv[i + 1]
+            i += 2
+            continue
+        if arg.startswith("-") and arg != "-":
+            raise ValueError(f"expected --socket, -o or a file, got {arg}")
+        files.append(arg)
+        i += 1
+    if args["socket"] is None:
+        raise ValueError("expected --socket, got nothing")
+    if len(files) > 1:
+        raise ValueError(f"expected at most one file, got {len(files)}")
+    if files:
+        args["file"] = files[0]
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if "-h" in argv or "--help" in argv:
+        print(usage)
+        return 0
+    try:
+        args = parse_args(argv)
+    except ValueError as e:
+        print(f"{usage}\n{e}", file=sys.stderr)
+        return 2
+
+    if args["file"] == "-":
+        markdown = sys.stdin.buffer.read()
+    else:
+        with open(args["file"], "rb") as f:
+            markdown = f.read()
+    try:
+        html = render_remote(markdown, args["socket"])
+    except (OSError, ValueError) as e:
+        print(f"{args['file']}: {e}", file=sys.stderr)
+        return 1
+    if args["output"] is None:
+        sys.stdout.write(html)
+    else:
+        with open(args["output"], "w", encoding="utf-8") as f:
+            f.write(html)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
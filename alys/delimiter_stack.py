@@ -0,0 +1,192 @@
+from collections.abc import Callable
+import re
+
+special_pattern = re.compile(r"[*_~`!\[\]]")
+
+
+class Delimiter:
+    __slots__ = ("char", "count", "length", "both", "index", "opens", "closes")
+
+    def __init__(self, char: str, count: int, index: int, both: bool = False) -> None:
+        self.char = char
+        self.count = count
+        # The length of the whole run and whether it can both open and
+        # close, which the rule of 3 in close_delimiter looks at.
+        self.length = count
+        self.both = both
+        self.index = index
+        self.opens = []
+        self.closes = []
+
+    def render(self) -> str:
+        # Tags matched first are the innermost ones, unmatched characters
+        # stay outside of them.
+        return "".join(self.closes) + self.char * self.count + "".join(reversed(self.opens))
+
+
+class Bracket:
+    __slots__ = ("index", "start", "is_image")
+
+    def __init__(self, index: int, start: int, is_image: bool) -> None:
+        self.index = index
+        self.start = start
+        self.is_image = is_image
+
+
+def scan_spans(line: str, attribute: Callable[[str], str] = lambda v: v) -> str:
+    out = []
+    # Openers by stack_key, each list in the order of the line.
+    stacks = {}
+    brackets = []
+    n = len(line)
+    i = 0
+    # Index of the next ")", or -1 once there is none left in the line.
+    paren = -2
+
+    while True:
+        match = special_pattern.search(line, i)
+        if match is None:
+            out.append(line[i:])
+            break
+
+        j = match.start()
+        if j > i:
+            out.append(line[i:j])
+        c = line[j]
+        i = j + 1
+
+        if c == "`":
+            end = line.find("`", i)
+            if end == -1:
+                out.append(c)
+                continue
+            out.append(f"<code>{line[i:end]}</code>")
+            i = end + 1
+            continue
+
+        if c == "!":
+            if i < n and line[i] == "[":
+                brackets.append(Bracket(len(out), j, True))
+                out.append("![")
+                i += 1
+                continue
+            out.append(c)
+            continue
+
+        if c == "[":
+            brackets.append(Bracket(len(out), j, False))
+            out.append(c)
+            continue
+
+        if c == "]":
+            if not brackets:
+                out.append(c)
+                continue
+            bracket = brackets.pop()
+            if i < n and line[i] == "(":
+                if paren != -1 and paren <= i:
+                    paren = line.find(")", i + 1)
+                if paren != -1:
+                    url = attribute(line[i + 1:paren])
+                    drop_delimiters(stacks, bracket.index)
+                    if bracket.is_image:
+                        alt = attribute(line[bracket.start + 2:j])
+                        del out[bracket.index:]
+                        out.append(f'<img src="{url}" alt="{alt}"/>')
+                    else:
+                        out[bracket.index] = f'<a href="{url}">'
+                        out.append("</a>")
+                    i = paren + 1
+                    continue
+            out.append(c)
+            continue
+
+        k = i
+        while k < n and line[k] == c:
+            k += 1
+        can_open = k < n and not line[k].isspace()
+        can_close = j > 0 and not line[j - 1].isspace()
+        delimiter = Delimiter(c, k - j, len(out), can_open and can_close)
+        out.append(delimiter)
+        i = k
+
+        if can_close:
+            floor = brackets[-1].index if brackets else -1
+            close_delimiter(stacks, delimiter, floor)
+        if can_open and delimiter.count >= minimum_count(c):
+            stacks.setdefault(stack_key(delimiter), []).append(delimiter)
+
+    return "".join(p if type(p) is str else p.render() for p in out)
+
+
+def minimum_count(c: str) -> int:
+    return 2 if c == "~" else 1
+
+
+def stack_key(delimiter: Delimiter) -> tuple[str, int, bool]:
+    # Openers are kept apart by what decides the rule of 3, so the nearest
+    # one a closer can match is at the top of one of their stacks.
+    return delimiter.char, delimiter.length % 3, delimiter.both
+
+
+def matching_keys(char: str, length: int, both: bool) -> list[tuple[str, int, bool]]:
+    # The stacks of the openers a closer with this stack_key, its run length
+    # modulo 3 included, can match. The rule of 3 of
+    # CommonMark: if either run can both open and close, their lengths
+    # must not add up to a multiple of 3, unless both are multiples of 3.
+    # "**a*b*c**" is bold around italics, not "*" closing "**".
+    keys = []
+    for opener_length in range(3):
+        for opener_both in (False, True):
+            rule_of_3 = char != "~" and (opener_both or both)
+            if rule_of_3 and (opener_length + length) % 3 == 0 and (opener_length or length):
+                continue
+            keys.append((char, opener_length, opener_both))
+    return keys
+
+
+# matching_keys for every stack_key of a closer.
+closer_keys = {
+    (char, length, both): matching_keys(char, length, both)
+    for char in "*_~"
+    for length in range(3)
+    for both in (False, True)
+}
+
+
+def close_delimiter(stacks: dict[tuple[str, int, bool], list[Delimiter]], closer: Delimiter, floor: int) -> None:
+    minimum = minimum_count(closer.char)
+    keys = closer_keys[stack_key(closer)]
+    while closer.count >= minimum:
+        # The nearest opener the closer can match, skipping the ones the
+        # rule of 3 rules out.
+        opener = None
+        for key in keys:
+            stack = stacks.get(key)
+            if stack and stack[-1].index > floor and (opener is None or stack[-1].index > opener.index):
+                opener = stack[-1]
+                opener_stack = stack
+        if opener is None:
+            return
+        if closer.char == "~":
+            used, tag = 2, "s"
+        elif opener.count >= 2 and closer.count >= 2:
+            used, tag = 2, "b"
+        else:
+            used, tag = 1, "i"
+
+        opener.count -= used
+        closer.count -= used
+        opener.opens.append(f"<{tag}>")
+        closer.closes.append(f"</{tag}>")
+        # Delimiters opened inside the new span, matching the closer or not,
+        # can no longer be closed without crossing it.
+        drop_delimiters(stacks, opener.index)
+        if opener.count < minimum:
+            opener_stack.pop()
+
+
+def drop_delimiters(stacks: dict[tuple[str, int, bool], list[Delimiter]], index: int) -> None:
+    for stack in stacks.values():
+        while stack and stack[-1].index > index:
+            stack.pop()
@@ -0,0 +1,106 @@
+from bisect import bisect_right
+from collections.abc import Iterable
+
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer
+
+
+class BlockPatch:
+    # Replace `deleted` blocks starting at block index `start` with the
+    # rendered blocks in `inserted`.
+    def __init__(self, start: int, deleted: int, inserted: list[str]) -> None:
+        self.start = start
+        self.deleted = deleted
+        self.inserted = inserted
+
+
+class IncrementalDocument:
+    # A document split into blocks at the lines after which the lexer can
+    # restart (see Lexer.at_boundary). Each block is lexed and rendered on
+    # its own, so an edit only re-renders from the block it starts in up to
+    # the first old boundary after it, which covers setext underlines and
+    # code fences opened or closed by the edit.
+    def __init__(self, lines: Iterable[str] = (), engine: str = "regex") -> None:
+        self.engine = engine
+        self.lines: list[str] = []
+        self.blocks: list[str] = []
+        # First line of every block. Edits that add or remove lines move all
+        # following blocks, that move is kept pending as `shift`, applied to
+        # the blocks from `shift_from` on, and only written back between the
+        # pending position and the next edit.
+        self.starts: list[int] = []
+        self.shift_from = 0
+        self.shift = 0
+        self.edit(0, 0, list(lines))
+
+    def html(self) -> str:
+        return "\n".join(block for block in self.blocks if block)
+
+    def block_starts(self) -> list[int]:
+        self.move_shift(len(self.starts))
+        return list(self.starts)
+
+    def start_of(self, block: int) -> int:
+        if block >= self.shift_from:
+            return self.starts[block] + self.shift
+        return self.starts[block]
+
+    def find_block(self, line: int) -> int:
+        if self.shift_from < len(self.starts) and self.start_of(self.shift_from) <= line:
+            return bisect_right(self.starts, line - self.shift, self.shift_from) - 1
+        return max(bisect_right(self.starts, line, 0, self.shift_from) - 1, 0)
+
+    def move_shift(self, block: int) -> None:
+        if block > self.shift_from:
+            for i in range(self.shift_from, min(block, len(self.starts))):
+                self.starts[i] += self.shift
+        else:
+            for i in range(block, self.shift_from):
+                self.starts[i] -= self.shift
+        self.shift_from = block
+
+    def edit(self, start: int, end: int, lines: list[str]) -> BlockPatch:
+        if not 0 <= start <= end <= len(self.lines):
+            raise IndexError(f"expected a line range within 0..{len(self.lines)}, got {start}..{end}")
+
+        delta = len(lines) - (end - start)
+        first = self.find_block(start)
+        self.lines[start:end] = lines
+        edited_end = start + len(lines)
+
+        position = self.start_of(first) if self.starts else 0
+        old = first + 1
+        starts = []
+        blocks = []
+        while position < len(self.lines):
+            starts.append(position)
+            position, html = self.render_block(position)
+            blocks.append(html)
+            while old < len(self.starts) and (
+                self.start_of(old) < end or self.start_of(old) + delta < position
+            ):
+                old += 1
+            if old < len(self.starts) and self.start_of(old) + delta == position and position >= edited_end:
+                break
+        else:
+            old = len(self.starts)
+
+        self.move_shift(old)
+        self.starts[first:old] = starts
+        self.blocks[first:old] = blocks
+        self.shift_from = first + len(starts)
+        self.shift += delta
+        return BlockPatch(first, old - first, blocks)
+
+    def render_block(self, position: int) -> tuple[int, str]:
+        lexer = Lexer()
+        lexer.lex(self.lines[position])
+        position += 1
+        while position < len(self.lines) and not lexer.at_boundary():
+            lexer.lex(self.lines[position])
+            position += 1
+        spans = SpanTransformer(lexer, engine=self.engine)
+        blocks = BlockTransformer(lexer)
+        html = "\n".join(blocks.iter_html(spans.iter_spans(lexer.get_tokens())))
+        return position, html
@@ -1,22 +1,180 @@
-from alys.token import Tag, Token
+from collections.abc import Iterable, Iterator
+import mmap
+import os
+import re
+
+from alys import vectorized
+from alys.limits import Limits
+from alys.outline import Heading, Outline, heading_levels
+from alys.stats import Stats
+from alys.token import MappedToken, Tag, Token
+from alys.token_store import TokenStore
+
+ascii_letters = set(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+# For a line starting with the letter, matches any character proving that
+# the line is not made of that letter alone, which is_setext would accept.
+other_char_patterns = {
+    letter: re.compile(rb"[^\s\x1c-\x1f\x80-\xff" + bytes([letter]) + rb"]")
+    for letter in ascii_letters
+}
+
+# The order in which classify_line tries the classifiers, a line that none of
+# them accepts is a paragraph line.
+classifiers = [
+    ("is_code_block", "handle_code_block"),
+    ("is_empty", "handle_empty"),
+    ("is_blockquote", "handle_blockquote"),
+    ("is_atx", "handle_atx_heading"),
+    ("is_setext", "handle_setext_heading"),
+    ("is_list_item", "handle_list"),
+    ("is_hr", "handle_hr"),
+]
 
 
 class Lexer:
-    def __init__(self) -> None:
-        self.tokens = []
+    def __init__(
+        self,
+        tokens: list[Token] | TokenStore | None = None,
+        stats: Stats | None = None,
+        limits: Limits | None = None,
+        outline: bool = False,
+    ) -> None:
+        self.tokens = [] if tokens is None else tokens
+        self.stats = stats
+        self.limits = limits
+        # Blockquote and list nesting, see Limits.
+        self.max_depth = None if limits is None else limits.max_depth
         self.current_tag = Token(Tag.HTML)
+        # Line pieces of the latest token while it is still an open block
+        # (paragraph or code block). They are joined once, when the block is
+        # closed or its content is read, instead of on every line.
+        self.block_lines: list[str] | None = None
+        self.block_dirty = False
+        # Headings and their sections with outline=True, see get_outline.
+        # It grows with every heading, so a streaming Lexer goes without
+        # one. Lines and tokens are counted from the first ones lexed,
+        # drained tokens included.
+        self.outline = Outline() if outline else None
+        self.line_count = 0
+        self.token_offset = 0
+        # Line index of the first line of the latest open block.
+        self.block_line = 0
+
+    def reset(self) -> None:
+        # Back to the state of a new Lexer, for the next document. The token
+        # list or store is cleared in place, so transformers built on this
+        # lexer keep working with it.
+        self.tokens.clear()
+        self.current_tag = Token(Tag.HTML)
+        self.block_lines = None
+        self.block_dirty = False
+        if self.outline is not None:
+            self.outline = Outline()
+        self.line_count = 0
+        self.token_offset = 0
+        self.block_line = 0
 
     def add(self, token: Token):
+        self.close_block()
         self.tokens.append(token)
 
+    def open_block(self, token: Token, lines: list[str]) -> None:
+        self.add(token)
+        self.block_line = self.line_count - 1
+        self.block_lines = lines
+        self.block_dirty = True
+
+    def open_mapped_block(self, token: MappedToken) -> None:
+        # The content stays in the buffer, there are no pieces to join.
+        self.add(token)
+        self.block_line = self.line_count - 1
+        self.block_lines = []
+        self.block_dirty = False
+
+    def extend_block(self, line: str) -> None:
+        if not self.block_lines:
+            latest = self.tokens[-1]
+            if type(latest) is MappedToken and latest.has_lines():
+                self.block_lines.append(latest.content)
+        self.block_lines.append(line)
+        self.block_dirty = True
+
+    def extend_block_lines(self, lines: list[str]) -> None:
+        if lines:
+            self.extend_block(lines[0])
+            self.block_lines.extend(lines[1:])
+
+    def flush_block(self) -> None:
+        if self.block_lines is not None and self.block_dirty:
+            self.tokens[-1].content = "\n".join(self.block_lines)
+            self.block_dirty = False
+
+    def close_block(self) -> None:
+        self.flush_block()
+        self.block_lines = None
+
+    def is_block_open(self, tag: Tag) -> bool:
+        return self.block_lines is not None and self.get_latest_tag() == tag
+
+    def at_boundary(self) -> bool:
+        # Nothing left for the next line to extend or look back at, lexing
+        # can restart from here with a fresh Lexer.
+        return self.block_lines is None and self.get_latest_tag() != Tag.LI and not self.in_blockquote()
+
+    def in_blockquote(self) -> bool:
+        # Whether the latest tokens are the ones of a blockquote line: its
+        # BLOCKQUOTE token, the block of its content and maybe a BR. The
+        # renderer closes the blockquote at the first token after them.
+        tokens = self.tokens
+        back = 3 if self.get_latest_tag() == Tag.BR else 2
+        for index in range(max(len(tokens) - back, 0), len(tokens)):
+            if tokens[index].tag == Tag.BLOCKQUOTE:
+                return True
+        return False
+
+    def is_mapped_block_open(self, tag: Tag) -> bool:
+        if not self.is_block_open(tag) or self.block_lines:
+            return False
+        latest = self.tokens[-1]
+        return type(latest) is MappedToken and latest.buffer is not None
+
     def lex(self, line: str):
-        line = remove_trailing_newline(line)
-        if self.is_empty(line):
-            self.handle_empty(line)
+        self.line_count += 1
+        if self.stats is not None:
+            self.lex_counted(line)
+            return
+        if line.endswith("\n"):
+            line = line[:-1]
+        # An open fence takes every line, see handle_code_block.
+        if self.block_lines is not None and self.tokens[-1].tag == Tag.BACKTICKCODE:
+            if line == "```":
+                self.close_block()
+            else:
+                self.extend_block(line)
             return
+        if not line:
+            self.add(Token(Tag.EMPTY))
+            return
+        # The first character rules out most classifiers, only the ones it
+        # leaves are tried, in the same order as in classify_line.
+        first = line[0]
+        handler = first_char_handlers.get(first)
+        if handler is None:
+            handler = Lexer.lex_indented if first.isspace() else Lexer.lex_text
+        handler(self, line)
+
+    def lex_ordered(self, line: str) -> None:
+        # lex() trying every classifier in turn.
+        self.classify_line(remove_trailing_newline(line))
+
+    def classify_line(self, line: str) -> None:
         if self.is_code_block(line):
             self.handle_code_block(line)
             return
+        if self.is_empty(line):
+            self.handle_empty(line)
+            return
         if self.is_blockquote(line):
             self.handle_blockquote(line)
             return
@@ -30,21 +188,242 @@ class Lexer:
             self.handle_list(line)
             return
         if self.is_hr(line):
-            self.add(Token(Tag.HR))
+            self.handle_hr(line)
             return
         self.paragraph(line)
 
+    def lex_indented(self, line: str) -> None:
+        # Starts with whitespace: the leading spaces, counted once, decide
+        # between an indented code block, a nested list item and the rest,
+        # instead of every classifier as in classify_line.
+        stripped = line.lstrip(" ")
+        indent = len(line) - len(stripped)
+        if indent >= 4 and self.get_latest_tag() != Tag.LI:
+            self.handle_code_block(line)
+            return
+        content = stripped.lstrip()
+        if not content:
+            # Only whitespace, which is_setext accepts.
+            self.handle_setext_heading(line)
+            return
+        first = content[0]
+        if first in "-*":
+            if content[1:2] == " ":
+                self.add_list_item(line, indent, None)
+            elif self.is_hr(line):
+                self.handle_hr(line)
+            else:
+                self.paragraph(line)
+        elif first == ">" and indent < 4:
+            self.handle_blockquote(line)
+        elif first in "0123456789." and (dot := ordered_marker(content)) != -1:
+            self.add_list_item(line, indent, dot)
+        elif first == "_" and self.is_hr(line):
+            self.handle_hr(line)
+        else:
+            self.paragraph(line)
+
+    def lex_text(self, line: str) -> None:
+        # Starts with anything but whitespace or a character in
+        # first_char_handlers: only a setext underline made of that
+        # character, or a paragraph line.
+        if len(line) > 1 and line[1] != line[0] and not line[1].isspace():
+            self.paragraph(line)
+        elif self.is_setext(line):
+            self.handle_setext_heading(line)
+        else:
+            self.paragraph(line)
+
+    def lex_hash(self, line: str) -> None:
+        if self.is_atx(line):
+            self.handle_atx_heading(line)
+        else:
+            self.lex_text(line)
+
+    def lex_backtick(self, line: str) -> None:
+        if line.startswith("```"):
+            self.handle_code_block(line)
+        else:
+            self.lex_text(line)
+
+    def lex_marker(self, line: str) -> None:
+        # "-" and "*": setext underline, list item or horizontal rule. A
+        # marker followed by a space and text can only be a list item.
+        if line[1:2] == " " and not line[1:].isspace():
+            self.add_list_item(line, 0, None)
+        elif self.is_setext(line):
+            self.handle_setext_heading(line)
+        elif self.is_list_item(line):
+            self.handle_list(line)
+        elif self.is_hr(line):
+            self.handle_hr(line)
+        else:
+            self.paragraph(line)
+
+    def lex_underscore(self, line: str) -> None:
+        if self.is_setext(line):
+            self.handle_setext_heading(line)
+        elif self.is_hr(line):
+            self.handle_hr(line)
+        else:
+            self.paragraph(line)
+
+    def lex_number(self, line: str) -> None:
+        # Digits and ".": setext underline or ordered list item.
+        if self.is_setext(line):
+            self.handle_setext_heading(line)
+        elif (dot := ordered_marker(line)) != -1:
+            self.add_list_item(line, 0, dot)
+        else:
+            self.paragraph(line)
+
+    def lex_counted(self, line: str) -> None:
+        # lex() with every classifier call counted in self.stats.
+        line = remove_trailing_newline(line)
+        for classifier, handler in classifiers:
+            hit = getattr(self, classifier)(line)
+            self.stats.classify(classifier, hit)
+            if hit:
+                getattr(self, handler)(line)
+                return
+        self.paragraph(line)
+
+    def lex_file(self, path: str | os.PathLike) -> None:
+        # Token stores copy their content on append, only lists can hold
+        # tokens that point into the mapped file. The byte fast path skips
+        # the classifiers, so it is not taken while they are counted.
+        if not isinstance(self.tokens, list) or self.stats is not None:
+            self.lex_text_file(path)
+            return
+
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if vectorized.has_lone_cr(buffer):
+            buffer.close()
+            self.lex_text_file(path)
+            return
+
+        view = memoryview(buffer)
+        start = 0
+        while start < size:
+            newline = buffer.find(b"\n", start)
+            end = size if newline == -1 else newline
+            next_start = end + 1
+            if end > start and buffer[end - 1] == ord("\r"):
+                end -= 1
+            self.line_count += 1
+            if not self.lex_span(buffer, view, start, end):
+                # lex() counts the line itself.
+                self.line_count -= 1
+                self.lex(str(view[start:end], "utf-8"))
+            start = next_start
+
+    def lex_text_file(self, path: str | os.PathLike) -> None:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                self.lex(line)
+
+    def lex_bytes(self, data: bytes) -> None:
+        # Lexes a whole document, split into lines like lex_file does. With
+        # numpy installed most lines are classified up front, see
+        # alys.vectorized.
+        vectorized.lex_bytes(self, data)
+
+    def lex_span(self, buffer: mmap.mmap, view: memoryview, start: int, end: int) -> bool:
+        # Byte level fast path of lex() for the lines that dominate large
+        # files: blank lines, fenced code and plain paragraph lines. Returns
+        # False for everything else, which is decoded and lexed as text.
+        if self.is_block_open(Tag.BACKTICKCODE):
+            if not self.is_mapped_block_open(Tag.BACKTICKCODE):
+                return False
+            if buffer[start:end] == b"```":
+                self.close_block()
+            else:
+                self.tokens[-1].extend(start, end)
+            return True
+
+        if start == end:
+            self.add(Token(Tag.EMPTY))
+            return True
+
+        first = buffer[start]
+        if first == ord("`"):
+            if buffer[start:start + 3] != b"```" or self.is_block_open(Tag.INDENTEDCODE):
+                return False
+            self.open_mapped_block(MappedToken(Tag.BACKTICKCODE, view))
+            return True
+
+        if first not in ascii_letters or other_char_patterns[first].search(buffer, start, end) is None:
+            return False
+        if self.is_block_open(Tag.P):
+            if not self.is_mapped_block_open(Tag.P):
+                return False
+            self.tokens[-1].extend(start, end)
+        else:
+            self.open_mapped_block(MappedToken(Tag.P, view, start, end))
+        if end - start >= 2 and buffer[end - 2:end] == b"  ":
+            self.add(Token(Tag.BR))
+        return True
+
+    def iter_tokens(self, lines: Iterable[str]) -> Iterator[Token]:
+        for line in lines:
+            self.lex(line)
+            if len(self.tokens) > 1:
+                yield from self.drain()
+        yield from self.drain_all()
+
+    def drain(self) -> list[Token]:
+        # Only the latest token can still be extended or rewritten by the
+        # next line, every token before it is final.
+        closed = self.tokens[:-1]
+        del self.tokens[:-1]
+        self.token_offset += len(closed)
+        return closed
+
+    def drain_all(self) -> list[Token]:
+        # Every token, once there are no more lines.
+        self.close_block()
+        remaining = self.tokens[:]
+        self.tokens.clear()
+        self.token_offset += len(remaining)
+        return remaining
+
+    def get_outline(self) -> list[Heading]:
+        # The headings lexed so far, the sections still open end at the
+        # latest line and token.
+        if self.outline is None:
+            raise ValueError("expected a Lexer(outline=True), got one without an outline")
+        self.outline.extend(self.token_offset + len(self.tokens), self.line_count)
+        return self.outline.headings
+
+    def add_heading(self, token: Token, line: int) -> None:
+        # Outline entry for a heading that is the latest token.
+        if self.outline is None:
+            return
+        index = self.token_offset + len(self.tokens) - 1
+        self.outline.add(heading_levels[token.tag], token.content, index, line)
+
     def set_current_tag(self, new_tag: Tag):
         self.current_tag = new_tag
 
     def get_tokens(self) -> list[Token]:
+        self.flush_block()
         return self.tokens
 
     def get_latest_token(self) -> Token:
         if len(self.tokens) < 1:
             return Token(Tag.EMPTY)
+        self.flush_block()
         return self.tokens[-1]
 
+    def get_latest_tag(self) -> Tag:
+        if len(self.tokens) < 1:
+            return Tag.EMPTY
+        return self.tokens[-1].tag
+
     def is_setext(self, line: str) -> bool:
         if len(line) < 1:
             return False
@@ -64,11 +443,15 @@ class Lexer:
             if current_char == " ":
                 break
             i += 1
+            if i == len(line):
+                # Only hashes, such as "#" or "###".
+                return False
             current_char = line[i]
 
         return current_char == " "
 
     def set_latest_token(self, token: Token) -> None:
+        self.block_lines = None
         self.tokens[-1] = token
 
     def is_empty(self, line: str) -> bool:
@@ -81,7 +464,10 @@ class Lexer:
         self.add(Token(Tag.EMPTY))
 
     def paragraph(self, line: str) -> None:
-        self.add(Token(Tag.P, line))
+        if self.block_lines is not None and self.tokens[-1].tag == Tag.P:
+            self.extend_block(line)
+        else:
+            self.open_block(Token(Tag.P), [line])
         if line.endswith("  "):
             self.add(Token(Tag.BR))
 
@@ -93,14 +479,16 @@ class Lexer:
 
         token_above = self.get_latest_token()
         if token_above.tag != Tag.P:
-            self.add(Token(Tag.P, line))
+            self.open_block(Token(Tag.P), [line])
             return
 
         tag = Tag.H1
         if line.startswith("-"):
             tag = Tag.H2
 
-        self.set_latest_token(Token(tag, token_above.content))
+        heading = Token(tag, token_above.content)
+        self.set_latest_token(heading)
+        self.add_heading(heading, self.block_line)
 
     def handle_atx_heading(self, line: str) -> None:
         if not line.startswith("#"):
@@ -142,6 +530,7 @@ class Lexer:
                 return
 
         self.add(token)
+        self.add_heading(token, self.line_count - 1)
 
     def is_list_item(self, line: str) -> bool:
         line = line.lstrip()
@@ -163,31 +552,21 @@ class Lexer:
             raise TypeError(
                 f'expected a list item ("n. ", "- ", or "* "), got {line}')
 
-        is_unordered = line.startswith("-") or line.startswith("*")
-        idents = 0
-        offset = 0
-
-        if is_unordered:
-            content = line.lstrip()[1:]
-        else:
-            for c in line.lstrip():
-                if c in "1234567890":
-                    offset += 1
-                if c == ".":
-                    break
-
-        for c in line:
-            if c == " ":
-                idents += 1
-                continue
-            break
-
-        for _ in range(idents // 2):
-            self.add(Token(Tag.IDENT))
-
-        content = line[idents + offset + 2:]
-
-        self.add(Token(Tag.LI, content))
+        content = line.lstrip()
+        digits = None if content.startswith(("-", "*")) else content.find(".")
+        self.add_list_item(line, len(line) - len(line.lstrip(" ")), digits)
+
+    def add_list_item(self, line: str, indent: int, digits: int | None) -> None:
+        # A list item after `indent` spaces, `digits` is the number of
+        # digits of an ordered one and None for "- " and "* ".
+        # Every two spaces of indentation nest the item one list deeper.
+        depth = indent // 2 + 1
+        if self.max_depth is not None and depth > self.max_depth:
+            depth = self.max_depth
+            if self.stats is not None:
+                self.stats.limit("max_depth")
+        content = line[indent + (digits or 0) + 2:]
+        self.add(Token(Tag.LI, content, depth=depth, ordered=digits is not None))
 
     def is_hr(self, line: str) -> bool:
         stripped_line = line.replace(" ", "")
@@ -200,6 +579,11 @@ class Lexer:
 
         return stripped_line.replace(c, "") == ""
 
+    def handle_hr(self, line: str) -> None:
+        if not self.is_hr(line):
+            raise TypeError(f"expected a horizontal rule, got {line}")
+        self.add(Token(Tag.HR))
+
     def is_blockquote(self, line: str) -> bool:
         return line.lstrip().startswith(">") and not line.startswith("    ")
 
@@ -207,24 +591,41 @@ class Lexer:
         if not self.is_blockquote(line):
             raise TypeError(
                 f"expected a blockquote (starts with >), got {line}")
-        self.add(Token(Tag.BLOCKQUOTE))
 
-        blockquote_index = line.find(">")
-        is_empty_blockquote = blockquote_index == len(line) - 1
-        if is_empty_blockquote:
+        # One token for all the ">" in front of the content, however deep,
+        # found by moving an index instead of slicing off each level.
+        depth = 1
+        max_depth = self.max_depth
+        position = line.find(">") + 1
+        length = len(line)
+        while position < length:
+            char = line[position]
+            if char == ">":
+                if depth == max_depth:
+                    break
+                depth += 1
+            elif not char.isspace():
+                break
+            position += 1
+        self.add(Token(Tag.BLOCKQUOTE, depth=depth))
+        if depth == max_depth and line.startswith(">", position):
+            # Markers past the limit are kept as text.
+            if self.stats is not None:
+                self.stats.limit("max_depth")
+            self.paragraph(line[position:])
             return
-
-        content = line[blockquote_index + 1:]
-        self.lex(content.lstrip())
+        # The content is on the same line, lex() counts it again.
+        self.line_count -= 1
+        self.lex(line[position:])
 
     def is_code_block(self, line: str) -> bool:
         if line.startswith("    "):
-            return self.get_latest_token().tag != Tag.LI
+            return self.get_latest_tag() != Tag.LI
 
         if line.startswith("```"):
             return True
 
-        return self.get_latest_token().tag == Tag.BACKTICKCODE
+        return self.is_block_open(Tag.BACKTICKCODE)
 
     def handle_code_block(self, line: str):
         if not self.is_code_block(line):
@@ -232,30 +633,51 @@ class Lexer:
                 f"expected a code block (starts with 4 spaces or 1 tab), got {line}"
             )
 
-        latest_token = self.get_latest_token()
-        in_indented_code_block = latest_token.tag == Tag.INDENTEDCODE
+        in_indented_code_block = self.is_block_open(Tag.INDENTEDCODE)
         if in_indented_code_block:
-            new_content = f"{latest_token.content}\n{line[4:]}"
-            self.set_latest_token(Token(Tag.INDENTEDCODE, new_content))
+            self.extend_block(line[4:])
             return
 
-        in_backtick_code_block = latest_token.tag == Tag.BACKTICKCODE
+        in_backtick_code_block = self.is_block_open(Tag.BACKTICKCODE)
         if in_backtick_code_block:
             if line == "```":
+                self.close_block()
                 return
-            
-            new_content = line
-            if len(latest_token.content) > 0:
-                new_content = f"{latest_token.content}\n{line}"
 
-            self.set_latest_token(Token(Tag.BACKTICKCODE, new_content))
+            self.extend_block(line)
             return
-        
+
         if line.startswith("```"):
-            self.add(Token(Tag.BACKTICKCODE))
+            self.open_block(Token(Tag.BACKTICKCODE), [])
             return
 
-        self.add(Token(Tag.INDENTEDCODE, line[4:]))
+        self.open_block(Token(Tag.INDENTEDCODE), [line[4:]])
+
+
+first_char_handlers = {
+    "#": Lexer.lex_hash,
+    ">": Lexer.handle_blockquote,
+    "`": Lexer.lex_backtick,
+    "-": Lexer.lex_marker,
+    "*": Lexer.lex_marker,
+    "_": Lexer.lex_underscore,
+    ".": Lexer.lex_number,
+}
+for digit in "0123456789":
+    first_char_handlers[digit] = Lexer.lex_number
+
+
+def ordered_marker(content: str) -> int:
+    # The position of the "." of an ordered list item marker, such as
+    # "12. ", at the start of `content`, -1 if there is none. Accepts what
+    # Lexer.is_list_item does.
+    dot = content.find(".")
+    if dot == -1 or content[dot + 1:dot + 2] != " ":
+        return -1
+    for c in content[:dot]:
+        if c not in "1234567890":
+            return -1
+    return dot
 
 
 def remove_trailing_newline(line: str) -> str:
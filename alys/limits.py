@@ -0,0 +1,56 @@
+class Limits:
+    # Bounds on the work spent on one document, for untrusted input. None
+    # leaves a bound out. Content over a limit is not rejected, it is
+    # rendered as escaped text without spans:
+    #
+    # - max_line_length: span content with a longer line, which bounds the
+    #   backtracking of the span patterns to the square of this length per
+    #   line, so the regex engine stays linear in the number of lines.
+    # - max_depth: blockquote and list nesting. Blockquote markers past it
+    #   are kept as text, deeper list items stay at this depth.
+    # - max_span_passes: passes of the regex engine over one token before
+    #   giving up on reaching a fixpoint.
+    # - max_output_bytes: bytes of UTF-8 html render() returns at most,
+    #   escaping and closing tags included, as with its limit_bytes
+    #   argument.
+    # - time_budget: seconds of span transformation per document, counted
+    #   from the creation or reset of the SpanTransformer and checked
+    #   between the lines and passes of a token; the token it runs out in
+    #   and the ones after are escaped only.
+    def __init__(
+        self,
+        max_line_length: int | None = None,
+        max_depth: int | None = None,
+        max_span_passes: int | None = None,
+        max_output_bytes: int | None = None,
+        time_budget: float | None = None,
+    ) -> None:
+        for name, value in [
+            ("max_line_length", max_line_length),
+            ("max_depth", max_depth),
+            ("max_span_passes", max_span_passes),
+            ("max_output_bytes", max_output_bytes),
+            ("time_budget", time_budget),
+        ]:
+            if value is not None and value <= 0:
+                raise ValueError(f"expected a positive {name}, got {value}")
+        self.max_line_length = max_line_length
+        self.max_depth = max_depth
+        self.max_span_passes = max_span_passes
+        self.max_output_bytes = max_output_bytes
+        self.time_budget = time_budget
+
+
+# Bounds for markdown from untrusted users: far above what hand-written
+# documents reach, low enough that no line or token is slow to render.
+untrusted = Limits(
+    max_line_length=2_000,
+    max_depth=32,
+    max_span_passes=8,
+    max_output_bytes=16 * 1024 * 1024,
+    time_budget=1.0,
+)
+
+
+def longest_line(content: str) -> int:
+    return max(map(len, content.split("\n")))
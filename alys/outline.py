@@ -0,0 +1,82 @@
+import re
+
+from alys.token import Tag
+
+heading_levels = {tag: level for level, tag in enumerate([Tag.H1, Tag.H2, Tag.H3, Tag.H4, Tag.H5, Tag.H6], start=1)}
+
+slug_removed_pattern = re.compile(r"[^\w\s-]")
+slug_space_pattern = re.compile(r"\s+")
+
+
+class Heading:
+    # A heading and the section it starts, which runs up to the next heading
+    # of the same or a higher level. Token and line ranges are half open and
+    # count from the first token and line the lexer saw. The end of the
+    # last sections is only known at the end of the document, until then
+    # it is where the lexer is.
+    def __init__(self, level: int, text: str, slug: str, token_start: int, line_start: int) -> None:
+        self.level = level
+        self.text = text
+        self.slug = slug
+        self.token_start = token_start
+        self.token_end = token_start + 1
+        self.line_start = line_start
+        self.line_end = line_start + 1
+
+    def __str__(self) -> str:
+        return (
+            f"H{self.level}({self.text}) #{self.slug} "
+            f"tokens {self.token_start}..{self.token_end} lines {self.line_start}..{self.line_end}"
+        )
+
+
+class Outline:
+    # Built by the lexer as it adds heading tokens: each heading closes the
+    # open sections of its level and deeper, so the outline costs no pass
+    # of its own.
+    def __init__(self) -> None:
+        self.headings: list[Heading] = []
+        self.open_sections: list[Heading] = []
+        self.by_slug: dict[str, Heading] = {}
+        self.slug_counts: dict[str, int] = {}
+
+    def add(self, level: int, text: str, token_index: int, line: int) -> Heading:
+        self.close(level, token_index, line)
+        heading = Heading(level, text, self.unique_slug(text), token_index, line)
+        self.headings.append(heading)
+        self.by_slug[heading.slug] = heading
+        self.open_sections.append(heading)
+        return heading
+
+    def close(self, level: int, token_index: int, line: int) -> None:
+        while self.open_sections and self.open_sections[-1].level >= level:
+            heading = self.open_sections.pop()
+            heading.token_end = token_index
+            heading.line_end = line
+
+    def extend(self, token_end: int, line_end: int) -> None:
+        # Moves the end of the open sections to where the lexer is.
+        for heading in self.open_sections:
+            heading.token_end = token_end
+            heading.line_end = line_end
+
+    def find(self, slug: str) -> Heading | None:
+        return self.by_slug.get(slug)
+
+    def unique_slug(self, text: str) -> str:
+        # Repeated slugs get "-1", "-2"... appended.
+        base = slugify(text)
+        slug = base
+        count = self.slug_counts.get(base, 0)
+        while slug in self.by_slug:
+            count += 1
+            slug = f"{base}-{count}"
+        self.slug_counts[base] = count
+        return slug
+
+
+def slugify(text: str) -> str:
+    # Lowercase words joined by "-", markup and punctuation removed, like
+    # the anchors of most markdown renderers.
+    text = slug_removed_pattern.sub("", text.strip().lower())
+    return slug_space_pattern.sub("-", text)
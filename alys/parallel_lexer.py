@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import mmap
+import os
+import re
+
+from alys.lexer import Lexer
+from alys.token import Token
+from alys.token_store import tags_by_value
+
+# A file is cut into about chunks_per_job chunks per worker, so a worker
+# that gets slower chunks does not hold up the others, but none smaller
+# than min_chunk_bytes: a chunk's tokens are pickled back to the parent,
+# which costs more than lexing a chunk much smaller than that.
+min_chunk_bytes = 1024 * 1024
+chunks_per_job = 4
+
+fence_pattern = re.compile(rb"^```[^\n]*", re.MULTILINE)
+blank_line_pattern = re.compile(rb"\n\r?\n")
+
+
+def find_split_points(buffer: mmap.mmap | bytes, size: int, chunk_bytes: int) -> list[int]:
+    # Offsets just after a blank line outside fenced code, at least
+    # chunk_bytes apart. Fences are opened and closed the way the lexer does
+    # it. A fence line the lexer treats differently (in an indented code
+    # block) can make this split inside a block, lex_parallel detects that.
+    fences = [(m.start(), m.group().rstrip(b"\r") == b"```") for m in fence_pattern.finditer(buffer)]
+    points = []
+    fence = 0
+    in_fence = False
+    target = chunk_bytes
+    while target < size:
+        match = blank_line_pattern.search(buffer, target)
+        if match is None:
+            break
+        split = match.end()
+        while fence < len(fences) and fences[fence][0] < split:
+            if not in_fence:
+                in_fence = True
+            elif fences[fence][1]:
+                in_fence = False
+            fence += 1
+        if in_fence:
+            # The newline ending the blank line can start the next one.
+            target = split - 1
+            continue
+        if split < size:
+            points.append(split)
+        target = split + chunk_bytes
+    return points
+
+
+def read_lines(path: str | os.PathLike, start: int, end: int) -> io.StringIO:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Same newline translation as iterating over the file in text mode.
+    return io.StringIO(str(data, "utf-8"), newline=None)
+
+
+def lex_range(
+    path: str | os.PathLike, start: int, end: int
+) -> tuple[bytes, list[str], dict[int, tuple[int, bool]], bool]:
+    lexer = Lexer()
+    for line in read_lines(path, start, end):
+        lexer.lex(line)
+    tokens = lexer.get_tokens()
+    # Tag values, contents and the depths and list kinds of the nested
+    # tokens pickle much faster than Token objects.
+    tags = bytes(token.tag.value for token in tokens)
+    nesting = {index: (token.depth, token.ordered) for index, token in enumerate(tokens) if token.depth}
+    return tags, [token.content for token in tokens], nesting, lexer.at_boundary()
+
+
+def lex_parallel(path: str | os.PathLike, jobs: int | None = None, chunk_bytes: int | None = None) -> list[Token]:
+    # Lexes one file in chunks split at blank lines, with the same tokens as
+    # lexing its lines in order with a single Lexer.
+    jobs = jobs or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    if chunk_bytes is None:
+        chunk_bytes = max(size // (jobs * chunks_per_job), min_chunk_bytes)
+    if chunk_bytes < 1:
+        raise ValueError(f"expected a positive chunk size, got {chunk_bytes}")
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            points = find_split_points(buffer, size, chunk_bytes)
+    ranges = list(zip([0, *points], [*points, size]))
+
+    if jobs <= 1 or len(ranges) == 1:
+        results = [lex_range(path, start, end) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(lex_range, [path] * len(ranges), *zip(*ranges)))
+    return stitch(path, ranges, results)
+
+
+def stitch(
+    path: str | os.PathLike,
+    ranges: list[tuple[int, int]],
+    results: list[tuple[bytes, list[str], dict[int, tuple[int, bool]], bool]],
+) -> list[Token]:
+    tokens = []
+    i = 0
+    while i < len(ranges):
+        tags, contents, nesting, at_boundary = results[i]
+        if at_boundary or i == len(ranges) - 1:
+            tokens.extend(
+                Token(tags_by_value[tag], content, *nesting.get(index, ()))
+                for index, (tag, content) in enumerate(zip(tags, contents))
+            )
+            i += 1
+            continue
+        # The chunk ends inside a block, every chunk after it was lexed from
+        # the wrong state. Lex on from the start of this chunk, which was
+        # right, until a chunk ends where a fresh Lexer can take over again.
+        lexer = Lexer()
+        while i < len(ranges):
+            for line in read_lines(path, *ranges[i]):
+                lexer.lex(line)
+            i += 1
+            if lexer.at_boundary():
+                break
+        tokens.extend(lexer.get_tokens())
+    return tokens
@@ -0,0 +1,238 @@
+from collections.abc import Iterable, Iterator
+import re
+import threading
+import time
+
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.limits import Limits
+from alys.span_cache import SpanCache
+from alys.span_transformer import SpanTransformer, engines
+from alys.stats import Stats
+from alys.token import Token
+
+# Pieces of rendered html: tags, which are never cut, and the text
+# between them, which is cut between characters and entities.
+html_pieces = re.compile(r"<[^<>]*>|[^<]+|<")
+html_tags = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)[^<>]*>")
+entity = re.compile(r"&[^;<&\s]*;")
+void_tags = {"br", "hr", "img"}
+
+
+def render(
+    lines: Iterable[str],
+    engine: str = "regex",
+    stats: Stats | None = None,
+    cache: SpanCache | None = None,
+    limit_blocks: int | None = None,
+    limit_bytes: int | None = None,
+    limits: Limits | None = None,
+) -> str:
+    # With a limit, lines are only read and lexed until the rendered blocks
+    # reach limit_blocks blocks or limit_bytes bytes of UTF-8, see limited,
+    # and the html is cut to at most limit_bytes bytes, see truncate_html.
+    # `limits` bounds the work on untrusted documents, see alys.limits.
+    limit_bytes = output_limit(limit_blocks, limit_bytes, limits)
+    lexer = Lexer(stats=stats, limits=limits)
+    if limit_bytes is not None:
+        lines = open_block_limited(lexer, lines, limit_bytes)
+    spans = SpanTransformer(lexer, engine=engine, stats=stats, cache=cache, limits=limits)
+    if stats is None:
+        blocks = BlockTransformer(lexer, spans=spans)
+        html = blocks.iter_html(lexer.iter_tokens(lines))
+    else:
+        start = time.perf_counter()
+        blocks = BlockTransformer(lexer)
+        tokens = stats.count_tags(stats.time_stage("lex", lexer.iter_tokens(lines)))
+        tokens = stats.time_stage("spans", spans.iter_spans(tokens))
+        html = stats.time_stage("blocks", blocks.iter_html(tokens))
+    if limit_blocks is not None or limit_bytes is not None:
+        html = limited(blocks, html, limit_blocks, limit_bytes)
+    html = within(limit_bytes, "\n".join(html))
+    if stats is not None:
+        stats.add_time("end_to_end", time.perf_counter() - start)
+    return html
+
+
+class Renderer:
+    # render() with fixed settings, safe to call from any number of threads
+    # at once. Each thread renders with its own Lexer, SpanTransformer and
+    # BlockTransformer, reset before every document instead of built again,
+    # so the only state calls share is the span cache, which has a lock.
+    def __init__(self, engine: str = "regex", cache: SpanCache | None = None, limits: Limits | None = None) -> None:
+        if engine not in engines:
+            raise ValueError(f"expected a span engine in {engines}, got {engine}")
+        self.engine = engine
+        self.cache = cache
+        self.limits = limits
+        self.local = threading.local()
+
+    def render(self, lines: Iterable[str], limit_blocks: int | None = None, limit_bytes: int | None = None) -> str:
+        limit_bytes = output_limit(limit_blocks, limit_bytes, self.limits)
+        lexer, blocks = self.pipeline()
+        if limit_bytes is not None:
+            lines = open_block_limited(lexer, lines, limit_bytes)
+        html = blocks.iter_html(lexer.iter_tokens(lines))
+        if limit_blocks is not None or limit_bytes is not None:
+            html = limited(blocks, html, limit_blocks, limit_bytes)
+        return within(limit_bytes, "\n".join(html))
+
+    def pipeline(self) -> tuple[Lexer, BlockTransformer]:
+        # The calling thread's lexer and transformers, ready for a document.
+        local = self.local
+        lexer = getattr(local, "lexer", None)
+        if lexer is None:
+            lexer = local.lexer = Lexer(limits=self.limits)
+            local.spans = SpanTransformer(lexer, engine=self.engine, cache=self.cache, limits=self.limits)
+            local.blocks = BlockTransformer(lexer, spans=local.spans)
+        else:
+            lexer.reset()
+            local.spans.reset()
+            local.blocks.reset()
+        return lexer, local.blocks
+
+
+def output_limit(limit_blocks: int | None, limit_bytes: int | None, limits: Limits | None) -> int | None:
+    # limit_bytes checked and lowered to the output limit of `limits`.
+    if limits is not None and limits.max_output_bytes is not None:
+        if limit_bytes is None or limit_bytes > limits.max_output_bytes:
+            limit_bytes = limits.max_output_bytes
+    if limit_blocks is not None and limit_blocks < 1:
+        raise ValueError(f"expected a positive number of blocks, got {limit_blocks}")
+    if limit_bytes is not None and limit_bytes < 1:
+        raise ValueError(f"expected a positive number of bytes, got {limit_bytes}")
+    return limit_bytes
+
+
+def open_block_limited(lexer: Lexer, lines: Iterable[str], limit_bytes: int) -> Iterator[str]:
+    # `lines` until the block `lexer` has open holds more than limit_bytes
+    # characters. Its html is at least as long, so it reaches the limit on
+    # its own and the rest of it is never read or lexed.
+    start = None
+    count = 0
+    size = 0
+    for line in lines:
+        yield line
+        block_lines = lexer.block_lines
+        if block_lines is None:
+            continue
+        if lexer.block_line != start:
+            start = lexer.block_line
+            count = 0
+            size = 0
+        for piece in block_lines[count:]:
+            size += len(piece) + 1
+        count = len(block_lines)
+        if size > limit_bytes:
+            return
+
+
+def limited(
+    blocks: BlockTransformer, html: Iterator[str], limit_blocks: int | None, limit_bytes: int | None
+) -> Iterator[str]:
+    # The html of `blocks` up to the block reaching a limit, then the tags
+    # closing the blockquotes and lists still open. A block still open when
+    # it reaches limit_bytes is cut, see open_block_limited, and the html
+    # is then cut to limit_bytes, see within.
+    size = -1
+    for block in html:
+        yield block
+        size += len(block.encode("utf-8")) + 1
+        if (limit_blocks is not None and blocks.rendered >= limit_blocks) or (
+            limit_bytes is not None and size >= limit_bytes
+        ):
+            break
+    closing = blocks.close_nesting()
+    if closing is not None:
+        yield closing
+
+
+def within(limit_bytes: int | None, html: str) -> str:
+    # `html`, cut if it is more than limit_bytes bytes of UTF-8.
+    if limit_bytes is None or len(html) * 4 <= limit_bytes or len(html.encode("utf-8")) <= limit_bytes:
+        return html
+    return truncate_html(html, limit_bytes)
+
+
+def truncate_html(html: str, limit_bytes: int) -> str:
+    # The longest start of `html` that, with closing tags for the elements
+    # still open after it, takes at most limit_bytes bytes of UTF-8. It is
+    # cut between tags and entities or inside text, never inside either.
+    # Opening a tag and text add to the size with the closing tags, and
+    # closing a tag leaves it the same, so the scan stops at the first
+    # piece that does not fit.
+    open_tags = []
+    size = 0
+    closing = 0
+    cut = 0
+    for match in html_pieces.finditer(html):
+        piece = match.group()
+        data = piece.encode("utf-8")
+        tag = html_tags.fullmatch(piece)
+        if tag is None:
+            if size + len(data) + closing > limit_bytes:
+                # As many characters of the text as fit, without the start
+                # of an entity.
+                text = str(data[: limit_bytes - size - closing], "utf-8", "ignore")
+                start = text.rfind("&")
+                if start != -1 and entity.match(piece, start) is not None and ";" not in text[start:]:
+                    text = text[:start]
+                cut = match.start() + len(text)
+                break
+            size += len(data)
+        else:
+            closing_tag, name = tag.groups()
+            size += len(data)
+            if closing_tag:
+                if open_tags and open_tags[-1] == name:
+                    open_tags.pop()
+                    closing -= len(name) + 3
+            elif name not in void_tags and not piece.endswith("/>"):
+                open_tags.append(name)
+                closing += len(name) + 3
+            if size + closing > limit_bytes:
+                break
+        cut = match.end()
+
+    # The elements open at the cut.
+    open_tags = []
+    for tag in html_tags.finditer(html, 0, cut):
+        closing_tag, name = tag.groups()
+        if closing_tag:
+            if open_tags and open_tags[-1] == name:
+                open_tags.pop()
+        elif name not in void_tags and not tag.group().endswith("/>"):
+            open_tags.append(name)
+    html = html[:cut]
+    if html.endswith("\n"):
+        html = html[:-1]
+    return html + "".join(f"</{name}>" for name in reversed(open_tags))
+
+
+def render_to(
+    lines: Iterable[str], writer, engine: str = "regex", cache: SpanCache | None = None, **kwargs
+) -> None:
+    # render() written to `writer` block by block, see
+    # BlockTransformer.render_to for the writers and keyword arguments.
+    lexer = Lexer()
+    spans = SpanTransformer(lexer, engine=engine, cache=cache)
+    blocks = BlockTransformer(lexer, spans=spans)
+    blocks.render_to(writer, lexer.iter_tokens(lines), **kwargs)
+
+
+def render_section(lexer: Lexer, slug: str, engine: str = "regex", cache: SpanCache | None = None) -> str:
+    # The section starting at the heading with this slug in the outline of
+    # `lexer`, a Lexer(outline=True), rendered from the lexer's tokens.
+    # Only the section's tokens are copied and rendered.
+    lexer.get_outline()
+    heading = lexer.outline.find(slug)
+    if heading is None:
+        raise KeyError(f"expected the slug of a heading, got {slug}")
+    start = heading.token_start - lexer.token_offset
+    if start < 0:
+        raise ValueError(f"expected the lexer to still hold the tokens of the section, got {slug}")
+    end = heading.token_end - lexer.token_offset
+    tokens = [Token(token.tag, token.content, token.depth, token.ordered) for token in lexer.get_tokens()[start:end]]
+    spans = SpanTransformer(lexer, engine=engine, cache=cache)
+    blocks = BlockTransformer(lexer, spans=spans)
+    return "\n".join(blocks.iter_html(tokens))
@@ -0,0 +1,124 @@
+import argparse
+import io
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+
+from alys.client import length_size, pack_length, recv_exact, status_error, status_ok, unpack_length
+from alys.limits import Limits, untrusted
+from alys.pipeline import Renderer
+from alys.span_cache import SpanCache
+
+# Largest request accepted, a bigger one gets an error and its connection
+# is closed since the rest of the request is not read.
+max_request_bytes = 64 * 1024 * 1024
+
+
+class RenderHandler(socketserver.BaseRequestHandler):
+    # One connection: renders requests until the client closes it.
+    def handle(self) -> None:
+        while True:
+            header = self.request.recv(length_size, socket.MSG_WAITALL)
+            if len(header) < length_size:
+                return
+            size = unpack_length(header)
+            if size > self.server.max_request_bytes:
+                self.respond(status_error, f"expected at most {self.server.max_request_bytes} bytes, got {size}")
+                return
+            try:
+                markdown = str(recv_exact(self.request, size), "utf-8")
+            except ConnectionError:
+                return
+            except UnicodeDecodeError as e:
+                self.respond(status_error, f"expected UTF-8, got {e}")
+                continue
+            try:
+                html = self.server.renderer.render(io.StringIO(markdown, newline=None))
+            except Exception as e:
+                self.respond(status_error, f"{type(e).__name__}: {e}")
+                continue
+            self.respond(status_ok, html)
+
+    def respond(self, status: int, body: str) -> None:
+        data = body.encode("utf-8", "surrogatepass")
+        self.request.sendall(bytes([status]) + pack_length(len(data)) + data)
+
+
+class RenderServer(socketserver.ThreadingUnixStreamServer):
+    # Renders documents for any number of local clients at once, each
+    # connection in its own thread. The lexer and the span engine stay
+    # imported, the span cache is shared and each connection reuses its
+    # Renderer pipeline, so a request costs only its rendering. Documents
+    # are rendered within `limits`, none by default so that the html is the
+    # one alys.render gives; alys.limits.untrusted is for untrusted input.
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: str,
+        engine: str = "regex",
+        cache: SpanCache | None = None,
+        max_request_bytes: int = max_request_bytes,
+        limits: Limits | None = None,
+    ) -> None:
+        if max_request_bytes < 1:
+            raise ValueError(f"expected a positive number of bytes, got {max_request_bytes}")
+        self.path = path
+        self.engine = engine
+        self.cache = SpanCache() if cache is None else cache
+        self.max_request_bytes = max_request_bytes
+        self.limits = limits
+        self.renderer = Renderer(engine, self.cache, limits)
+        remove_stale_socket(path)
+        super().__init__(path, RenderHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_stale_socket(path: str) -> None:
+    # A socket file left by a server that did not shut down is removed, one
+    # a server still answers on is not.
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"expected a socket or nothing at {path}, got another file")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"expected no server on {path}, got one answering")
+
+
+def stop(signum: int, frame) -> None:
+    # SIGTERM stops the server like ^C, so the socket file is removed.
+    raise KeyboardInterrupt
+
+
+def main(args: argparse.Namespace) -> int:
+    try:
+        server = RenderServer(args.socket, engine=args.engine, limits=untrusted if args.untrusted else None)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    signal.signal(signal.SIGTERM, stop)
+    with server:
+        print(f"serving on {args.socket}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+import json
+import sys
+import threading
+
+
+class SpanCache:
+    # Least recently used map from raw to transformed span content, bounded
+    # by a number of entries and by the memory of the cached strings. One
+    # cache can be shared by SpanTransformers with different settings and
+    # by several threads.
+    def __init__(self, max_entries: int | None = 4096, max_bytes: int | None = 16 * 1024 * 1024) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError(f"expected a positive number of entries, got {max_entries}")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(f"expected a positive number of bytes, got {max_bytes}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[tuple, str] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> str | None:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: str) -> None:
+        size = entry_size(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= entry_size(key, previous)
+            self.entries[key] = value
+            self.bytes += size
+            while (self.max_entries is not None and len(self.entries) > self.max_entries) or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                old_key, old_value = self.entries.popitem(last=False)
+                self.bytes -= entry_size(old_key, old_value)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.as_dict(), **kwargs)
+
+
+def entry_size(key: tuple, value: str) -> int:
+    # The raw content is the last item of the key, the rest are settings.
+    return sys.getsizeof(key[-1]) + sys.getsizeof(value)
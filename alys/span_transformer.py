@@ -1,5 +1,13 @@
+from collections.abc import Iterable, Iterator
+from html import escape
+import time
+
+from alys.delimiter_stack import scan_spans
 from alys.lexer import Lexer
-from alys.token import Token
+from alys.limits import Limits, longest_line
+from alys.span_cache import SpanCache
+from alys.stats import Stats
+from alys.token import Tag, Token
 import re
 
 pattern_dict = {
@@ -11,20 +19,154 @@ pattern_dict = {
     "code_pattern": r"`.*?`",
 }
 
+patterns = {name: re.compile(pattern) for name, pattern in pattern_dict.items()}
+combined_pattern = re.compile("|".join(pattern_dict.values()))
+
+span_tags = {Tag.P, Tag.H1, Tag.H2, Tag.H3, Tag.H4, Tag.H5, Tag.H6, Tag.LI}
+
+engines = ["regex", "stack"]
+
 
 class SpanTransformer:
-    def __init__(self, lexer: Lexer) -> None:
+    def __init__(
+        self,
+        lexer: Lexer,
+        escape: bool = True,
+        engine: str = "regex",
+        stats: Stats | None = None,
+        cache: SpanCache | None = None,
+        limits: Limits | None = None,
+    ) -> None:
+        if engine not in engines:
+            raise ValueError(f"expected a span engine in {engines}, got {engine}")
         self.tokens = lexer.tokens
+        self.escape = escape
+        self.engine = engine
+        self.stats = stats
+        self.cache = cache
+        self.limits = limits
+        # Settings in front of the content in cache keys, the limits change
+        # what is rendered.
+        self.cache_settings: tuple = (engine, escape)
+        self.max_line_length = None
+        self.max_span_passes = None
+        if limits is not None:
+            self.cache_settings += (limits.max_line_length, limits.max_span_passes)
+            self.max_line_length = limits.max_line_length
+            self.max_span_passes = limits.max_span_passes
+        self.reset()
+
+    def reset(self) -> None:
+        # Starts the time budget of the next document.
+        self.deadline = None
+        self.expired = False
+        if self.limits is not None and self.limits.time_budget is not None:
+            self.deadline = time.perf_counter() + self.limits.time_budget
+
+    def iter_spans(self, tokens: Iterable[Token]) -> Iterator[Token]:
+        for token in tokens:
+            if token.tag in span_tags:
+                self.transform_spans(token)
+            yield token
 
     def transform_spans(self, token: Token):
-        if not self.is_span(token.content):
+        # Rewrites the content of `token` to its html. The html is also kept
+        # in token.html, which tells BlockTransformer not to escape it again
+        # and a second call to leave the token as is. span_html renders
+        # content without changing any token.
+        if token.html is not None:
             return
-        original = token.content
+        token.content = token.html = self.span_html(token.content)
+
+    def span_html(self, content: str) -> str:
+        if self.cache is None:
+            return self.render_spans(content)
+        # The settings are part of the key, so that a cache can be shared.
+        key = (*self.cache_settings, content)
+        html = self.cache.get(key)
+        if html is None:
+            html = self.render_spans(content)
+            # Content escaped because time ran out is not what another
+            # document would render.
+            if not self.expired:
+                self.cache.put(key, html)
+        return html
+
+    def render_spans(self, content: str) -> str:
+        # Escape the raw text once, before any tag is generated. None of the
+        # span delimiters are affected by the escaping. Quotes only need
+        # escaping inside attributes, see attribute().
+        over_limits = self.limits is not None and self.over_limits(content)
+        if self.escape:
+            content = escape(content, quote=False)
+        if over_limits:
+            return content
+        if self.engine == "stack":
+            # Single scan with a delimiter stack, see alys.delimiter_stack.
+            if self.stats is not None:
+                self.stats.span_token(1)
+            return scan_spans(content, self.attribute)
+        if self.deadline is not None and "\n" in content:
+            # One line at a time, so that the time budget is checked between
+            # lines as well. No span pattern matches across a line end.
+            lines = content.split("\n")
+        else:
+            lines = [content]
+        html = []
+        most_passes = 0
+        for line in lines:
+            transformed, passes = self.fixpoint(line)
+            if transformed is None:
+                if self.stats is not None:
+                    self.stats.limit("time_budget" if self.expired else "max_span_passes")
+                return content
+            html.append(transformed)
+            most_passes = max(most_passes, passes)
+        if self.stats is not None:
+            self.stats.span_token(most_passes)
+        return "\n".join(html)
+
+    def fixpoint(self, line: str) -> tuple[str | None, int]:
+        # Transforms `line` until it stops changing: the result and the
+        # number of passes, 0 without spans. The result is None when
+        # max_span_passes or the time budget runs out first.
+        if self.deadline is not None and self.past_deadline():
+            return None, 0
+        if not self.is_span(line):
+            return line, 0
+        original = line
         transformed = self.transform(original)
+        passes = 1
         while original != transformed:
+            if passes == self.max_span_passes or (self.deadline is not None and self.past_deadline()):
+                return None, passes
             original = transformed
             transformed = self.transform(original)
-        token.content = transformed
+            passes += 1
+        return transformed, passes
+
+    def past_deadline(self) -> bool:
+        # Once the time budget has run out it is for the rest of the
+        # document.
+        if not self.expired and time.perf_counter() > self.deadline:
+            self.expired = True
+        return self.expired
+
+    def over_limits(self, content: str) -> bool:
+        # Whether `content` is left as escaped text, see Limits.
+        if self.deadline is not None and self.past_deadline():
+            name = "time_budget"
+        elif (
+            self.max_line_length is not None
+            and len(content) > self.max_line_length
+            and longest_line(content) > self.max_line_length
+        ):
+            name = "max_line_length"
+        else:
+            return False
+        if self.stats is not None:
+            self.stats.limit(name)
+        return True
 
     def transform(self, line: str) -> str:
         line = self.handle_bold(line)
@@ -36,9 +178,7 @@ class SpanTransformer:
         return line
 
     def span_match(self, line: str) -> re.Match[str] | None:
-        combined_pattern = "|".join([pattern_dict[p] for p in pattern_dict])
-        match = re.search(combined_pattern, line)
-        return match
+        return combined_pattern.search(line)
 
     def is_span(self, line: str) -> bool:
         return bool(self.span_match(line))
@@ -50,45 +190,42 @@ class SpanTransformer:
         return (-1, -1)
 
     def handle_italics(self, line: str) -> str:
-        italics_pattern = re.compile(rf"{pattern_dict['italics_pattern']}")
-
         def replacer(m: re.Match):
             inner = m.group(1) or m.group(2)
             inner = inner[1:-1]
             inner = self.handle_italics(inner)
             return f"<i>{inner}</i>"
 
-        return italics_pattern.sub(replacer, line)
+        return patterns["italics_pattern"].sub(replacer, line)
 
     def handle_bold(self, line: str) -> str:
-        bold_pattern = re.compile(rf"{pattern_dict['bold_pattern']}")
-
         def replacer(m: re.Match):
             inner = m.group(1) or m.group(2)
             inner = inner[2:-2]
             inner = self.handle_bold(inner)
             return f"<b>{inner}</b>"
 
-        return bold_pattern.sub(replacer, line)
+        return patterns["bold_pattern"].sub(replacer, line)
 
     def handle_strikethrough(self, line: str) -> str:
-        strikethrough_pattern = re.compile(rf"{pattern_dict['strikethrough_pattern']}")
-        return strikethrough_pattern.sub(lambda x: f"<s>{x.group()[2:-2]}</s>", line)
+        return patterns["strikethrough_pattern"].sub(lambda x: f"<s>{x.group()[2:-2]}</s>", line)
 
     def handle_link(self, line: str) -> str:
-        link_pattern = re.compile(rf"{pattern_dict['link_pattern']}")
-        return link_pattern.sub(
-            lambda x: f'<a href="{x.group()[1:-1].split("](")[1]}">{x.group()[1:-1].split("](")[0]}</a>',
+        return patterns["link_pattern"].sub(
+            lambda x: f'<a href="{self.attribute(x.group()[1:-1].split("](")[1])}">{x.group()[1:-1].split("](")[0]}</a>',
             line,
         )
 
     def handle_img(self, line: str) -> str:
-        image_pattern = re.compile(rf"{pattern_dict['image_pattern']}")
-        return image_pattern.sub(
-            lambda x: f'<img src="{x.group()[2:-1].split("](")[1]}" alt="{x.group()[2:-2].split("](")[0]}"/>',
+        return patterns["image_pattern"].sub(
+            lambda x: f'<img src="{self.attribute(x.group()[2:-1].split("](")[1])}" alt="{self.attribute(x.group()[2:-2].split("](")[0])}"/>',
             line,
         )
 
+    def attribute(self, value: str) -> str:
+        if self.escape:
+            return value.replace('"', "&quot;")
+        return value
+
     def handle_code(self, line: str) -> str:
-        code_pattern = re.compile(rf"{pattern_dict['code_pattern']}")
-        return code_pattern.sub(lambda x: f"<code>{x.group()[1:-1]}</code>", line)
+        return patterns["code_pattern"].sub(lambda x: f"<code>{x.group()[1:-1]}</code>", line)
@@ -0,0 +1,92 @@
+from collections.abc import Iterable, Iterator
+import json
+import time
+
+from alys.token import Token
+
+
+class Stats:
+    # Counters filled in by a Lexer, SpanTransformer or render() that is
+    # given one. Without a Stats object each of them only pays for an
+    # `is not None` check per line or token.
+    def __init__(self) -> None:
+        # Classifier name -> [calls, hits].
+        self.classifiers: dict[str, list[int]] = {}
+        self.stage_seconds: dict[str, float] = {}
+        self.span_tokens = 0
+        # Span transformer passes until the fixpoint -> tokens.
+        self.span_passes: dict[int, int] = {}
+        self.tags: dict[str, int] = {}
+        # Limits name -> lines or tokens degraded by it, see alys.limits.
+        self.limits: dict[str, int] = {}
+        self.stage: str | None = None
+        self.since = 0.0
+
+    def classify(self, name: str, hit: bool) -> None:
+        counts = self.classifiers.get(name)
+        if counts is None:
+            counts = self.classifiers[name] = [0, 0]
+        counts[0] += 1
+        counts[1] += hit
+
+    def span_token(self, passes: int) -> None:
+        self.span_tokens += 1
+        self.span_passes[passes] = self.span_passes.get(passes, 0) + 1
+
+    def limit(self, name: str) -> None:
+        self.limits[name] = self.limits.get(name, 0) + 1
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def enter(self, stage: str | None) -> str | None:
+        # Charge the time since the last switch to the running stage and
+        # make `stage` the running one.
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.add_time(self.stage, now - self.since)
+        self.since = now
+        previous = self.stage
+        self.stage = stage
+        return previous
+
+    def time_stage(self, stage: str, items: Iterable) -> Iterator:
+        # Pipeline stages pull from each other, so the time spent in an
+        # upstream stage is paused out of the downstream one.
+        iterator = iter(items)
+        while True:
+            outer = self.enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.enter(outer)
+            yield item
+
+    def count_tags(self, tokens: Iterable[Token]) -> Iterator[Token]:
+        tags = self.tags
+        for token in tokens:
+            tags[token.tag.name] = tags.get(token.tag.name, 0) + 1
+            yield token
+
+    def as_dict(self) -> dict:
+        passes = sum(count * n for n, count in self.span_passes.items())
+        return {
+            "classifiers": {
+                name: {"calls": calls, "hits": hits, "hit_rate": hits / calls if calls else 0.0}
+                for name, (calls, hits) in self.classifiers.items()
+            },
+            "stages": dict(self.stage_seconds),
+            "spans": {
+                "tokens": self.span_tokens,
+                "passes": passes,
+                "max_passes": max(self.span_passes, default=0),
+                "histogram": {str(n): self.span_passes[n] for n in sorted(self.span_passes)},
+            },
+            "tags": dict(self.tags),
+            "limits": dict(self.limits),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.as_dict(), **kwargs)
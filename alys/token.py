@@ -26,12 +26,67 @@ Tag = Enum(
 
 
 class Token:
-    def __init__(self, tag: Tag, content: str = "") -> None:
+    # Nesting level of a BLOCKQUOTE or LI token, starting at 1, and whether
+    # an LI is in an ordered list. 0 and False for the other tags.
+    depth = 0
+    ordered = False
+    # The content with its spans rendered, set by
+    # SpanTransformer.transform_spans along with the content itself, so
+    # that it is not escaped or transformed again.
+    html = None
+
+    def __init__(self, tag: Tag, content: str = "", depth: int = 0, ordered: bool = False) -> None:
         self.tag = tag
         self.content = content
+        if depth:
+            self.depth = depth
+        if ordered:
+            self.ordered = ordered
 
     def __str__(self) -> str:
         content = ""
         if len(self.content):
             content = f"({self.content})"
-        return f"{str(self.tag)}{content}"
+        depth = ""
+        if self.depth:
+            depth = f"[{self.depth}, ordered]" if self.ordered else f"[{self.depth}]"
+        return f"{str(self.tag)}{depth}{content}"
+
+
+class MappedToken(Token):
+    # Content is a (start, end) span of a UTF-8 buffer, usually a memory
+    # mapped file, decoded on first read. Multi-line blocks are contiguous
+    # in the buffer, so extending one only moves the end of the span.
+    def __init__(self, tag: Tag, buffer: memoryview, start: int | None = None, end: int | None = None) -> None:
+        self.tag = tag
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.decoded = None
+
+    def extend(self, start: int, end: int) -> None:
+        if self.start is None:
+            self.start = start
+        self.end = end
+        self.decoded = None
+
+    def has_lines(self) -> bool:
+        return self.start is not None or self.decoded is not None
+
+    @property
+    def content(self) -> str:
+        if self.decoded is None:
+            content = ""
+            if self.start is not None:
+                content = str(self.buffer[self.start:self.end], "utf-8")
+                if "\r" in content:
+                    content = content.replace("\r\n", "\n")
+            self.decoded = content
+        return self.decoded
+
+    @content.setter
+    def content(self, content: str) -> None:
+        self.decoded = content
+        self.buffer = None
+        self.start = None
+        self.end = None
@@ -0,0 +1,171 @@
+from collections.abc import Iterable, Iterator
+import io
+from itertools import accumulate
+import re
+from typing import BinaryIO
+
+from alys.token import Token
+from alys.token_store import tags_by_value
+
+# A token stream is the magic bytes and the format version, then blocks of
+# up to block_tokens tokens, then a block of zero tokens. A block is:
+#
+#   varint token count
+#   three varints, the byte sizes of the nesting, lengths and payload
+#     sections
+#   one byte per token: the tag value, plus nested_flag if the token has a
+#     depth, which is then the next varint (depth << 1 | ordered) of the
+#     nesting section
+#   nesting section
+#   lengths section: one varint per token, its content length in characters
+#   payload section: the contents of the block's tokens as one UTF-8 string
+#
+# Sections are decoded in a few C calls per block instead of per token.
+magic = b"ALYT"
+format_version = 1
+block_tokens = 4096
+nested_flag = 0x80
+
+# Tag of every tag byte, with or without nested_flag.
+tags_by_byte = [tags_by_value.get(value & ~nested_flag) for value in range(256)]
+nested_pattern = re.compile(rb"[\x80-\xff]")
+
+
+def dump_tokens(tokens: Iterable[Token], file: BinaryIO) -> None:
+    # Writes the tokens to a binary file-like object, one block at a time.
+    file.write(magic + bytes([format_version]))
+    block = []
+    for token in tokens:
+        block.append(token)
+        if len(block) == block_tokens:
+            file.write(encode_block(block))
+            block.clear()
+    if block:
+        file.write(encode_block(block))
+    file.write(b"\x00")
+
+
+def dumps_tokens(tokens: Iterable[Token]) -> bytes:
+    out = io.BytesIO()
+    dump_tokens(tokens, out)
+    return out.getvalue()
+
+
+def iter_load_tokens(file: BinaryIO) -> Iterator[Token]:
+    # Reads the tokens written by dump_tokens, one block at a time.
+    header = file.read(len(magic) + 1)
+    if len(header) != len(magic) + 1 or header[:len(magic)] != magic:
+        raise ValueError(f"expected an alys token stream, got {header!r}")
+    if header[len(magic)] != format_version:
+        raise ValueError(f"expected token format version {format_version}, got {header[len(magic)]}")
+    while True:
+        count = read_varint(file)
+        if count == 0:
+            return
+        sizes = [read_varint(file) for _ in range(3)]
+        data = read_exact(file, count + sum(sizes))
+        yield from decode_block(data, count, *sizes)
+
+
+def load_tokens(file: BinaryIO) -> list[Token]:
+    return list(iter_load_tokens(file))
+
+
+def loads_tokens(data: bytes) -> list[Token]:
+    return load_tokens(io.BytesIO(data))
+
+
+def encode_block(tokens: list[Token]) -> bytes:
+    tags = bytearray()
+    nesting = bytearray()
+    lengths = bytearray()
+    contents = []
+    for token in tokens:
+        content = token.content
+        contents.append(content)
+        if token.depth:
+            tags.append(token.tag.value | nested_flag)
+            write_varint(nesting, token.depth << 1 | token.ordered)
+        else:
+            tags.append(token.tag.value)
+        if len(content) < 0x80:
+            lengths.append(len(content))
+        else:
+            write_varint(lengths, len(content))
+    payload = "".join(contents).encode("utf-8", "surrogatepass")
+    header = bytearray()
+    for value in [len(tokens), len(nesting), len(lengths), len(payload)]:
+        write_varint(header, value)
+    return b"".join([header, tags, nesting, lengths, payload])
+
+
+def decode_block(data: bytes, count: int, nesting_size: int, lengths_size: int, payload_size: int) -> list[Token]:
+    tags = data[:count]
+    position = count
+    nesting = read_varints(data[position:position + nesting_size])
+    position += nesting_size
+    lengths = read_varints(data[position:position + lengths_size])
+    position += lengths_size
+    text = str(data[position:position + payload_size], "utf-8", "surrogatepass")
+    if len(lengths) != count or position + payload_size != len(data):
+        raise ValueError(f"expected a block of {count} tokens, got {len(lengths)} lengths")
+
+    # Contents are sliced and tokens built by map() in C.
+    ends = list(accumulate(lengths))
+    contents = map(text.__getitem__, map(slice, [0, *ends], ends))
+    token_tags = map(tags_by_byte.__getitem__, tags)
+    if not nesting:
+        return list(map(Token, token_tags, contents))
+    depths = [0] * count
+    ordered = [False] * count
+    for match, nested in zip(nested_pattern.finditer(tags), nesting):
+        depths[match.start()] = nested >> 1
+        ordered[match.start()] = nested & 1 == 1
+    return list(map(Token, token_tags, contents, depths, ordered))
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varints(data: bytes) -> list[int]:
+    # Lengths are mostly below 128, then every byte is a whole varint.
+    if not data or max(data) < 0x80:
+        return list(data)
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = 0
+            shift = 0
+    if shift:
+        raise ValueError("expected a complete varint, got the end of a section")
+    return values
+
+
+def read_varint(file: BinaryIO) -> int:
+    value = 0
+    shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            raise ValueError("expected a varint, got the end of the token stream")
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def read_exact(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError(f"expected {size} more bytes, got the end of the token stream after {len(data)}")
+    return data
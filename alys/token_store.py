@@ -0,0 +1,163 @@
+from array import array
+from collections.abc import Iterator
+
+from alys.token import Tag, Token
+
+tags_by_value = {tag.value: tag for tag in Tag}
+
+
+class TokenView:
+    __slots__ = ("store", "index", "html")
+
+    def __init__(self, store: "TokenStore", index: int) -> None:
+        self.store = store
+        self.index = index
+        # Not stored, like Token.html it only lives on this object.
+        self.html = None
+
+    @property
+    def tag(self) -> Tag:
+        return tags_by_value[self.store.tags[self.index]]
+
+    @tag.setter
+    def tag(self, tag: Tag) -> None:
+        self.store.tags[self.index] = tag.value
+
+    @property
+    def content(self) -> str:
+        return self.store.strings[self.store.contents[self.index]]
+
+    @content.setter
+    def content(self, content: str) -> None:
+        store = self.store
+        previous = store.contents[self.index]
+        store.contents[self.index] = store.intern(content)
+        store.release(previous)
+
+    @property
+    def depth(self) -> int:
+        return self.store.depths[self.index]
+
+    @depth.setter
+    def depth(self, depth: int) -> None:
+        self.store.depths[self.index] = depth
+
+    @property
+    def ordered(self) -> bool:
+        return bool(self.store.ordered[self.index])
+
+    @ordered.setter
+    def ordered(self, ordered: bool) -> None:
+        self.store.ordered[self.index] = ordered
+
+    __str__ = Token.__str__
+
+
+class TokenStore:
+    # Struct of arrays: one byte per tag, one string table index per
+    # content, one depth and one byte for the list kind. Tokens without
+    # content, like Tag.EMPTY, cost ten bytes.
+    # Views index into the store, deleting tokens shifts the views of the
+    # tokens after them, slices return detached Token copies.
+    # Strings are counted by the tokens using them and dropped from the
+    # table with the last one, so a store that is drained or rewritten
+    # only holds the strings of the tokens it still has.
+    def __init__(self) -> None:
+        self.tags = array("B")
+        self.contents = array("I")
+        self.depths = array("I")
+        self.ordered = array("B")
+        self.strings: list[str | None] = [""]
+        self.string_ids = {"": 0}
+        self.string_refs = array("I", [0])
+        self.free_ids: list[int] = []
+
+    def intern(self, content: str) -> int:
+        # The id of `content`, counting one more token using it. The empty
+        # string is id 0 and never dropped.
+        string_id = self.string_ids.get(content)
+        if string_id is None:
+            if self.free_ids:
+                string_id = self.free_ids.pop()
+                self.strings[string_id] = content
+                self.string_refs[string_id] = 0
+            else:
+                string_id = len(self.strings)
+                self.strings.append(content)
+                self.string_refs.append(0)
+            self.string_ids[content] = string_id
+        if string_id:
+            self.string_refs[string_id] += 1
+        return string_id
+
+    def release(self, string_id: int) -> None:
+        if not string_id:
+            return
+        refs = self.string_refs[string_id] - 1
+        self.string_refs[string_id] = refs
+        if not refs:
+            del self.string_ids[self.strings[string_id]]
+            self.strings[string_id] = None
+            self.free_ids.append(string_id)
+
+    def append(self, token: Token) -> None:
+        self.tags.append(token.tag.value)
+        self.contents.append(self.intern(token.content))
+        self.depths.append(token.depth)
+        self.ordered.append(token.ordered)
+
+    def token(self, index: int) -> Token:
+        return Token(
+            tags_by_value[self.tags[index]], self.strings[self.contents[index]],
+            self.depths[index], bool(self.ordered[index]),
+        )
+
+    def clear(self) -> None:
+        self.tags = array("B")
+        self.contents = array("I")
+        self.depths = array("I")
+        self.ordered = array("B")
+        self.strings = [""]
+        self.string_ids = {"": 0}
+        self.string_refs = array("I", [0])
+        self.free_ids = []
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def __iter__(self) -> Iterator[TokenView]:
+        for index in range(len(self.tags)):
+            yield TokenView(self, index)
+
+    def __getitem__(self, index: int | slice) -> TokenView | list[Token]:
+        if isinstance(index, slice):
+            return [self.token(i) for i in range(*index.indices(len(self.tags)))]
+        return TokenView(self, self.position(index))
+
+    def __setitem__(self, index: int, token: Token) -> None:
+        index = self.position(index)
+        self.tags[index] = token.tag.value
+        previous = self.contents[index]
+        self.contents[index] = self.intern(token.content)
+        self.release(previous)
+        self.depths[index] = token.depth
+        self.ordered[index] = token.ordered
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            for string_id in self.contents[index]:
+                self.release(string_id)
+        else:
+            self.release(self.contents[self.position(index)])
+        del self.tags[index]
+        del self.contents[index]
+        del self.depths[index]
+        del self.ordered[index]
+
+    def position(self, index: int) -> int:
+        size = len(self.tags)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"token index out of range, got {index}")
+        return index
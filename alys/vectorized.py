@@ -0,0 +1,220 @@
+import io
+
+from alys.token import Tag
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Line labels. Apart from lines in an open fence, a labelled line is lexed
+# the same way whatever came before it, so its handler is called directly.
+# AMBIGUOUS lines go through Lexer.lex.
+AMBIGUOUS, BLANK, FENCE, BLOCKQUOTE, SETEXT, LIST, TEXT = range(7)
+
+# Labelling the lines costs about as much as lex() saves on the lines it
+# does not have to classify, the gain is in adding the lines of fenced code
+# in bulk. lex_bytes takes the array path from this share of lines inside
+# fences on, see benchmarks/bench_vectorized.py.
+min_fenced_share = 0.8
+
+# Characters str.isspace() accepts below 128.
+ascii_whitespace = b" \t\n\x0b\x0c\r\x1c\x1d\x1e\x1f"
+# First characters lex() does not send straight to lex_text.
+special_first = b"#>`-*_.0123456789"
+# Underlines made of these are matched by is_blockquote or is_atx first,
+# "```" is labelled a fence below.
+not_setext_first = b"#>"
+
+
+def table(characters: bytes):
+    flags = numpy.zeros(256, dtype=bool)
+    flags[list(characters)] = True
+    return flags
+
+
+def classify_lines(data: bytes) -> tuple[list[int], list[int], list[int]]:
+    # Character offsets of the start and end of every line (without "\n" or
+    # "\r\n") and its label, computed with array operations over the bytes.
+    if numpy is None:
+        raise ImportError("classify_lines needs numpy")
+    starts, ends, labels, _, _ = label_lines(data)
+    return starts.tolist(), ends.tolist(), labels.tolist()
+
+
+def label_lines(data: bytes) -> tuple:
+    # classify_lines as arrays, plus the lines that close a fence and the
+    # paragraph lines that do not end in a hard break.
+    array = numpy.frombuffer(data, dtype=numpy.uint8)
+    size = len(array)
+    index = numpy.int32 if size < 2**31 else numpy.int64
+    whitespace = table(ascii_whitespace)
+
+    newlines = numpy.flatnonzero(array == 10)
+    starts = numpy.concatenate(([0], newlines + 1)).astype(index)
+    ends = numpy.concatenate((newlines, [size])).astype(index)
+    padded = numpy.concatenate((array, numpy.zeros(3, dtype=numpy.uint8))).astype(numpy.int16)
+    ends -= (ends > starts) & (padded[ends - 1] == 13)
+    lengths = ends - starts
+
+    def byte_at(offset: int):
+        return numpy.where(lengths > offset, padded[starts + offset], -1)
+
+    first, second, third = byte_at(0), byte_at(1), byte_at(2)
+    ascii_first = (first >= 0) & (first < 128) & ~whitespace[first]
+
+    # A setext underline is one character repeated, then only whitespace:
+    # no other non-space character and no whitespace before the character
+    # comes back. Only lines whose second character allows that are checked,
+    # byte by byte.
+    setext = ascii_first & ~table(not_setext_first)[first] & ((second == first) | (second < 0) | whitespace[second])
+    candidates = numpy.flatnonzero(setext)
+    if len(candidates):
+        candidate_starts = starts[candidates]
+        candidate_lengths = lengths[candidates]
+        offsets = numpy.cumsum(candidate_lengths, dtype=index) - candidate_lengths
+        positions = numpy.arange(candidate_lengths.sum(), dtype=index)
+        positions += numpy.repeat(candidate_starts - offsets, candidate_lengths)
+        line_bytes = array[positions]
+        line_first = numpy.repeat(first[candidates], candidate_lengths)
+        other = (line_bytes != line_first) & ~whitespace[line_bytes]
+        gap = numpy.zeros(len(positions), dtype=bool)
+        gap[1:] = whitespace[line_bytes[:-1]] & (line_bytes[1:] == line_first[1:])
+        gap[offsets[offsets < len(positions)]] = False
+        bad = numpy.concatenate(([0], numpy.cumsum(other | gap, dtype=index)))
+        setext[candidates] = bad[offsets + candidate_lengths] == bad[offsets]
+
+    marker = (first == ord("-")) | (first == ord("*"))
+    listed = marker & (second == ord(" ")) & (third >= 0) & (third < 128) & ~whitespace[third]
+    text = (
+        ascii_first & ~table(special_first)[first]
+        & (second >= 0) & (second < 128) & ~whitespace[second] & (second != first)
+    )
+
+    labels = numpy.full(len(starts), AMBIGUOUS, dtype=numpy.uint8)
+    labels[text] = TEXT
+    labels[listed] = LIST
+    labels[setext] = SETEXT
+    labels[first == ord(">")] = BLOCKQUOTE
+    labels[(first == ord("`")) & (second == ord("`")) & (third == ord("`"))] = FENCE
+    labels[lengths == 0] = BLANK
+
+    # Nothing follows the final newline.
+    if starts[-1] == size:
+        starts, ends, labels, lengths = starts[:-1], ends[:-1], labels[:-1], lengths[:-1]
+
+    closing = (labels == FENCE) & (lengths == 3)
+    lines_from_text = (labels == TEXT) & ~((lengths >= 2) & (padded[ends - 1] == 32) & (padded[ends - 2] == 32))
+
+    if not data.isascii():
+        characters = numpy.concatenate(([0], numpy.cumsum((array & 0xC0) != 0x80, dtype=index)))
+        starts, ends = characters[starts], characters[ends]
+    return starts, ends, labels, closing, lines_from_text
+
+
+def has_lone_cr(data: bytes) -> bool:
+    # Whether a "\r" not followed by "\n" ends a line, as it does when a
+    # file is read in text mode. The byte paths only split on "\n". Takes
+    # bytes or an mmap, which has find but not count.
+    i = data.find(b"\r")
+    while i != -1:
+        if data[i + 1:i + 2] != b"\n":
+            return True
+        i = data.find(b"\r", i + 2)
+    return False
+
+
+def fenced_share(data: bytes) -> float:
+    # The share of the lines of `data` between an opening and a closing
+    # fence, found with bytes.find. Indented code blocks and blockquotes
+    # are not told apart from the rest, it is only an estimate.
+    if data.startswith(b"```"):
+        # The newline before the first line.
+        opening = -1
+    else:
+        opening = data.find(b"\n```")
+        if opening == -1:
+            return 0.0
+    inside = 0
+    while True:
+        start = data.find(b"\n", opening + 1)
+        if start == -1:
+            break
+        # The next line that is "```" alone closes the fence.
+        closing = data.find(b"\n```", start)
+        while closing != -1 and data[closing + 4:closing + 5] not in (b"", b"\n", b"\r"):
+            closing = data.find(b"\n```", closing + 1)
+        if closing == -1:
+            inside += data.count(b"\n", start, len(data) - 1)
+            break
+        inside += data.count(b"\n", start, closing)
+        opening = data.find(b"\n```", closing + 1)
+        if opening == -1:
+            break
+    return inside / (data.count(b"\n") + (not data.endswith(b"\n")))
+
+
+def split_lines(text: str) -> list[str]:
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line[:-1] if line.endswith("\r") else line for line in lines]
+
+
+def lex_bytes(lexer, data: bytes) -> None:
+    # Lines are split like Lexer.lex_file splits them. Without numpy, while
+    # classifier calls are counted or with less than min_fenced_share of
+    # the lines in fenced code, every line goes through lex().
+    text = str(data, "utf-8")
+    if has_lone_cr(data):
+        for line in io.StringIO(text, newline=None):
+            lexer.lex(line)
+        return
+    if numpy is None or lexer.stats is not None or fenced_share(data) < min_fenced_share:
+        for line in split_lines(text):
+            lexer.lex(line)
+        return
+
+    starts, ends, labels, closing, lines_from_text = label_lines(data)
+    count = len(labels)
+    # For every line, the next line that closes a fence and the end of the
+    # run of hard break free paragraph lines it starts. Both runs are added
+    # to the open block at once.
+    positions = numpy.arange(count)
+    closes = numpy.append(numpy.flatnonzero(closing), count)
+    next_close = closes[numpy.searchsorted(closes, positions)].tolist()
+    breaks = numpy.append(numpy.flatnonzero(~lines_from_text), count)
+    run_end = breaks[numpy.searchsorted(breaks, positions)].tolist()
+    starts, ends, labels = starts.tolist(), ends.tolist(), labels.tolist()
+
+    handlers = [
+        lexer.lex,
+        lexer.handle_empty,
+        lexer.handle_code_block,
+        lexer.handle_blockquote,
+        lexer.handle_setext_heading,
+        lexer.handle_list,
+        lexer.paragraph,
+    ]
+    tokens = lexer.tokens
+    first_line = lexer.line_count
+    i = 0
+    while i < count:
+        if lexer.block_lines is not None and tokens[-1].tag == Tag.BACKTICKCODE:
+            # An open fence takes every line up to the closing one.
+            end = next_close[i]
+            lexer.extend_block_lines([text[starts[j]:ends[j]] for j in range(i, end)])
+            if end < count:
+                lexer.close_block()
+            i = end + 1
+            continue
+
+        # lex() counts its line, the other handlers do not.
+        lexer.line_count = first_line + i + (labels[i] != AMBIGUOUS)
+        handlers[labels[i]](text[starts[i]:ends[i]])
+        i += 1
+        if i < count and lexer.block_lines is not None and tokens[-1].tag == Tag.P:
+            end = run_end[i]
+            lexer.extend_block_lines([text[starts[j]:ends[j]] for j in range(i, end)])
+            i = end
+    lexer.line_count = first_line + count
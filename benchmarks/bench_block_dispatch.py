@@ -0,0 +1,107 @@
+"""Tokens rendered per second by BlockTransformer.
+
+Run from the repository root:
+
+    python benchmarks/bench_block_dispatch.py
+
+Compares the dispatch table against the previous way of rendering, which
+called every handle_* method for every token and compared the tag in each.
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.token import Tag, Token
+
+TAGS = [
+    Tag.P, Tag.P, Tag.P, Tag.EMPTY, Tag.EMPTY, Tag.LI, Tag.LI, Tag.H2, Tag.H3,
+    Tag.INDENTEDCODE, Tag.BACKTICKCODE, Tag.BLOCKQUOTE, Tag.HR, Tag.IDENT, Tag.BR,
+]
+
+
+class ChainedBlockTransformer(BlockTransformer):
+    def render_block(self, token: Token) -> str | None:
+        for handler in [
+            self.chained_heading,
+            self.chained_paragraph,
+            self.chained_code_block,
+            self.chained_blockquote,
+            self.chained_hr,
+            self.chained_list,
+        ]:
+            html = handler(token)
+            if html is not None:
+                return html
+        return None
+
+    def iter_html(self, tokens):
+        for token in tokens:
+            html = self.render_block(token)
+            if html is not None:
+                yield html
+
+    def chained_list(self, token):
+        if token.tag == Tag.LI:
+            return f"<li>{token.content}</li>"
+
+    def chained_hr(self, token):
+        if token.tag == Tag.HR:
+            return "<hr>"
+
+    def chained_blockquote(self, token):
+        if token.tag == Tag.BLOCKQUOTE:
+            return f"<blockquote>{token.content}</blockquote>"
+
+    def chained_code_block(self, token):
+        if token.tag == Tag.INDENTEDCODE or token.tag == Tag.BACKTICKCODE:
+            return f"<pre><code>{token.content}</code></pre>"
+
+    def chained_paragraph(self, token):
+        if token.tag == Tag.P:
+            return f"<p>{token.content}</p>"
+
+    def chained_heading(self, token):
+        if token.tag == Tag.H1:
+            return f"<h1>{token.content}</h1>"
+        if token.tag == Tag.H2:
+            return f"<h2>{token.content}</h2>"
+        if token.tag == Tag.H3:
+            return f"<h3>{token.content}</h3>"
+        if token.tag == Tag.H4:
+            return f"<h4>{token.content}</h4>"
+        if token.tag == Tag.H5:
+            return f"<h5>{token.content}</h5>"
+        if token.tag == Tag.H6:
+            return f"<h6>{token.content}</h6>"
+
+
+def tokens(count: int, seed: int = 0) -> list[Token]:
+    rng = random.Random(seed)
+    return [Token(rng.choice(TAGS), "content") for _ in range(count)]
+
+
+def tokens_per_second(transformer: BlockTransformer, sample: list[Token]) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in transformer.iter_html(sample):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return len(sample) / best
+
+
+def main():
+    sample = tokens(500_000)
+    for name, transformer in [
+        ("chained handlers", ChainedBlockTransformer(Lexer(), escape=False)),
+        ("dispatch table", BlockTransformer(Lexer(), escape=False)),
+    ]:
+        print(f"{name:<17} {tokens_per_second(transformer, sample) / 1e6:6.2f} M tokens/s")
+
+
+if __name__ == "__main__":
+    main()
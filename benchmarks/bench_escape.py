@@ -0,0 +1,84 @@
+"""Cost of HTML escaping on end-to-end rendering.
+
+Run from the repository root:
+
+    python benchmarks/bench_escape.py
+
+Renders the same generated document with escaping turned on and off and
+prints the overhead, which should stay under 10%. It also compares escaping
+strategies on code-heavy content, which is why the escaping stage uses the
+`html.escape` replace chain rather than a `str.translate` table: `replace`
+runs at memchr speed when a character is absent, while `translate` looks up
+every character and is an order of magnitude slower on markup-dense text.
+Text content is escaped without quotes, so the span patterns do not have to
+scan longer strings.
+"""
+import html
+import random
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer
+
+# Prose with about one escapable character per line, code blocks full of them.
+WORDS = [
+    "the", "lexer", "renders", "markdown", "blocks", "and", "spans", "into", "html",
+    "with", "*emphasis*", "`code`", "a", "few", "words", "per", "line", "<tag>", "it's",
+]
+
+
+def document(blocks: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(blocks):
+        if i % 4 == 0:
+            lines.append("```")
+            lines.extend(f"if (a < b && c > {j}) {{ return \"x\"; }}" for j in range(8))
+            lines.append("```")
+        else:
+            lines.extend(" ".join(rng.choice(WORDS) for _ in range(14)) for _ in range(3))
+        lines.append("")
+    return lines
+
+
+def render(lines: list[str], escape: bool) -> str:
+    l = Lexer()
+    s = SpanTransformer(l, escape=escape)
+    b = BlockTransformer(l, escape=escape)
+    return "\n".join(b.iter_html(s.iter_spans(l.iter_tokens(lines))))
+
+
+def cpu_time(f) -> float:
+    start = time.process_time()
+    f()
+    return time.process_time() - start
+
+
+def main():
+    lines = document(5_000)
+    raw = escaped = float("inf")
+    for _ in range(10):
+        raw = min(raw, cpu_time(lambda: render(lines, escape=False)))
+        escaped = min(escaped, cpu_time(lambda: render(lines, escape=True)))
+    print(f"end to end, {len(lines)} lines")
+    print(f"  escape off  {raw * 1000:8.1f} ms")
+    print(f"  escape on   {escaped * 1000:8.1f} ms")
+    print(f"  overhead    {(escaped / raw - 1) * 100:8.1f} %")
+
+    table = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+    code = "\n".join(lines)
+    print(f"escaping {len(code)} characters")
+    for name, f in [
+        ("html.escape", lambda: html.escape(code, quote=False)),
+        ("str.translate", lambda: code.translate(table)),
+    ]:
+        print(f"  {name:<14}{timeit.timeit(f, number=10) / 10 * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Lexing a large file line by line against Lexer.lex_file.
+
+Run from the repository root:
+
+    python benchmarks/bench_lex_file.py [MEGABYTES]
+
+Writes a generated markdown file (64 MB by default) and lexes it in a fresh
+process per mode, so that the reported memory belongs to that mode alone.
+Rendering is not included: lex_file only decodes content when it is read.
+Pages of the mapped file show up in RSS as file-backed memory, which the
+kernel can drop at any time, so anonymous RSS (Python objects) is reported
+separately, from /proc/self/status where available.
+"""
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+from alys.lexer import Lexer
+
+
+def write_document(path: str, megabytes: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    words = ["archival", "export", "of", "the", "records", "with", "notes", "and", "dates"]
+    size = megabytes * 2**20
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            chunk = []
+            for _ in range(rng.randint(2, 6)):
+                chunk.append(" ".join(rng.choice(words) for _ in range(12)))
+            chunk.append("")
+            if rng.random() < 0.3:
+                chunk.append("```")
+                chunk.extend(f"record {rng.randint(0, 10**6)} = {{}}" for _ in range(rng.randint(5, 40)))
+                chunk.append("```")
+                chunk.append("")
+            text = "\n".join(chunk) + "\n"
+            f.write(text)
+            written += len(text)
+
+
+def run(mode: str, path: str) -> None:
+    start = time.perf_counter()
+    l = Lexer()
+    if mode == "lines":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                l.lex(line)
+    else:
+        l.lex_file(path)
+    count = len(l.get_tokens())
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    anonymous = "n/a"
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    anonymous = f"{int(line.split()[1]) / 1024:7.1f} MiB"
+    print(f"{mode:<9} {count} tokens  {elapsed:6.2f} s  peak RSS {peak:7.1f} MiB  anonymous RSS {anonymous}")
+
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        return
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    fd, path = tempfile.mkstemp(suffix=".md")
+    os.close(fd)
+    try:
+        write_document(path, megabytes)
+        print(f"{megabytes} MB document")
+        for mode in ["lines", "lex_file"]:
+            subprocess.run([sys.executable, __file__, mode, path], check=True)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Throughput of lex_parallel on one large file for 1 to 8 worker processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_lex_parallel.py [MEGABYTES]
+
+Writes a synthetic document of about MEGABYTES (default 64) to a temporary
+file and compares lexing its lines with a single Lexer against
+alys.parallel_lexer.lex_parallel. Scaling is bounded by the cores of the
+machine, see os.cpu_count().
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.lexer import Lexer
+from alys.parallel_lexer import lex_parallel
+from corpus import generate
+
+
+def lex_sequential(path: str) -> int:
+    lexer = Lexer()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            lexer.lex(line)
+    return len(lexer.get_tokens())
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    text = "\n".join(generate("huge", 1_000)) + "\n"
+    fd, path = tempfile.mkstemp(suffix=".md")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for _ in range(max(megabytes * 1_000_000 // len(text), 1)):
+                f.write(text)
+        size = os.path.getsize(path)
+        print(f"{size / 1e6:.0f} MB, {os.cpu_count()} cores")
+
+        start = time.perf_counter()
+        want = lex_sequential(path)
+        sequential = time.perf_counter() - start
+        print(f"single Lexer   {size / 1e6 / sequential:6.1f} MB/s")
+
+        for jobs in [1, 2, 4, 8]:
+            start = time.perf_counter()
+            tokens = lex_parallel(path, jobs=jobs)
+            seconds = time.perf_counter() - start
+            assert len(tokens) == want
+            print(f"{jobs} jobs         {size / 1e6 / seconds:6.1f} MB/s ({sequential / seconds:.1f}x)")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
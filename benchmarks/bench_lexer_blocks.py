@@ -0,0 +1,55 @@
+"""Lexing time of a single block as the block grows.
+
+Run from the repository root:
+
+    python benchmarks/bench_lexer_blocks.py
+
+Every block kind should show a roughly constant time per line; a time per
+line that grows with the block length means accumulation went quadratic.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.lexer import Lexer
+
+SIZES = [1_000, 10_000, 50_000, 100_000]
+
+
+def fenced_block(n: int) -> list[str]:
+    return ["```"] + [f"let x{i} = {i};" for i in range(n)] + ["```"]
+
+
+def indented_block(n: int) -> list[str]:
+    return [f"    let x{i} = {i};" for i in range(n)]
+
+
+def paragraph(n: int) -> list[str]:
+    return [f"line {i} of a rather long paragraph" for i in range(n)]
+
+
+def time_lex(lines: list[str]) -> float:
+    start = time.perf_counter()
+    l = Lexer()
+    for line in lines:
+        l.lex(line)
+    l.get_tokens()
+    return time.perf_counter() - start
+
+
+def main():
+    for name, make in [
+        ("fenced code", fenced_block),
+        ("indented code", indented_block),
+        ("paragraph", paragraph),
+    ]:
+        print(name)
+        for n in SIZES:
+            lines = make(n)
+            elapsed = min(time_lex(lines) for _ in range(3))
+            print(f"  {n:>7} lines  {elapsed * 1000:9.2f} ms  {elapsed / n * 1e9:7.0f} ns/line")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Lines lexed per second with and without the first character dispatch.
+
+Run from the repository root:
+
+    python benchmarks/bench_lexer_dispatch.py
+
+Lexer.lex only tries the classifiers the first character of a line leaves
+possible, and for a line starting with whitespace the ones its indentation
+leaves; Lexer.lex_ordered tries all of them in turn like lex() used to.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.lexer import Lexer
+from corpus import generate
+
+repeat = 9
+
+
+def lex_time(method: str, lines: list[str]) -> float:
+    lexer = Lexer()
+    lex = getattr(lexer, method)
+    start = time.perf_counter()
+    for line in lines:
+        lex(line)
+    return time.perf_counter() - start
+
+
+def main():
+    # The two methods take turns, so a slow stretch of a noisy machine
+    # does not fall on one of them only.
+    for name in ["prose", "span_heavy", "deep_lists", "code_fences"]:
+        lines = generate(name, 50_000)
+        best = {"lex_ordered": float("inf"), "lex": float("inf")}
+        for _ in range(repeat):
+            for method in best:
+                best[method] = min(best[method], lex_time(method, lines))
+        ordered = len(lines) / best["lex_ordered"]
+        dispatched = len(lines) / best["lex"]
+        print(
+            f"{name:<12} every classifier {ordered / 1e6:5.2f} M lines/s, "
+            f"first character {dispatched / 1e6:5.2f} M lines/s ({dispatched / ordered:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Adversarial documents rendered with and without alys.limits.untrusted.
+
+Run from the repository root:
+
+    python benchmarks/bench_limits.py
+
+Every input is pathological markdown for one part of the renderer, at two
+sizes four times apart. For each one prints the render time without
+limits and with the untrusted limits, and how much longer the large input
+took than the small one: about 4x is linear, about 16x is quadratic.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import render
+from alys.limits import untrusted
+
+sizes = [4_000, 16_000]
+
+
+def stars(size: int) -> list[str]:
+    return ["a *" * (size // 3)]
+
+
+def underscores(size: int) -> list[str]:
+    return ["a _" * (size // 3)]
+
+
+def brackets(size: int) -> list[str]:
+    return ["[a" * (size // 2)]
+
+
+def bracket_paragraph(size: int) -> list[str]:
+    return ["[a" * 750] * (size // 500)
+
+
+def nested_spans(size: int) -> list[str]:
+    return ["**" * (size // 4) + "x" + "**" * (size // 4)]
+
+
+def blockquotes(size: int) -> list[str]:
+    return [">" * (size * 25) + " x", "text"] * 2
+
+
+def lists(size: int) -> list[str]:
+    return [" " * (2 * (i % 200)) + "- x" for i in range(size // 10)]
+
+
+inputs = [stars, underscores, brackets, bracket_paragraph, nested_spans, blockquotes, lists]
+
+
+def best_time(lines: list[str], limits, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(lines, limits=limits)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'input':<18} {'limits':<10} {'small':>10} {'large':>10} {'growth':>7}")
+    for make in inputs:
+        small, large = make(sizes[0]), make(sizes[1])
+        for label, limits in [("none", None), ("untrusted", untrusted)]:
+            small_time = best_time(small, limits)
+            large_time = best_time(large, limits)
+            print(
+                f"{make.__name__:<18} {label:<10} {small_time * 1e3:8.2f} ms {large_time * 1e3:8.2f} ms "
+                f"{large_time / small_time:6.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
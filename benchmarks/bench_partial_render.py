@@ -0,0 +1,49 @@
+"""Excerpts of a large document with render(limit_bytes=...).
+
+Run from the repository root:
+
+    python benchmarks/bench_partial_render.py
+
+Writes a generated document of about 10 MB to a temporary file, then times
+rendering an excerpt of the first 300 bytes and of the first 10 blocks
+straight from the open file against rendering the whole file.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import render
+from corpus import generate
+
+
+def best_time(path: str, repeat: int, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            render(f, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "large.md")
+        with open(path, "w", encoding="utf-8") as f:
+            lines = generate("huge", 3_000)
+            while f.tell() < 10 * 1024 * 1024:
+                f.writelines(f"{line}\n" for line in lines)
+        print(f"document    {os.path.getsize(path) / 1e6:8.1f} MB")
+        for label, repeat, kwargs in [
+            ("300 bytes", 100, {"limit_bytes": 300}),
+            ("10 blocks", 100, {"limit_blocks": 10}),
+            ("whole file", 1, {}),
+        ]:
+            print(f"{label:<11} {best_time(path, repeat, **kwargs) * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
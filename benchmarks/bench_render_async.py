@@ -0,0 +1,69 @@
+"""Latency of small requests while a large document renders on the same loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_render_async.py
+
+A client renders a small document every millisecond while a large one is
+rendered either with alys.render, which blocks the event loop, or with
+alys.render_async. Prints the p50 and p99 latency of the small requests.
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import render, render_async
+from corpus import generate
+
+
+async def lines(items):
+    for item in items:
+        yield item
+
+
+async def small_requests(small: list[str], stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await render_async(lines(small))
+        latencies.append(time.perf_counter() - start)
+        # Latency includes the time spent waiting for the loop.
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        latencies[-1] += max(time.perf_counter() - start - 0.001, 0.0)
+    return latencies
+
+
+async def run(mode: str, large: list[str], small: list[str]) -> list[float]:
+    stop = asyncio.Event()
+    client = asyncio.create_task(small_requests(small, stop))
+    await asyncio.sleep(0.01)
+    for _ in range(3):
+        if mode == "render":
+            render(large)
+            await asyncio.sleep(0)
+        elif mode == "render_async":
+            await render_async(lines(large))
+        else:
+            await asyncio.sleep(0.1)
+    stop.set()
+    return await client
+
+
+def main():
+    large = generate("huge", 2_000)
+    small = generate("prose", 20)
+    for mode in ["idle", "render", "render_async"]:
+        latencies = sorted(asyncio.run(run(mode, large, small)))
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        print(
+            f"{mode:<13} {len(latencies):5} small requests, "
+            f"p50 {statistics.median(latencies) * 1e3:7.2f} ms, p99 {p99 * 1e3:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Peak memory and time of rendering into a string versus into a file.
+
+Run from the repository root:
+
+    python benchmarks/bench_render_to.py
+
+alys.render joins every block into one string, alys.render_to writes the
+blocks to the file as they are rendered, through a 64 KiB buffer.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import render, render_to
+from corpus import generate
+
+
+def measure(function) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    lines = generate("huge", 2_000)
+    size = sum(len(line) + 1 for line in lines)
+    fd, path = tempfile.mkstemp(suffix=".html")
+    os.close(fd)
+    try:
+        def to_string():
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(render(lines))
+
+        def to_file():
+            with open(path, "w", encoding="utf-8") as f:
+                render_to(lines, f)
+
+        print(f"{size / 1e6:.1f} MB of markdown")
+        for name, function in [("render + write", to_string), ("render_to", to_file)]:
+            seconds, peak = measure(function)
+            print(f"{name:<15} {seconds:6.2f} s, peak {peak / 1e6:7.2f} MB")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
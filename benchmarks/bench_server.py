@@ -0,0 +1,139 @@
+"""Per-document latency of `python -m alys serve` against cold runs.
+
+Run from the repository root:
+
+    python benchmarks/bench_server.py
+
+Starts a server on a temporary socket and renders generated documents of
+about 1 KB four ways: a new interpreter importing alys for every file (a
+cold run), a new `python -m alys.client` process for every file, requests
+over one open connection, and 8 clients sending requests at once. Prints
+the median latency of each, of starting an interpreter that does nothing
+for reference, the throughput of the concurrent clients and how much
+faster a client process is than a cold run.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+from alys.client import Client
+from corpus import generate
+
+cold_script = (
+    "import sys\n"
+    "from alys import render\n"
+    "with open(sys.argv[1], encoding='utf-8') as f:\n"
+    "    sys.stdout.write(render(f))\n"
+)
+
+
+def documents(count: int) -> list[str]:
+    # Consecutive lines of the prose corpus cut into pieces of about 1 KB.
+    docs, current = [], []
+    size = 0
+    for line in generate("prose", count * 40):
+        current.append(line)
+        size += len(line) + 1
+        if size >= 1024:
+            docs.append("\n".join(current) + "\n")
+            current, size = [], 0
+            if len(docs) == count:
+                break
+    return docs
+
+
+def latencies(run, items) -> list[float]:
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        run(item)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def process(args: list[str], env: dict[str, str]):
+    def run(path: str) -> None:
+        subprocess.run(args + [path], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    return run
+
+
+def wait_for(path: str, server: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("the server exited")
+        try:
+            Client(path).close()
+            return
+        except OSError:
+            time.sleep(0.01)
+    raise RuntimeError(f"no server answered on {path}")
+
+
+def main():
+    docs = documents(400)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i, doc in enumerate(docs[:40]):
+            path = os.path.join(directory, f"doc{i}.md")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(doc)
+            paths.append(path)
+        socket_path = os.path.join(directory, "alys.sock")
+        env = dict(os.environ, PYTHONPATH=str(root))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "alys", "serve", "--socket", socket_path], env=env, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for(socket_path, server)
+            bare = latencies(process([sys.executable, "-c", "pass"], env), paths)
+            cold = latencies(process([sys.executable, "-c", cold_script], env), paths)
+            client = latencies(process([sys.executable, "-m", "alys.client", "--socket", socket_path], env), paths)
+            with Client(socket_path) as connection:
+                latencies(connection.render, docs[:50])
+                warm = latencies(connection.render, docs)
+
+            concurrent: list[float] = []
+
+            def run_client():
+                with Client(socket_path) as connection:
+                    times = latencies(connection.render, docs)
+                concurrent.extend(times)
+
+            threads = [threading.Thread(target=run_client) for _ in range(8)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"document size          {statistics.mean(map(len, docs)):8.0f} bytes")
+    for label, times in [
+        ("bare interpreter", bare),
+        ("cold interpreter", cold),
+        ("client process", client),
+        ("open connection", warm),
+        ("8 concurrent clients", concurrent),
+    ]:
+        print(f"{label:<22} {statistics.median(times) * 1e3:8.3f} ms/doc")
+    print(f"concurrent throughput  {len(concurrent) / elapsed:8.0f} docs/s")
+    # What a git hook or editor gains by sending each file through the client
+    # instead of running alys in a new interpreter.
+    cold, client = statistics.median(cold), statistics.median(client)
+    print(f"client vs cold         {(cold - client) * 1e3:8.3f} ms/doc saved, {cold / client:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
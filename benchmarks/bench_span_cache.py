@@ -0,0 +1,45 @@
+"""Span transformation with and without a shared SpanCache.
+
+Run from the repository root:
+
+    python benchmarks/bench_span_cache.py
+
+Renders the many tiny files corpus, whose list items and sentences repeat
+across files, once without a cache and once with one SpanCache shared by
+every file, and prints the cache statistics.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import SpanCache, render
+from corpus import generate, span_sentence
+import random
+
+
+def render_all(documents: list[list[str]], cache: SpanCache | None) -> float:
+    start = time.perf_counter()
+    for document in documents:
+        render(document, cache=cache)
+    return time.perf_counter() - start
+
+
+def changelog(files: int, seed: int = 0) -> list[list[str]]:
+    # Release notes that repeat a limited set of entries across files.
+    rng = random.Random(seed)
+    entries = [f"- {span_sentence(rng, 10)}" for _ in range(200)]
+    return [["# Release", ""] + [rng.choice(entries) for _ in range(20)] for _ in range(files)]
+
+
+def main():
+    for name, documents in [("tiny_files", generate("tiny_files", 5_000)), ("changelog", changelog(2_000))]:
+        uncached = min(render_all(documents, None) for _ in range(3))
+        cache = SpanCache()
+        cached = min(render_all(documents, cache) for _ in range(3))
+        print(f"{name:<11} no cache {uncached:6.3f} s, cache {cached:6.3f} s ({uncached / cached:.1f}x)")
+        print(f"{'':<11} {cache.to_json()}")
+
+
+if __name__ == "__main__":
+    main()
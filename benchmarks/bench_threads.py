@@ -0,0 +1,72 @@
+"""Throughput of one shared alys.Renderer across thread counts.
+
+Run from the repository root:
+
+    python benchmarks/bench_threads.py
+
+Renders 2000 generated documents of about 1 KB on one thread with
+alys.render, which builds a lexer and transformers per document, and with
+a Renderer, which reuses them, then with a ThreadPoolExecutor of 1, 2, 4
+and 8 threads sharing one Renderer. Prints documents per second and the
+speedup over one thread. With the GIL the threads take turns; a free-threaded build
+(python3.13t and later) runs them in parallel.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import Renderer, render
+from corpus import generate
+
+thread_counts = [1, 2, 4, 8]
+
+
+def documents(count: int) -> list[list[str]]:
+    # Consecutive lines of the prose corpus cut into pieces of about 1 KB.
+    docs, current = [], []
+    size = 0
+    for line in generate("prose", count * 40):
+        current.append(line)
+        size += len(line) + 1
+        if size >= 1024:
+            docs.append(current)
+            current, size = [], 0
+            if len(docs) == count:
+                break
+    return docs
+
+
+def best_time(run, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    docs = documents(2000)
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+
+    seconds = best_time(lambda: [render(lines) for lines in docs])
+    print(f"{'alys.render':<12} {len(docs) / seconds:8.0f} docs/s")
+    renderer = Renderer()
+    seconds = best_time(lambda: [renderer.render(lines) for lines in docs])
+    print(f"{'Renderer':<12} {len(docs) / seconds:8.0f} docs/s")
+
+    base = None
+    for threads in thread_counts:
+        renderer = Renderer()
+        with ThreadPoolExecutor(threads) as executor:
+            seconds = best_time(lambda: list(executor.map(renderer.render, docs)))
+        rate = len(docs) / seconds
+        base = base or rate
+        print(f"{threads:>2} threads   {rate:8.0f} docs/s {rate / base:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
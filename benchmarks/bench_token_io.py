@@ -0,0 +1,68 @@
+"""Size and speed of dump_tokens/load_tokens against pickle.
+
+Run from the repository root:
+
+    python benchmarks/bench_token_io.py
+
+Lexes corpora from benchmarks/corpus.py once, then serializes the token
+list with the alys token format and with pickle (highest protocol) and
+prints the size and the best dump and load times of each.
+"""
+import io
+import pickle
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.lexer import Lexer
+from alys.token_io import dump_tokens, load_tokens
+from corpus import generate
+
+
+def best_time(function, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def alys_format(tokens):
+    def dump():
+        out = io.BytesIO()
+        dump_tokens(tokens, out)
+        return out.getvalue()
+
+    data = dump()
+    return len(data), best_time(dump), best_time(lambda: load_tokens(io.BytesIO(data)))
+
+
+def pickle_format(tokens):
+    def dump():
+        out = io.BytesIO()
+        pickle.dump(tokens, out, protocol=pickle.HIGHEST_PROTOCOL)
+        return out.getvalue()
+
+    data = dump()
+    return len(data), best_time(dump), best_time(lambda: pickle.load(io.BytesIO(data)))
+
+
+def main():
+    for name, size in [("prose", 50_000), ("deep_lists", 50_000), ("deep_blockquotes", 20_000)]:
+        lexer = Lexer()
+        for line in generate(name, size):
+            lexer.lex(line)
+        tokens = lexer.get_tokens()
+        print(f"{name} ({len(tokens)} tokens)")
+        for label, measure in [("alys", alys_format), ("pickle", pickle_format)]:
+            size_bytes, dump_seconds, load_seconds = measure(tokens)
+            print(
+                f"  {label:<7} {size_bytes / 1024:8.0f} KiB  "
+                f"dump {dump_seconds * 1e3:7.1f} ms  load {load_seconds * 1e3:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
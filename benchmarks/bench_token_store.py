@@ -0,0 +1,61 @@
+"""Memory per token of a list of Token objects against a TokenStore.
+
+Run from the repository root:
+
+    python benchmarks/bench_token_store.py
+
+Lexes the same generated document into both containers under tracemalloc
+and prints the bytes held per token, content strings included. The
+document mixes blank lines, nested lists and paragraphs, like the large
+generated documents where most tokens carry little or no content. The
+lexer builds no outline, which would add an entry per heading to both.
+A TokenStore holds about 47 bytes per token here, a list of Token objects
+about 144.
+"""
+import gc
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.lexer import Lexer
+from alys.token_store import TokenStore
+
+
+def document(sections: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(sections):
+        lines.append(f"## section {i}")
+        lines.append("")
+        for _ in range(rng.randint(3, 8)):
+            depth = rng.randint(0, 6)
+            lines.append(f"{'  ' * depth}- dependency {rng.randint(0, 500)}")
+        lines.append("")
+        lines.append(f"paragraph {i} with some text")
+        lines.append("")
+    return lines
+
+
+def measure(lines: list[str], make_tokens) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    l = Lexer(make_tokens())
+    for line in lines:
+        l.lex(line)
+    tokens = l.get_tokens()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, len(tokens)
+
+
+def main():
+    lines = document(20_000)
+    for name, make_tokens in [("list[Token]", list), ("TokenStore", TokenStore)]:
+        size, count = measure(lines, make_tokens)
+        print(f"{name:<12} {count} tokens  {size / 2**20:7.1f} MiB  {size / count:6.1f} bytes/token")
+
+
+if __name__ == "__main__":
+    main()
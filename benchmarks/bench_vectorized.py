@@ -0,0 +1,95 @@
+"""Lines per second of Lexer.lex_bytes with and without NumPy.
+
+Run from the repository root, with numpy installed:
+
+    python benchmarks/bench_vectorized.py
+
+Compares lexing the document line by line with Lexer.lex against
+Lexer.lex_bytes, which labels most lines with array operations first (see
+alys.vectorized) when at least vectorized.min_fenced_share of the lines are
+in fenced code. Then prose with blocks of fenced code making up a growing
+share of the lines, lexed with the array path whatever the share: it only
+gains on the fenced lines it adds in bulk and breaks even at about 80% of
+the lines in fences.
+"""
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys import vectorized
+from alys.lexer import Lexer
+from corpus import generate
+
+
+def lex_lines(data: bytes) -> None:
+    lexer = Lexer()
+    for line in vectorized.split_lines(str(data, "utf-8")):
+        lexer.lex(line)
+
+
+def lex_bytes(data: bytes) -> None:
+    Lexer().lex_bytes(data)
+
+
+def best(function, data: bytes) -> float:
+    seconds = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        function(data)
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def compare(data: bytes) -> tuple[float, float]:
+    # Best times of lex_lines and lex_bytes. The two take turns, so a slow
+    # stretch of a noisy machine does not fall on one of them only.
+    by_line = vectorized_seconds = float("inf")
+    for _ in range(3):
+        by_line = min(by_line, best(lex_lines, data))
+        vectorized_seconds = min(vectorized_seconds, best(lex_bytes, data))
+    return by_line, vectorized_seconds
+
+
+def fenced(share: float, block: int, size: int) -> bytes:
+    # Prose with blocks of `block` lines of fenced code between its lines,
+    # `share` of the lines in the blocks.
+    prose = [line for line in generate("prose", size) if not line.startswith("```")]
+    blocks = int(size * share) // block
+    between = (size - blocks * block) // (blocks + 1)
+    lines = prose[:between]
+    for i in range(blocks):
+        lines.append("```")
+        lines.extend(f"    value_{j} = compute({j})" for j in range(block))
+        lines.append("```")
+        lines.extend(prose[(i + 1) * between:(i + 2) * between])
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def main():
+    if vectorized.numpy is None:
+        print("numpy is not installed, Lexer.lex_bytes lexes line by line")
+        return
+    for name in ["prose", "span_heavy", "code_fences", "deep_lists"]:
+        lines = generate(name, 50_000)
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        by_line, vectorized_seconds = compare(data)
+        print(
+            f"{name:<12} Lexer.lex {len(lines) / by_line / 1e6:5.2f} M lines/s, "
+            f"lex_bytes {len(lines) / vectorized_seconds / 1e6:5.2f} M lines/s "
+            f"({by_line / vectorized_seconds:.1f}x, fenced share {vectorized.fenced_share(data):.2f})"
+        )
+    with mock.patch.object(vectorized, "min_fenced_share", 0):
+        for block in [20, 200]:
+            for share in [0.5, 0.7, 0.8, 0.9, 1.0]:
+                data = fenced(share, block, 50_000)
+                by_line, vectorized_seconds = compare(data)
+                print(
+                    f"fenced share {vectorized.fenced_share(data):.2f} in blocks of {block:<4} "
+                    f"array path {by_line / vectorized_seconds:.2f}x Lexer.lex"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Seeded generator of realistic and adversarial markdown documents.
+
+Every generator takes a size (roughly the number of lines) and a
+random.Random, so the same seed always produces the same corpus.
+"""
+import random
+
+WORDS = [
+    "the", "a", "markdown", "lexer", "renders", "blocks", "into", "html", "with",
+    "spans", "for", "every", "line", "of", "documentation", "and", "release",
+    "notes", "code", "example", "request", "worker", "page", "section", "table",
+]
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def span_sentence(rng: random.Random, words: int = 12) -> str:
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        kind = rng.random()
+        if kind < 0.08:
+            word = f"*{word}*"
+        elif kind < 0.14:
+            word = f"**{word}**"
+        elif kind < 0.18:
+            word = f"`{word}`"
+        elif kind < 0.21:
+            word = f"[{word}](https://example.com/{word})"
+        elif kind < 0.22:
+            word = f"~~{word}~~"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def prose(size: int, rng: random.Random) -> list[str]:
+    lines = []
+    while len(lines) < size:
+        kind = rng.random()
+        if kind < 0.1:
+            lines.append(f"{'#' * rng.randint(1, 3)} {sentence(rng, 4)}")
+        elif kind < 0.2:
+            lines.extend(f"- {span_sentence(rng, 8)}" for _ in range(rng.randint(2, 6)))
+        elif kind < 0.3:
+            lines.append("```")
+            lines.extend(f"call({i}, {rng.randint(0, 99)});" for i in range(rng.randint(3, 15)))
+            lines.append("```")
+        else:
+            lines.extend(span_sentence(rng) for _ in range(rng.randint(1, 5)))
+        lines.append("")
+    return lines
+
+
+def code_fences(size: int, rng: random.Random) -> list[str]:
+    lines = ["```"]
+    lines.extend(f"    value_{i} = compute({rng.randint(0, 10**6)})" for i in range(size))
+    lines.append("```")
+    return lines
+
+
+def deep_lists(size: int, rng: random.Random) -> list[str]:
+    lines = []
+    depth = 0
+    for i in range(size):
+        depth = max(0, min(depth + rng.choice([-1, 0, 1, 1]), 40))
+        marker = "-" if rng.random() < 0.7 else f"{i}."
+        lines.append(f"{'  ' * depth}{marker} dependency {i}")
+    return lines
+
+
+def deep_blockquotes(size: int, rng: random.Random) -> list[str]:
+    lines = []
+    for i in range(size):
+        lines.append(f"{'> ' * rng.randint(1, 60)}quoted reply {i}")
+        if rng.random() < 0.1:
+            lines.append("")
+    return lines
+
+
+def span_heavy(size: int, rng: random.Random) -> list[str]:
+    lines = []
+    while len(lines) < size:
+        lines.extend(span_sentence(rng, 40) for _ in range(rng.randint(1, 4)))
+        lines.append("")
+    return lines
+
+
+def adversarial_spans(size: int, rng: random.Random) -> list[str]:
+    # Long lines of unmatched and interleaved delimiters.
+    lines = []
+    for _ in range(size):
+        length = rng.randint(100, 400)
+        lines.append("".join(rng.choice("*_[]()`~ ab") for _ in range(length)))
+        lines.append("")
+    return lines
+
+
+def huge(size: int, rng: random.Random) -> list[str]:
+    return prose(size * 20, rng)
+
+
+def tiny_files(size: int, rng: random.Random) -> list[list[str]]:
+    return [prose(rng.randint(3, 12), rng) for _ in range(size)]
+
+
+generators = {
+    "prose": prose,
+    "code_fences": code_fences,
+    "deep_lists": deep_lists,
+    "deep_blockquotes": deep_blockquotes,
+    "span_heavy": span_heavy,
+    "adversarial_spans": adversarial_spans,
+    "huge": huge,
+    "tiny_files": tiny_files,
+}
+
+
+def generate(name: str, size: int, seed: int = 0) -> list[str] | list[list[str]]:
+    # Each corpus gets its own stream, so adding a corpus does not change
+    # the others.
+    return generators[name](size, random.Random(f"{seed}:{name}"))
@@ -0,0 +1,187 @@
+"""Per-stage timings over the synthetic corpus in benchmarks/corpus.py.
+
+Run from the repository root:
+
+    python benchmarks/run.py --output baseline.json
+    # ... change alys/ ...
+    python benchmarks/run.py --output current.json --compare baseline.json
+
+Every corpus is timed for lexing, span transformation and block rendering
+separately and for alys.render end to end; each number is the best of
+--repeat runs. With --compare the run exits with status 1 if any stage got
+more than --threshold slower than in the baseline. --current compares a
+stored result instead of running the suite again.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.pipeline import render
+from alys.span_transformer import SpanTransformer, engines
+from alys.token import Token
+from corpus import generate
+
+# Lines per corpus at --scale 1, "tiny_files" is a number of files.
+SIZES = {
+    "prose": 20_000,
+    "code_fences": 50_000,
+    "deep_lists": 20_000,
+    "deep_blockquotes": 5_000,
+    "span_heavy": 5_000,
+    "adversarial_spans": 1_000,
+    "huge": 10_000,
+    "tiny_files": 5_000,
+}
+STAGES = ["lex", "spans", "blocks", "end_to_end"]
+
+
+def lex(doc: list[str]) -> list[Token]:
+    lexer = Lexer()
+    for line in doc:
+        lexer.lex(line)
+    return lexer.get_tokens()
+
+
+def copy_tokens(tokens: list[Token]) -> list[Token]:
+    # Depth and ordered kind decide the nesting the blocks stage renders.
+    return [Token(token.tag, token.content, token.depth, token.ordered) for token in tokens]
+
+
+def best_of(repeat: int, setup, run) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_corpus(docs: list[list[str]], repeat: int, engine: str) -> dict[str, float]:
+    lexed = [lex(doc) for doc in docs]
+    spans = SpanTransformer(Lexer(), engine=engine)
+    transformed = [list(spans.iter_spans(copy_tokens(tokens))) for tokens in lexed]
+    blocks = BlockTransformer(Lexer())
+
+    def run_lex():
+        for doc in docs:
+            lex(doc)
+
+    def run_spans(copies):
+        for tokens in copies:
+            for _ in spans.iter_spans(tokens):
+                pass
+
+    def run_blocks():
+        for tokens in transformed:
+            for _ in blocks.iter_html(tokens):
+                pass
+
+    def run_end_to_end():
+        for doc in docs:
+            render(doc, engine=engine)
+
+    return {
+        "lex": best_of(repeat, tuple, run_lex),
+        # transform_spans rewrites a token and skips it the next time, see
+        # Token.html, so every run gets fresh copies of the lexed tokens.
+        "spans": best_of(repeat, lambda: ([copy_tokens(tokens) for tokens in lexed],), run_spans),
+        "blocks": best_of(repeat, tuple, run_blocks),
+        "end_to_end": best_of(repeat, tuple, run_end_to_end),
+    }
+
+
+def run(names: list[str], scale: float, seed: int, repeat: int, engine: str) -> dict:
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "scale": scale,
+            "repeat": repeat,
+            "engine": engine,
+        },
+        "corpora": {},
+    }
+    for name in names:
+        corpus = generate(name, max(int(SIZES[name] * scale), 1), seed)
+        docs = corpus if name == "tiny_files" else [corpus]
+        size = sum(len(line) + 1 for doc in docs for line in doc)
+        seconds = time_corpus(docs, repeat, engine)
+        results["corpora"][name] = {
+            "files": len(docs),
+            "lines": sum(len(doc) for doc in docs),
+            "bytes": size,
+            "seconds": seconds,
+        }
+        print(
+            f"{name:<18} " + " ".join(f"{stage} {seconds[stage] * 1e3:8.1f} ms" for stage in STAGES),
+            f"({size / 1e6 / seconds['end_to_end']:.1f} MB/s)",
+        )
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[tuple[str, str, float, float]]:
+    regressions = []
+    for name, result in current["corpora"].items():
+        if name not in baseline["corpora"]:
+            continue
+        old = baseline["corpora"][name]
+        if old["bytes"] != result["bytes"]:
+            print(f"{name}: corpus differs from the baseline (seed or scale changed), skipped")
+            continue
+        for stage in STAGES:
+            before = old["seconds"][stage]
+            after = result["seconds"][stage]
+            change = after / before - 1 if before else 0.0
+            flag = "REGRESSION" if change > threshold else ""
+            print(f"{name:<18} {stage:<10} {before * 1e3:8.1f} ms -> {after * 1e3:8.1f} ms {change:+7.1%} {flag}")
+            if change > threshold:
+                regressions.append((name, stage, before, after))
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpora", nargs="*", help=f"corpora to run (default: all of {', '.join(SIZES)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage, the best one is kept")
+    parser.add_argument("--engine", choices=engines, default="regex", help="span engine")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results to compare against")
+    parser.add_argument("--current", metavar="RESULTS", help="compare these stored results instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown flagged as a regression (0.1 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    unknown = set(args.corpora) - set(SIZES)
+    if unknown:
+        raise SystemExit(f"expected corpora from {list(SIZES)}, got {sorted(unknown)}")
+    if args.current:
+        if not args.compare:
+            raise SystemExit("--current needs --compare")
+        current = json.loads(Path(args.current).read_text())
+    else:
+        current = run(args.corpora or list(SIZES), args.scale, args.seed, args.repeat, args.engine)
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + "\n")
+    if not args.compare:
+        return 0
+    regressions = compare(json.loads(Path(args.compare).read_text()), current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stages more than {args.threshold:.0%} slower than the baseline")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
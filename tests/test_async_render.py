@@ -0,0 +1,72 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+from alys import iter_html_async, render, render_async
+
+document = [
+    "# title\n", "\n", "some *text*\n", "more\n", "\n", "- item\n", "```\n", "a < b\n", "```\n", "> quote\n",
+]
+
+
+async def lines(items):
+    for item in items:
+        yield item
+
+
+class TestRenderAsync(unittest.TestCase):
+    def test_render_async(self):
+        test_cases = [
+            [],
+            document,
+            [line.rstrip("\n") for line in document],
+            ["no trailing *newline*"],
+        ]
+        for case in test_cases:
+            self.assertEqual(asyncio.run(render_async(lines(case))), render(case), case)
+
+    def test_stream_reader(self):
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data("".join(document).replace("\n", "\r\n").encode("utf-8"))
+            reader.feed_eof()
+            return await render_async(reader)
+
+        self.assertEqual(asyncio.run(read()), render(document))
+
+    def test_executor(self):
+        async def read(executor):
+            return await render_async(lines(document), executor=executor, executor_chars=0)
+
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(asyncio.run(read(executor)), render(document))
+
+    def test_yields_control(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        async def read():
+            ticker = asyncio.create_task(tick())
+            await asyncio.sleep(0)
+            blocks = [html async for html in iter_html_async(lines(document * 10), yield_every=10)]
+            ticker.cancel()
+            return blocks
+
+        blocks = asyncio.run(read())
+        self.assertEqual("\n".join(blocks), render(document * 10))
+        self.assertGreaterEqual(ticks, 10)
+
+    def test_yield_every(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(render_async(lines(document), yield_every=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
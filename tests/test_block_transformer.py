@@ -1,9 +1,290 @@
+import gzip
+import io
+import os
+import socket
 import sys
+import tempfile
+import time
 import unittest
 
 sys.path.insert(0, "..")
 from alys import lexer
 from alys.token import Token, Tag
 from alys.block_transformer import BlockTransformer
+from alys.pipeline import render
+from alys.span_transformer import SpanTransformer
 
 
+
+
+class TestBlockTransformer(unittest.TestCase):
+    def test_transform(self):
+        test_cases = [
+            (["# h1"], "<h1>h1</h1>"),
+            (["## h2", "### h3", "#### h4", "##### h5", "###### h6"],
+             "<h2>h2</h2>\n<h3>h3</h3>\n<h4>h4</h4>\n<h5>h5</h5>\n<h6>h6</h6>"),
+            (["hello", "world"], "<p>hello\nworld</p>"),
+            (["    code", "    more"], "<pre><code>code\nmore</code></pre>"),
+            (["```", "code", "", "more", "```"], "<pre><code>code\n\nmore</code></pre>"),
+            (["_ _ _"], "<hr>"),
+            (["hello", "", "world"], "<p>hello</p>\n<p>world</p>"),
+            (["    a < b && c"], "<pre><code>a &lt; b &amp;&amp; c</code></pre>"),
+            (["```", "<br/>", "```"], "<pre><code>&lt;br/&gt;</code></pre>"),
+        ]
+
+        for test_case in test_cases:
+            l = lexer.Lexer()
+            for line in test_case[0]:
+                l.lex(line)
+            b = BlockTransformer(l)
+            b.transform()
+            self.assertEqual(b.get_html(), test_case[1])
+
+    def test_escape(self):
+        lines = ["<script>alert(1)</script>", "", "# <b>h", "- a & b"]
+        want = (
+            "<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>\n"
+            "<h1>&lt;b&gt;h</h1>\n"
+            "<ul>\n<li>a &amp; b</li>\n</ul>"
+        )
+        l = lexer.Lexer()
+        for line in lines:
+            l.lex(line)
+        b = BlockTransformer(l)
+        b.transform()
+        self.assertEqual(b.get_html(), want)
+
+        # Spans rendered before are not escaped again.
+        s = SpanTransformer(l)
+        b = BlockTransformer(l)
+        b.html.extend(b.iter_html(s.iter_spans(l.get_tokens())))
+        self.assertEqual(b.get_html(), want)
+        self.assertEqual(render(lines), want)
+
+    def test_register(self):
+        l = lexer.Lexer()
+        for line in ["# title", "", "text", "", "_ _ _"]:
+            l.lex(line)
+        b = BlockTransformer(l)
+        b.register(Tag.H1, lambda token: f'<h1 class="title">{token.content}</h1>')
+        b.register(Tag.EMPTY, lambda token: "<!-- -->")
+        b.register(Tag.HR, lambda token: None)
+        b.transform()
+        self.assertEqual(b.get_html(), '<h1 class="title">title</h1>\n<!-- -->\n<p>text</p>\n<!-- -->')
+        with self.assertRaises(ValueError):
+            b.register(Tag.BLOCKQUOTE, lambda token: "<div>")
+
+    def test_no_escape(self):
+        l = lexer.Lexer()
+        l.lex("    <br/>")
+        b = BlockTransformer(l, escape=False)
+        b.transform()
+        self.assertEqual(b.get_html(), "<pre><code><br/></code></pre>")
+
+    def test_blockquote(self):
+        test_cases = [
+            (["> quote"], "<blockquote>\n<p>quote</p>\n</blockquote>"),
+            (["> a", "> b"], "<blockquote>\n<p>a</p>\n<p>b</p>\n</blockquote>"),
+            (["> a", "lazy"], "<blockquote>\n<p>a\nlazy</p>\n</blockquote>"),
+            (["> a", "", "b"], "<blockquote>\n<p>a</p>\n</blockquote>\n<p>b</p>"),
+            ([">> a", "> b", ">>> c"],
+             "<blockquote>\n<blockquote>\n<p>a</p>\n</blockquote>\n<p>b</p>\n<blockquote>\n"
+             "<blockquote>\n<p>c</p>\n</blockquote>\n</blockquote>\n</blockquote>"),
+            (["> # h", "text"], "<blockquote>\n<h1>h</h1>\n</blockquote>\n<p>text</p>"),
+            (["> br  ", "_ _ _"], "<blockquote>\n<p>br  </p>\n</blockquote>\n<hr>"),
+            ([">"], "<blockquote>\n</blockquote>"),
+            (["> " * 10_000 + "deep"],
+             "\n".join(["<blockquote>"] * 10_000 + ["<p>deep</p>"] + ["</blockquote>"] * 10_000)),
+        ]
+
+        for lines, want in test_cases:
+            l = lexer.Lexer()
+            for line in lines:
+                l.lex(line)
+            b = BlockTransformer(l)
+            b.transform()
+            self.assertEqual(b.get_html(), want, lines)
+            self.assertEqual(b.get_html(), want, lines)
+
+    def test_list(self):
+        test_cases = [
+            (["- a", "- b"], "<ul>\n<li>a</li>\n<li>b</li>\n</ul>"),
+            (["1. a", "2. b"], "<ol>\n<li>a</li>\n<li>b</li>\n</ol>"),
+            (["- a", "  - b", "- c"],
+             "<ul>\n<li>a\n<ul>\n<li>b</li>\n</ul>\n</li>\n<li>c</li>\n</ul>"),
+            (["- a", "  1. b", "    - c", "text"],
+             "<ul>\n<li>a\n<ol>\n<li>b\n<ul>\n<li>c</li>\n</ul>\n</li>\n</ol>\n</li>\n</ul>\n<p>text</p>"),
+            (["- a", "1. b"], "<ul>\n<li>a</li>\n</ul>\n<ol>\n<li>b</li>\n</ol>"),
+            (["- a", "    - b"],
+             "<ul>\n<li>a\n<ul>\n<li>\n<ul>\n<li>b</li>\n</ul>\n</li>\n</ul>\n</li>\n</ul>"),
+            (["- a", "", "- b"], "<ul>\n<li>a</li>\n</ul>\n<ul>\n<li>b</li>\n</ul>"),
+            (["> - a", "> - b", "- c"],
+             "<blockquote>\n<ul>\n<li>a</li>\n<li>b</li>\n</ul>\n</blockquote>\n<ul>\n<li>c</li>\n</ul>"),
+        ]
+
+        for lines, want in test_cases:
+            l = lexer.Lexer()
+            for line in lines:
+                l.lex(line)
+            b = BlockTransformer(l)
+            b.transform()
+            self.assertEqual(b.get_html(), want, lines)
+
+    def test_deep_outline(self):
+        # A generated tree 50 levels deep: one LI token per line and
+        # rendering time linear in the number of lines.
+        def render_time(size):
+            lines = ["  " * (i % 50) + f"- item {i}" for i in range(size)]
+            l = lexer.Lexer()
+            for line in lines:
+                l.lex(line)
+            self.assertEqual(len(l.get_tokens()), size)
+            best = None
+            for _ in range(3):
+                start = time.perf_counter()
+                b = BlockTransformer(l)
+                b.transform()
+                html = b.get_html()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            self.assertEqual(html.count("<ul>"), size - size // 50 + 1)
+            self.assertEqual(html.count("</ul>"), html.count("<ul>"))
+            self.assertEqual(html.count("<li>"), html.count("</li>"))
+            return best
+
+        small = render_time(2_000)
+        large = render_time(20_000)
+        self.assertLess(large / small, 30)
+
+    def test_lazy_spans(self):
+        lines = ["# *title*", "", "some **text**", "", "- `item`"]
+        want = render(lines)
+        l = lexer.Lexer()
+        for line in lines:
+            l.lex(line)
+        tokens = l.get_tokens()
+        b = BlockTransformer(l, spans=SpanTransformer(l))
+        html = b.iter_html(tokens)
+        self.assertEqual(next(html), "<h1><i>title</i></h1>")
+        self.assertEqual([t.content for t in tokens[2:]], ["some **text**", "", "`item`"])
+        self.assertEqual("\n".join(["<h1><i>title</i></h1>", *html]), want)
+
+        # The tokens are left raw, rendering them again gives the same html.
+        self.assertEqual([(t.content, t.html) for t in tokens[:1]], [("*title*", None)])
+        b.transform()
+        self.assertEqual(b.get_html(), want)
+        l = lexer.Lexer()
+        l.lex("a *b* & c")
+        b = BlockTransformer(l, spans=SpanTransformer(l))
+        b.transform()
+        b.transform()
+        self.assertEqual(b.html, ["<p>a <i>b</i> &amp; c</p>"] * 2)
+
+    def test_transform_block(self):
+        l = lexer.Lexer()
+        for line in ["# title", "", "text"]:
+            l.lex(line)
+        b = BlockTransformer(l)
+        for token in l.get_tokens():
+            b.transform_block(token)
+        b.transform_block(Token(Tag.HR))
+        self.assertEqual(b.get_html(), "<h1>title</h1>\n<p>text</p>\n<hr>")
+
+    def test_iter_html(self):
+        lines = [
+            "# title",
+            "",
+            "some text",
+            "over two lines",
+            "```",
+            "code",
+            "```",
+            "underlined",
+            "----------",
+            "- item",
+        ]
+
+        l = lexer.Lexer()
+        for line in lines:
+            l.lex(line)
+        b = BlockTransformer(l)
+        b.transform()
+
+        streamed = BlockTransformer(lexer.Lexer())
+        got = list(streamed.iter_html(lexer.Lexer().iter_tokens(lines)))
+        self.assertEqual("\n".join(got), b.get_html())
+
+    def test_iter_html_is_incremental(self):
+        def lines():
+            yield "first paragraph"
+            yield ""
+            yield "```"
+            while True:
+                yield "code"
+
+        l = lexer.Lexer()
+        b = BlockTransformer(l)
+        got = b.iter_html(l.iter_tokens(lines()))
+        self.assertEqual(next(got), "<p>first paragraph</p>")
+
+    def test_render_to(self):
+        lines = ["# title", "", "caf\u00e9", "", "```", "a < b", "```"]
+        want = "<h1>title</h1>\n<p>caf\u00e9</p>\n<pre><code>a &lt; b</code></pre>"
+
+        def transformer():
+            l = lexer.Lexer()
+            for line in lines:
+                l.lex(line)
+            return BlockTransformer(l)
+
+        text = io.StringIO()
+        transformer().render_to(text)
+        self.assertEqual(text.getvalue(), want)
+        b = transformer()
+        b.transform()
+        self.assertEqual(b.get_html(), want)
+
+        binary = io.BytesIO()
+        transformer().render_to(binary)
+        self.assertEqual(binary.getvalue(), want.encode("utf-8"))
+
+        compressed = io.BytesIO()
+        with gzip.GzipFile(fileobj=compressed, mode="wb") as f:
+            transformer().render_to(f)
+        self.assertEqual(gzip.decompress(compressed.getvalue()), want.encode("utf-8"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "out.html")
+            with open(path, "wb", buffering=0) as f:
+                transformer().render_to(f, buffer_size=1)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), want)
+
+        left, right = socket.socketpair()
+        with left, right:
+            transformer().render_to(left)
+            left.shutdown(socket.SHUT_WR)
+            received = b""
+            while chunk := right.recv(4096):
+                received += chunk
+        self.assertEqual(received, want.encode("utf-8"))
+
+    def test_render_to_buffer(self):
+        class Writer:
+            def __init__(self):
+                self.writes = []
+
+            def write(self, text):
+                self.writes.append(text)
+
+        l = lexer.Lexer()
+        for line in ["a", "", "b", "", "c"]:
+            l.lex(line)
+        for buffer_size, want in [(1, ["<p>a</p>", "\n<p>b</p>", "\n<p>c</p>"]), (20, ["<p>a</p>\n<p>b</p>\n<p>c</p>"])]:
+            writer = Writer()
+            BlockTransformer(l).render_to(writer, buffer_size=buffer_size)
+            self.assertEqual(writer.writes, want)
+
+
+if __name__ == "__main__":
+    unittest.main()
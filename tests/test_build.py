@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+import contextlib
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, "..")
+from alys import build
+from alys.__main__ import main
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = Path(self.tmp.name, "src")
+        self.out = Path(self.tmp.name, "out")
+        for i in range(20):
+            path = self.src / f"section{i % 3}" / f"page{i}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# page {i}\n\n*text* & more\n", encoding="utf-8")
+        (self.src / "notes.txt").write_text("not markdown", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build(self):
+        for jobs in [1, 2]:
+            result = build.build(self.src, self.out, jobs=jobs)
+            self.assertEqual(result.files, 20)
+            self.assertEqual(result.failures, [])
+            html = (self.out / "section1" / "page4.html").read_text(encoding="utf-8")
+            self.assertEqual(html, "<h1>page 4</h1>\n<p><i>text</i> &amp; more</p>")
+            self.assertFalse((self.out / "notes.html").exists())
+            self.assertEqual([p for p in self.out.rglob(".*")], [])
+
+    def test_failures(self):
+        (self.src / "broken.md").write_bytes(b"\xff\xfe")
+        result = build.build(self.src, self.out, jobs=1)
+        self.assertEqual(result.files, 20)
+        self.assertEqual([Path(path).name for path, _ in result.failures], ["broken.md"])
+
+    def test_render_failures(self):
+        render_to = build.render_to
+
+        def failing_render_to(lines, out, **kwargs):
+            if Path(lines.name).name == "page3.md":
+                raise RecursionError("maximum recursion depth exceeded")
+            render_to(lines, out, **kwargs)
+
+        with mock.patch.object(build, "render_to", failing_render_to):
+            result = build.build(self.src, self.out, jobs=1)
+        self.assertEqual(result.files, 19)
+        self.assertEqual(
+            [(Path(path).name, error) for path, error in result.failures],
+            [("page3.md", "RecursionError: maximum recursion depth exceeded")],
+        )
+        self.assertFalse((self.out / "section0" / "page3.html").exists())
+
+    def test_mode(self):
+        umask = os.umask(0o022)
+        try:
+            build.build(self.src, self.out, jobs=1)
+        finally:
+            os.umask(umask)
+        mode = (self.out / "section1" / "page4.html").stat().st_mode & 0o777
+        self.assertEqual(mode, 0o644)
+
+    def test_invalid_jobs(self):
+        for jobs in [0, -1]:
+            with self.assertRaises(ValueError):
+                build.build(self.src, self.out, jobs=jobs)
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                main(["build", str(self.src), str(self.out), "-j", str(jobs)])
+
+    def test_chunk_sources(self):
+        sources = [(Path(f"{i}.md"), 1024) for i in range(1000)]
+        chunks = build.chunk_sources(sources, jobs=4)
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 1000)
+        self.assertEqual(len(chunks), 4)
+
+        sources = [(Path(f"{i}.md"), build.min_chunk_bytes) for i in range(64)]
+        self.assertEqual(len(build.chunk_sources(sources, jobs=4)), 32)
+
+    def test_main(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            code = main(["build", str(self.src), str(self.out), "-j", "1"])
+        self.assertEqual(code, 0)
+        self.assertTrue(stdout.getvalue().startswith("built 20 files"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys
+import time
+import unittest
+
+sys.path.insert(0, "..")
+from alys.delimiter_stack import scan_spans
+
+
+class TestDelimiterStack(unittest.TestCase):
+    def test_scan_spans(self):
+        test_cases = [
+            ("plain text", "plain text"),
+            ("*a* and _b_", "<i>a</i> and <i>b</i>"),
+            ("**a** and __b__", "<b>a</b> and <b>b</b>"),
+            ("***a***", "<i><b>a</b></i>"),
+            ("*a **b***", "<i>a <b>b</b></i>"),
+            ("~~a~~ ~b~", "<s>a</s> ~b~"),
+            ("* not emphasis *", "* not emphasis *"),
+            ("*a _b* c_", "<i>a _b</i> c_"),
+            ("`*a*` *b*", "<code>*a*</code> <i>b</i>"),
+            ("`unclosed *a*", "`unclosed <i>a</i>"),
+            ("[*a*](u) *b*", '<a href="u"><i>a</i></a> <i>b</i>'),
+            ("*a [b* c](u)", '*a <a href="u">b* c</a>'),
+            ("[a] (u) [b](", "[a] (u) [b]("),
+            ("![a *b*](u.png)", '<img src="u.png" alt="a *b*"/>'),
+            ("wow! ![x](y)", 'wow! <img src="y" alt="x"/>'),
+            ("no_formatting", "no_formatting"),
+            # The rule of 3: "*" can not close "**" when either run can also
+            # open and close, unless both lengths are multiples of 3.
+            ("**a*b*c**", "<b>a<i>b</i>c</b>"),
+            ("*foo**bar**baz*", "<i>foo<b>bar</b>baz</i>"),
+            ("*foo**bar*", "<i>foo**bar</i>"),
+            ("*foo**bar***", "<i>foo<b>bar</b></i>"),
+            ("foo***bar***baz", "foo<i><b>bar</b></i>baz"),
+            ("foo******bar*********baz", "foo<b><b><b>bar</b></b></b>***baz"),
+            ("a*b**c", "a*b**c"),
+        ]
+
+        for test_case in test_cases:
+            self.assertEqual(scan_spans(test_case[0]), test_case[1])
+
+    def test_linear_time(self):
+        def elapsed(n: int) -> float:
+            line = "*_[`~" * n
+            start = time.perf_counter()
+            scan_spans(line)
+            scan_spans("](" * n)
+            scan_spans("a *" * n)
+            scan_spans("**a " * n + "a*b" * n)
+            return time.perf_counter() - start
+
+        small = min(elapsed(1_000) for _ in range(3))
+        large = min(elapsed(10_000) for _ in range(3))
+        self.assertLess(large, small * 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
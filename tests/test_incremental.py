@@ -0,0 +1,71 @@
+import random
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+from alys import render
+from alys.incremental import IncrementalDocument
+
+vocabulary = [
+    "", "", "text", "more *text*", "```", "code", "    indented", "# heading",
+    "===", "---", "- item", "  - nested", "1. item", "> quote", ">> deep", "_ _ _", "br  ",
+]
+
+
+class TestIncrementalDocument(unittest.TestCase):
+    def test_html(self):
+        lines = ["# title", "", "some text", "====", "", "```", "a", "", "b", "```"]
+        document = IncrementalDocument(lines)
+        self.assertEqual(document.html(), render(lines))
+        self.assertEqual(document.block_starts(), [0, 1, 2, 4, 5])
+
+    def test_edit(self):
+        lines = ["# title", "", "paragraph", "", "```", "code", "```", "", "end"]
+        document = IncrementalDocument(lines)
+
+        patch = document.edit(2, 3, ["new paragraph"])
+        self.assertEqual((patch.start, patch.deleted, patch.inserted), (2, 1, ["<p>new paragraph</p>"]))
+
+        patch = document.edit(3, 3, ["==="])
+        self.assertEqual(patch.inserted, ["<h1>new paragraph</h1>", ""])
+
+        patch = document.edit(7, 8, [])
+        lines = ["# title", "", "new paragraph", "===", "", "```", "code", "", "end"]
+        self.assertEqual(document.lines, lines)
+        self.assertEqual(document.html(), render(lines))
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        lines = [rng.choice(vocabulary) for _ in range(50)]
+        document = IncrementalDocument(lines)
+        for _ in range(500):
+            start = rng.randint(0, len(lines))
+            end = rng.randint(start, min(len(lines), start + 3))
+            new_lines = [rng.choice(vocabulary) for _ in range(rng.randint(0, 3))]
+            lines[start:end] = new_lines
+            document.edit(start, end, new_lines)
+            self.assertEqual(document.html(), render(lines))
+
+        fresh = IncrementalDocument(lines)
+        self.assertEqual(document.block_starts(), fresh.block_starts())
+        self.assertEqual(document.blocks, fresh.blocks)
+
+    def test_edit_is_local(self):
+        lines = []
+        for i in range(1000):
+            lines.extend([f"# section {i}", "", f"text {i}", ""])
+        document = IncrementalDocument(lines)
+        # Three blocks per section: heading, blank line, paragraph.
+        patch = document.edit(2001, 2002, ["==="])
+        self.assertEqual(patch.start, 3 * 500 + 1)
+        self.assertEqual(patch.deleted, 2)
+        self.assertEqual(patch.inserted, ["<p>===\ntext 500</p>"])
+
+    def test_invalid_range(self):
+        document = IncrementalDocument(["a"])
+        with self.assertRaises(IndexError):
+            document.edit(1, 3, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 from alys import lexer
+import os
+import random
 import sys
+import tempfile
+import time
 import unittest
 
 sys.path.insert(0, "..")
+from alys.token_store import TokenStore
 
 
 class TestLexer(unittest.TestCase):
@@ -22,6 +27,8 @@ class TestLexer(unittest.TestCase):
             ("## p #################", lexer.Token(lexer.Tag.H2, "p")),
             ("## p # ################", lexer.Token(lexer.Tag.H2, "p #")),
             ("## p # ################        ", lexer.Token(lexer.Tag.H2, "p #")),
+            ("#", lexer.Token(lexer.Tag.P, "#")),
+            ("###", lexer.Token(lexer.Tag.P, "###")),
         ]
 
         for test_case in test_cases:
@@ -101,34 +108,42 @@ class TestLexer(unittest.TestCase):
 
     def test_handle_list(self):
         test_cases = [
-            ("  - list", 1, lexer.Tag.LI),
-            ("   1. list", 1, lexer.Tag.LI),
-            ("  1. list", 1, lexer.Tag.LI),
-            ("   1. list", 1, lexer.Tag.LI),
-            ("  123452345. list", 1, lexer.Tag.LI),
-            ("   3341114576776. list", 1, lexer.Tag.LI),
-            ("  13948579283475. list", 1, lexer.Tag.LI),
-            ("   1098098098. list", 1, lexer.Tag.LI),
+            ("- list", 1, False),
+            ("* list", 1, False),
+            ("1. list", 1, True),
+            ("  - list", 2, False),
+            ("   1. list", 2, True),
+            ("  1. list", 2, True),
+            ("  123452345. list", 2, True),
+            ("   3341114576776. list", 2, True),
+            ("  13948579283475. list", 2, True),
+            ("   1098098098. list", 2, True),
         ]
 
         for test_case in test_cases:
             l = lexer.Lexer()
             l.lex(test_case[0])
-            want = test_case[2]
             tokens = l.get_tokens()
-            j = 0
             if test_case[0].lstrip()[0] in "-*":
                 content = "".join(test_case[0].lstrip()[2:])
             else:
                 offset = test_case[0].find(". ")
                 content = "".join(test_case[0][offset + 2:])
 
-            for i in range(test_case[1]):
-                self.assertEqual(tokens[i].tag, lexer.Tag.IDENT)
-                j += 1
+            self.assertEqual(len(tokens), 1)
+            self.assertEqual(tokens[0].tag, lexer.Tag.LI)
+            self.assertEqual(tokens[0].content, content)
+            self.assertEqual(tokens[0].depth, test_case[1], test_case[0])
+            self.assertEqual(tokens[0].ordered, test_case[2], test_case[0])
 
-            self.assertEqual(tokens[j].tag, want)
-            self.assertEqual(tokens[j].content, content)
+        # Four spaces after an item nest a list instead of starting code.
+        l = lexer.Lexer()
+        for line in ["- a", "  - b", "    1. c", "      - d", "  - e"]:
+            l.lex(line)
+        self.assertEqual(
+            [str(t) for t in l.get_tokens()],
+            ["Tag.LI[1](a)", "Tag.LI[2](b)", "Tag.LI[3, ordered](c)", "Tag.LI[4](d)", "Tag.LI[2](e)"],
+        )
 
     def test_is_hr(self):
         test_cases = [
@@ -219,6 +234,9 @@ class TestLexer(unittest.TestCase):
             ("  >- quote", 1, "quote"),
             (" >12341234. quote", 1, "quote"),
             (" >> >12341234. quote", 3, "quote"),
+            (">", 1, ""),
+            (">> ", 2, ""),
+            ("> >x> y", 2, "x> y"),
         ]
 
         for test_case in test_cases:
@@ -228,11 +246,31 @@ class TestLexer(unittest.TestCase):
             levels = test_case[1]
             want = test_case[2]
             tokens = l.get_tokens()
-            if levels > 1:
-                for i in range(1, levels):
-                    self.assertEqual(tokens[i].tag, lexer.Tag.BLOCKQUOTE)
+            self.assertEqual(len(tokens), 2, line)
+            self.assertEqual(tokens[0].tag, lexer.Tag.BLOCKQUOTE)
+            self.assertEqual(tokens[0].depth, levels, line)
+            self.assertEqual(tokens[1].content, want)
+
+    def test_deep_blockquote(self):
+        # No recursion and no copy per level: the time grows linearly with
+        # the depth, 10 times deeper takes about 10 times longer.
+        def lex_time(depth):
+            line = "> " * depth + "quote"
+            best = None
+            for _ in range(5):
+                l = lexer.Lexer()
+                start = time.perf_counter()
+                l.lex(line)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            tokens = l.get_tokens()
+            self.assertEqual([t.depth for t in tokens], [depth, 0])
+            self.assertEqual(tokens[1].content, "quote")
+            return best
 
-            self.assertEqual(tokens[levels].content, want)
+        shallow = lex_time(1_000)
+        deep = lex_time(10_000)
+        self.assertLess(deep / shallow, 30)
 
     def test_handle_code_block(self):
         test_cases = [
@@ -253,6 +291,12 @@ class TestLexer(unittest.TestCase):
                 lexer.Tag.BACKTICKCODE, "hello\n  space\nhello\nhello")),
             (["```", "hello", "hello", "hello", "hello", "```"], lexer.Token(
                 lexer.Tag.BACKTICKCODE, "hello\nhello\nhello\nhello")),
+            (["```", "hello", "", "world", "```"], lexer.Token(
+                lexer.Tag.BACKTICKCODE, "hello\n\nworld")),
+            (["```", "hello", "```", "world"], lexer.Token(
+                lexer.Tag.P, "world")),
+            (["```", "hello", "```", "```"], lexer.Token(
+                lexer.Tag.BACKTICKCODE, "")),
             (
                 ["    hello", "      world"],
                 lexer.Token(lexer.Tag.INDENTEDCODE, "hello\n  world"),
@@ -296,5 +340,171 @@ class TestLexer(unittest.TestCase):
             self.assertEqual(got.content, want.content)
             self.assertEqual(got.tag, want.tag)
 
+    def test_paragraph(self):
+        test_cases = [
+            (["hello"], [lexer.Token(lexer.Tag.P, "hello")]),
+            (["hello", "world"], [lexer.Token(lexer.Tag.P, "hello\nworld")]),
+            (
+                ["hello", "", "world"],
+                [
+                    lexer.Token(lexer.Tag.P, "hello"),
+                    lexer.Token(lexer.Tag.EMPTY),
+                    lexer.Token(lexer.Tag.P, "world"),
+                ],
+            ),
+            (
+                ["hello  ", "world"],
+                [
+                    lexer.Token(lexer.Tag.P, "hello  "),
+                    lexer.Token(lexer.Tag.BR),
+                    lexer.Token(lexer.Tag.P, "world"),
+                ],
+            ),
+            (
+                ["hello", "world", "==="],
+                [lexer.Token(lexer.Tag.H1, "hello\nworld")],
+            ),
+            (
+                ["hello", "# world"],
+                [
+                    lexer.Token(lexer.Tag.P, "hello"),
+                    lexer.Token(lexer.Tag.H1, "world"),
+                ],
+            ),
+        ]
+
+        for test_case in test_cases:
+            l = lexer.Lexer()
+            for line in test_case[0]:
+                l.lex(line)
+            got = l.get_tokens()
+            want = test_case[1]
+            self.assertEqual([t.tag for t in got], [t.tag for t in want])
+            self.assertEqual([t.content for t in got], [t.content for t in want])
+
+    def test_read_open_block(self):
+        l = lexer.Lexer()
+        l.lex("    hello")
+        self.assertEqual(l.get_latest_token().content, "hello")
+        l.lex("    world")
+        self.assertEqual(l.get_latest_token().content, "hello\nworld")
+        self.assertEqual(len(l.get_tokens()), 1)
+
+    def test_iter_tokens(self):
+        lines = [
+            "# title\n",
+            "\n",
+            "some text\n",
+            "over two lines  \n",
+            "```\n",
+            "code\n",
+            "\n",
+            "```\n",
+            "underlined\n",
+            "==========\n",
+            "  - item\n",
+            "> quote\n",
+            "    indented\n",
+        ]
+
+        l = lexer.Lexer()
+        for line in lines:
+            l.lex(line)
+        want = l.get_tokens()
+
+        streaming = lexer.Lexer()
+        got = []
+        for token in streaming.iter_tokens(lines):
+            self.assertLessEqual(len(streaming.tokens), 1)
+            got.append(token)
+
+        self.assertEqual([t.tag for t in got], [t.tag for t in want])
+        self.assertEqual([t.content for t in got], [t.content for t in want])
+        self.assertEqual(streaming.tokens, [])
+
+    def test_reset(self):
+        first = ["# one", "", "text", "```", "open fence"]
+        second = ["# two", "para", "===", "> quote"]
+        for tokens in [None, TokenStore()]:
+            l = lexer.Lexer(tokens, outline=True)
+            store = l.tokens
+            for line in first:
+                l.lex(line)
+            l.get_outline()
+            l.reset()
+            self.assertIs(l.tokens, store)
+            self.assertEqual(len(l.tokens), 0)
+            for line in second:
+                l.lex(line)
+
+            fresh = lexer.Lexer(outline=True)
+            for line in second:
+                fresh.lex(line)
+            self.assertEqual([str(t) for t in l.get_tokens()], [str(t) for t in fresh.get_tokens()])
+            self.assertEqual([str(h) for h in l.get_outline()], [str(h) for h in fresh.get_outline()])
+
+    def test_first_char_dispatch(self):
+        # lex() must produce what trying every classifier in order does.
+        vocabulary = [
+            "", "text", "a", "aaa", "aa a", "a  ", "```", "``", "``x", "```js", "    code", "    - li",
+            "  - li", "\t- li", "# h", "#a", "#", "##", "## ", "####### h", "===", "= =", "---", "- - -", "-x",
+            "- li", "* li", "*a*", "***", "1. li", "12.li", "1.2 x", ". x", "1", "> q", ">", "  > q",
+            "_ _ _", "__a__", "br  ", " ", " \t", " > q", " x", "über", "x\n", "x\n\n",
+            "[link](url)", "!img", "\x1c- li", "    1. li", "  12. li", "  1.x", "  .  x", "   ", "  _ _ _",
+            "  * * *", "  ---", "  -x", "     > q", "   > q", "\t> q", " \t- li", "  # h", "  text",
+        ]
+        rng = random.Random(0)
+        for _ in range(2000):
+            lines = [rng.choice(vocabulary) for _ in range(rng.randint(1, 12))]
+            want = lexer.Lexer()
+            got = lexer.Lexer()
+            for line in lines:
+                want.lex_ordered(line)
+                got.lex(line)
+            self.assertEqual([str(t) for t in got.get_tokens()], [str(t) for t in want.get_tokens()], lines)
+
+    def test_lex_file(self):
+        documents = [
+            "",
+            "hello\n",
+            "hello\nworld",
+            "hello\nworld\n\n# heading\n",
+            "hello  \nworld\n",
+            "hello\r\nworld\r\n\r\n```\r\ncode\r\n\r\nmore\r\n```\r\n",
+            "```\n\ncode\n```\n```\n",
+            "```python\n    print(1)\n```\nafter\n",
+            "    code\n```\nnot a fence\n",
+            "para\n1. item\ntext\n===\n",
+            "aaa\nbbbb\nb\nab\n",
+            "caf\u00e9 cr\u00e8me\n\u00e9t\u00e9\n",
+            "plain\n2nd line\nthird\n",
+            "> quote\ncontinued\n- item\n    indented\n",
+            "hello\rworld\n# h\rx\n",
+            "a\r\rb\r\n\r",
+        ]
+        vocabulary = [
+            "", "text", "more text", "a", "aaa", "```", "```js", "    code",
+            "# h", "===", "---", "- li", "1. li", "> q", "_ _ _", "br  ", "\u00fcber", "x\r", "a\rb",
+        ]
+        rng = random.Random(0)
+        for _ in range(200):
+            lines = [rng.choice(vocabulary) for _ in range(rng.randint(1, 12))]
+            documents.append("\n".join(lines))
+
+        for document in documents:
+            with tempfile.NamedTemporaryFile("wb", suffix=".md", delete=False) as f:
+                f.write(document.encode("utf-8"))
+            try:
+                want = lexer.Lexer()
+                with open(f.name, encoding="utf-8") as text:
+                    for line in text:
+                        want.lex(line)
+                got = lexer.Lexer()
+                got.lex_file(f.name)
+            finally:
+                os.unlink(f.name)
+
+            self.assertEqual([str(t) for t in got.get_tokens()], [str(t) for t in want.get_tokens()], document)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import time
+import unittest
+
+sys.path.insert(0, "..")
+from alys import Limits, Renderer, SpanCache, Stats, render
+from alys.limits import untrusted
+
+
+class TestLimits(unittest.TestCase):
+    def test_invalid(self):
+        for kwargs in [{"max_line_length": 0}, {"max_depth": -1}, {"time_budget": 0.0}]:
+            with self.assertRaises(ValueError):
+                Limits(**kwargs)
+
+    def test_degrade(self):
+        test_cases = [
+            (Limits(max_line_length=5), ["a <b> *c*"], "<p>a &lt;b&gt; *c*</p>"),
+            (Limits(max_line_length=9), ["a <b> *c*"], "<p>a &lt;b&gt; <i>c</i></p>"),
+            (Limits(max_line_length=5), ["*a*", "*b*"], "<p><i>a</i>\n<i>b</i></p>"),
+            (Limits(max_span_passes=1), ["**a**"], "<p>**a**</p>"),
+            (Limits(max_span_passes=2), ["**a**"], "<p><b>a</b></p>"),
+            (
+                Limits(max_depth=2),
+                [">>>> x", "> y"],
+                "<blockquote>\n<blockquote>\n<p>&gt;&gt; x</p>\n</blockquote>\n<p>y</p>\n</blockquote>",
+            ),
+            (Limits(max_depth=2), ["- a", "      - b"], "<ul>\n<li>a\n<ul>\n<li>b</li>\n</ul>\n</li>\n</ul>"),
+            (Limits(time_budget=1e-9), ["# *a*", "", "*b*"], "<h1>*a*</h1>\n<p>*b*</p>"),
+            (Limits(max_output_bytes=8), ["a", "", "b"], "<p>a</p>"),
+            (untrusted, ["#"], "<p>#</p>"),
+            (untrusted, ["##", "", "# x"], "<p>##</p>\n<h1>x</h1>"),
+        ]
+
+        for limits, lines, want in test_cases:
+            self.assertEqual(render(lines, limits=limits), want, limits.__dict__)
+            # The stack engine makes a single pass.
+            if limits.max_span_passes is None:
+                self.assertEqual(render(lines, limits=limits, engine="stack", stats=Stats()), want, limits.__dict__)
+
+    def test_max_output_bytes(self):
+        # Escaping makes "&" five and "<" four bytes of html, the limit is
+        # on the escaped size.
+        limits = Limits(max_output_bytes=1_000)
+        renderer = Renderer(limits=limits)
+        for lines in [["&" * 100_000], ["<" * 100_000], ["> " + "<&" * 50_000] * 3, ["- a", "  - " + "&" * 5_000]]:
+            for html in [render(lines, limits=limits), renderer.render(lines)]:
+                self.assertLessEqual(len(html.encode("utf-8")), 1_000, lines[0][:10])
+                self.assertEqual(html.count("<li>"), html.count("</li>"))
+                self.assertEqual(html.count("<blockquote>"), html.count("</blockquote>"))
+        html = render(["&" * 4_000_000], limits=untrusted)
+        self.assertLessEqual(len(html.encode("utf-8")), untrusted.max_output_bytes)
+        self.assertTrue(html.endswith("&amp;</p>"))
+
+    def test_stats(self):
+        stats = Stats()
+        render(["x" * 10 + " *a*", "", ">>> q", "", "**b**"], stats=stats, limits=Limits(10, 2, 1))
+        self.assertEqual(stats.as_dict()["limits"], {"max_line_length": 1, "max_depth": 1, "max_span_passes": 1})
+
+    def test_cache(self):
+        cache = SpanCache()
+        self.assertEqual(render(["*a*"], cache=cache, limits=Limits(max_line_length=1)), "<p>*a*</p>")
+        self.assertEqual(render(["*a*"], cache=cache), "<p><i>a</i></p>")
+        self.assertEqual(render(["*a*"], cache=cache, limits=Limits(max_line_length=1)), "<p>*a*</p>")
+
+        cache = SpanCache()
+        render(["*a*", "", "*b*"], cache=cache, limits=Limits(time_budget=1e-9))
+        self.assertEqual(len(cache), 0)
+
+    def test_time_budget(self):
+        # The budget is checked between the lines of one paragraph.
+        lines = ["[a" * 999] * 400
+        start = time.perf_counter()
+        html = render(lines, limits=Limits(time_budget=0.05))
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(html, "<p>" + "\n".join(lines) + "</p>")
+
+        # Line by line renders what the whole token does.
+        lines = ["*a* **b", "c** `d`", "[e](f) ~~g~~", "h i"]
+        self.assertEqual(render(lines, limits=Limits(time_budget=60.0)), render(lines))
+        html = render(lines, limits=Limits(time_budget=60.0, max_span_passes=1))
+        self.assertEqual(html, "<p>" + "\n".join(lines) + "</p>")
+
+    def test_linear(self):
+        # Unclosed "[" make the link pattern scan to the end of the line
+        # from each of them.
+        def render_time(lines):
+            start = time.perf_counter()
+            html = render(["[a" * 2_500] * lines, limits=untrusted)
+            elapsed = time.perf_counter() - start
+            self.assertEqual(html, "<p>" + "\n".join(["[a" * 2_500] * lines) + "</p>")
+            return elapsed
+
+        small = render_time(100)
+        large = render_time(1_000)
+        self.assertLess(large / small, 30)
+
+        html = render([">" * 100_000 + " x"], limits=untrusted)
+        self.assertEqual(html.count("<blockquote>"), untrusted.max_depth)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+
+sys.path.insert(0, "..")
+from alys import render, render_section
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.outline import slugify
+from alys.span_transformer import SpanTransformer
+from alys.token_store import TokenStore
+
+document = [
+    "# Getting *started*",
+    "",
+    "intro",
+    "",
+    "## Install",
+    "",
+    "    pip install alys",
+    "",
+    "Usage",
+    "notes",
+    "-----",
+    "",
+    "- item",
+    "",
+    "## Install",
+    "",
+    "again",
+    "",
+    "# API",
+    "### `render`",
+    "text",
+]
+
+# (level, text, slug, token range, line range)
+want = [
+    (1, "Getting *started*", "getting-started", (0, 16), (0, 18)),
+    (2, "Install", "install", (4, 8), (4, 8)),
+    (2, "Usage\nnotes", "usage-notes", (8, 12), (8, 14)),
+    (2, "Install", "install-1", (12, 16), (14, 18)),
+    (1, "API", "api", (16, 19), (18, 21)),
+    (3, "`render`", "render", (17, 19), (19, 21)),
+]
+
+
+def outline(lexer: Lexer) -> list[tuple]:
+    return [
+        (h.level, h.text, h.slug, (h.token_start, h.token_end), (h.line_start, h.line_end))
+        for h in lexer.get_outline()
+    ]
+
+
+class TestOutline(unittest.TestCase):
+    def test_outline(self):
+        lexer = Lexer(outline=True)
+        for line in document:
+            lexer.lex(line)
+        self.assertEqual(outline(lexer), want)
+
+        store = Lexer(TokenStore(), outline=True)
+        for line in document:
+            store.lex(line)
+        self.assertEqual(outline(store), want)
+
+        streaming = Lexer(outline=True)
+        for _ in streaming.iter_tokens(document):
+            pass
+        self.assertEqual(outline(streaming), want)
+
+    def test_open_sections(self):
+        lexer = Lexer(outline=True)
+        for line in document[:5]:
+            lexer.lex(line)
+        self.assertEqual(outline(lexer), [
+            (1, "Getting *started*", "getting-started", (0, 5), (0, 5)),
+            (2, "Install", "install", (4, 5), (4, 5)),
+        ])
+
+    def test_lex_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "doc.md")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write("\r\n".join(document) + "\r\n")
+            lexer = Lexer(outline=True)
+            lexer.lex_file(path)
+            self.assertEqual(outline(lexer), want)
+            with open(path, "rb") as f:
+                data = f.read()
+        lexer = Lexer(outline=True)
+        lexer.lex_bytes(data)
+        self.assertEqual(outline(lexer), want)
+
+    def test_blockquote_line_count(self):
+        lexer = Lexer(outline=True)
+        for line in ["> > quote", "> # quoted heading", "# heading"]:
+            lexer.lex(line)
+        self.assertEqual([(h.slug, h.line_start) for h in lexer.get_outline()], [
+            ("quoted-heading", 1), ("heading", 2),
+        ])
+
+    def test_render_section(self):
+        lexer = Lexer(outline=True)
+        for line in document:
+            lexer.lex(line)
+        for _, _, slug, _, (start, end) in want:
+            want_html = render(document[start:end])
+            self.assertEqual(render_section(lexer, slug), want_html, slug)
+            self.assertEqual(render_section(lexer, slug), want_html, slug)
+
+        # Rendering the whole document leaves the tokens to render again.
+        BlockTransformer(lexer, spans=SpanTransformer(lexer)).transform()
+        for _, _, slug, _, (start, end) in want:
+            self.assertEqual(render_section(lexer, slug), render(document[start:end]), slug)
+
+        with self.assertRaises(KeyError):
+            render_section(lexer, "missing")
+
+        streaming = Lexer(outline=True)
+        for _ in streaming.iter_tokens(document):
+            pass
+        with self.assertRaises(ValueError):
+            render_section(streaming, "api")
+
+    def test_opt_in(self):
+        lexer = Lexer()
+        for line in document:
+            lexer.lex(line)
+        with self.assertRaises(ValueError):
+            lexer.get_outline()
+        with self.assertRaises(ValueError):
+            render_section(lexer, "api")
+
+    def test_streaming_memory(self):
+        # Without an outline nothing is kept per heading while streaming.
+        def retained(count):
+            lexer = Lexer()
+            tracemalloc.start()
+            for _ in lexer.iter_tokens(f"# heading {i}" for i in range(count)):
+                pass
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return current
+
+        self.assertLess(retained(10_000), retained(100) + 10_000)
+
+    def test_slugify(self):
+        test_cases = [
+            ("Hello World", "hello-world"),
+            ("  *Bold*   and `code` ", "bold-and-code"),
+            ("C++ & Python!", "c-python"),
+            ("snake_case-name", "snake_case-name"),
+            ("Über", "über"),
+        ]
+
+        for text, slug in test_cases:
+            self.assertEqual(slugify(text), slug)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, "..")
+from alys.lexer import Lexer
+from alys.parallel_lexer import find_split_points, lex_parallel
+
+vocabulary = [
+    "", "", "", "text", "more *text*", "```", "```js", "code", "    indented", "# heading", "===",
+    "---", "- item", "  - nested", "1. item", "> quote", ">> deep", "_ _ _", "br  ", "café",
+]
+
+
+def lex_sequential(path: str) -> list[str]:
+    lexer = Lexer()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            lexer.lex(line)
+    return [str(token) for token in lexer.get_tokens()]
+
+
+class TestParallelLexer(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".md")
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def write(self, document: str) -> None:
+        with open(self.path, "wb") as f:
+            f.write(document.encode("utf-8"))
+
+    def test_find_split_points(self):
+        test_cases = [
+            (b"a\n\nb\n\nc\n", 1, [3, 6]),
+            (b"a\n\nb\n\nc\n", 4, [6]),
+            (b"a\r\n\r\nb\n", 1, [5]),
+            (b"```\n\n```\n\nb\n", 1, [10]),
+            (b"```js\n\n```js\n\n```\n\nb\n", 1, [19]),
+            (b"a\n\n", 1, []),
+            (b"a\rb\r\rc", 1, []),
+        ]
+        for data, chunk_bytes, want in test_cases:
+            self.assertEqual(find_split_points(data, len(data), chunk_bytes), want, data)
+
+    def test_lex_parallel(self):
+        documents = [
+            "",
+            "a\n\nb\n",
+            "```\n\ncode\n\n```\n\nafter\n",
+            "    code\n```\n\nnot a fence\n```\n\nfence\n\n```\n\nend\n",
+            "a\r\n\r\n```\r\n\r\nb\r\n```\r\n",
+        ]
+        rng = random.Random(0)
+        for _ in range(200):
+            lines = [rng.choice(vocabulary) for _ in range(rng.randint(1, 30))]
+            documents.append("\n".join(lines) + rng.choice(["", "\n"]))
+
+        for document in documents:
+            self.write(document)
+            want = lex_sequential(self.path)
+            for chunk_bytes in [1, 7, 64]:
+                got = [str(token) for token in lex_parallel(self.path, jobs=1, chunk_bytes=chunk_bytes)]
+                self.assertEqual(got, want, (document, chunk_bytes))
+
+    def test_process_pool(self):
+        rng = random.Random(1)
+        self.write("\n".join(rng.choice(vocabulary) for _ in range(2000)))
+        got = [str(token) for token in lex_parallel(self.path, jobs=2, chunk_bytes=1024)]
+        self.assertEqual(got, lex_sequential(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
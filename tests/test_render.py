@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+import alys
+import alys.pipeline
+from alys import Limits, Renderer, SpanCache, Stats, render
+
+document = [
+    "# *title*",
+    "",
+    "some **text**",
+    "",
+    "- item",
+    "  - nested",
+    "",
+    "> quote",
+    "",
+    "```",
+    "a < b",
+    "```",
+]
+
+
+class TestRender(unittest.TestCase):
+    def test_limit_blocks(self):
+        title = "<h1><i>title</i></h1>\n<p>some <b>text</b></p>\n"
+        test_cases = [
+            (1, "<h1><i>title</i></h1>"),
+            (2, "<h1><i>title</i></h1>\n<p>some <b>text</b></p>"),
+            (3, title + "<ul>\n<li>item</li>\n</ul>"),
+            (4, title + "<ul>\n<li>item\n<ul>\n<li>nested</li>\n</ul>\n</li>\n</ul>"),
+            (5, title + "<ul>\n<li>item\n<ul>\n<li>nested</li>\n</ul>\n</li>\n</ul>\n"
+                "<blockquote>\n<p>quote</p>\n</blockquote>"),
+            (100, render(document)),
+        ]
+
+        for limit, want in test_cases:
+            self.assertEqual(render(document, limit_blocks=limit), want, limit)
+            self.assertEqual(render(document, limit_blocks=limit, stats=Stats()), want, limit)
+
+    def test_limit_bytes(self):
+        full = render(document)
+        for limit in [1, 10, 50, 100, 1000]:
+            got = render(document, limit_bytes=limit)
+            self.assertLessEqual(len(got.encode("utf-8")), limit)
+            self.assertEqual(got.count("<ul>"), got.count("</ul>"))
+            self.assertEqual(got.count("<li>"), got.count("</li>"))
+        self.assertEqual(render(document, limit_bytes=1), "")
+        self.assertEqual(render(document, limit_bytes=10), "<h1></h1>")
+        self.assertEqual(render(document, limit_bytes=50), "<h1><i>title</i></h1>\n<p>some <b>text</b></p>")
+        self.assertEqual(render(document, limit_bytes=len(full)), full)
+
+        # Escaping makes the html of a line up to five times as long, it is
+        # cut between entities.
+        for lines in [["&" * 10_000], ["caf\u00e9 <" * 2_000], ["- " + "a < b " * 2_000]]:
+            html = render(lines, limit_bytes=300)
+            self.assertLessEqual(len(html.encode("utf-8")), 300, lines[0][:10])
+            self.assertGreater(len(html.encode("utf-8")), 280, lines[0][:10])
+            self.assertTrue(html.startswith("<") and html.endswith(">"), html[-10:])
+        self.assertEqual(render(["&" * 10_000], limit_bytes=21), "<p>&amp;&amp;</p>")
+
+    def test_stops_reading(self):
+        read = []
+
+        def lines():
+            for i in range(100_000):
+                read.append(i)
+                yield f"paragraph {i}"
+                yield ""
+
+        excerpt = render(lines(), limit_bytes=30)
+        self.assertEqual(excerpt, "<p>paragraph 0</p>\n<p>para</p>")
+        self.assertLess(len(read), 5)
+
+    def test_stops_reading_block(self):
+        # One paragraph far over the limit is cut, not read to its end.
+        read = []
+
+        def lines():
+            for i in range(20_000):
+                read.append(i)
+                yield "word " * 20
+
+        excerpt = render(lines(), limit_bytes=300)
+        self.assertLessEqual(len(excerpt), 300)
+        self.assertTrue(render(["word " * 20] * 3).startswith(excerpt[:-len("</p>")]))
+        self.assertEqual(len(read), 3)
+        self.assertEqual(Renderer().render(["word " * 20] * 20_000, limit_bytes=300), excerpt)
+
+        fence = ["```"] + ["a < b"] * 1000 + ["```"]
+        self.assertLess(len(render(fence, limit_bytes=100)), 200)
+
+    def test_exports(self):
+        # Importing the module does not replace the function it exports.
+        self.assertIs(alys.render, alys.pipeline.render)
+        self.assertIs(alys.render_to, alys.pipeline.render_to)
+
+    def test_invalid_limits(self):
+        for kwargs in [{"limit_blocks": 0}, {"limit_bytes": -1}]:
+            with self.assertRaises(ValueError):
+                render(document, **kwargs)
+
+
+class TestRenderer(unittest.TestCase):
+    def test_render(self):
+        documents = [document, ["> > deep", "- open", "  - list"], ["```", "open fence"], [], ["# *again*"]]
+        for engine in ["regex", "stack"]:
+            renderer = Renderer(engine=engine, cache=SpanCache())
+            for _ in range(2):
+                for lines in documents:
+                    self.assertEqual(renderer.render(lines), render(lines, engine=engine))
+        with self.assertRaises(ValueError):
+            Renderer(engine="missing")
+
+    def test_limits(self):
+        renderer = Renderer(limits=Limits(max_depth=1, time_budget=1e-9, max_output_bytes=42))
+        for _ in range(2):
+            html = renderer.render(["> > *a*", "", "b", "", "c"])
+            self.assertEqual(html, "<blockquote>\n<p>&gt; *a*</p>\n</blockquote>")
+            self.assertEqual(renderer.render(document, limit_blocks=1), "<h1>*title*</h1>")
+
+    def test_threads(self):
+        renderer = Renderer(cache=SpanCache())
+        documents = [[f"# doc {i}", "", f"- *item* {i}", "  - nested", "", "> quote"] for i in range(200)]
+        want = [render(lines) for lines in documents]
+        with ThreadPoolExecutor(8) as executor:
+            got = list(executor.map(renderer.render, documents * 5))
+        self.assertEqual(got, want * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
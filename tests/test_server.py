@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, "..")
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from alys import render
+from alys.__main__ import parse_args
+from alys.client import Client, main, pack_length, recv_exact, render_remote
+from alys.limits import untrusted
+from alys.server import RenderServer
+
+documents = [
+    "# title\n\nsome *text*\n",
+    "- item\n  - nested\n\n> quote\n",
+    "```\na < b\n```\r\ncrlf\r\n",
+    "",
+    "ünïcødé **bold**\n" * 1000,
+]
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "unix sockets are not available")
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "alys.sock")
+        self.server = RenderServer(self.path, max_request_bytes=1024 * 1024)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.directory.cleanup()
+
+    def test_render(self):
+        with Client(self.path) as client:
+            for markdown in documents:
+                want = render(io.StringIO(markdown, newline=None))
+                self.assertEqual(client.render(markdown), want)
+                self.assertEqual(client.render(markdown.encode("utf-8")), want)
+        self.assertEqual(render_remote(documents[0], self.path), render(io.StringIO(documents[0])))
+
+    def test_concurrent_clients(self):
+        results = {}
+
+        def run(i):
+            with Client(self.path) as client:
+                results[i] = [client.render(f"# client {i}\n\nrequest {j}") for j in range(20)]
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(16):
+            self.assertEqual(results[i], [f"<h1>client {i}</h1>\n<p>request {j}</p>" for j in range(20)])
+
+    def test_errors(self):
+        with Client(self.path) as client:
+            with self.assertRaises(ValueError):
+                client.render(b"\xff invalid")
+            self.assertEqual(client.render("still open"), "<p>still open</p>")
+            with self.assertRaises(ValueError):
+                client.render("x" * (1024 * 1024 + 1))
+
+        # a request cut short closes only its own connection
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(self.path)
+            sock.sendall(pack_length(100) + b"short")
+            sock.shutdown(socket.SHUT_WR)
+            with self.assertRaises(ConnectionError):
+                recv_exact(sock, 1)
+        self.assertEqual(render_remote("ok", self.path), "<p>ok</p>")
+
+    def test_socket_file(self):
+        with self.assertRaises(FileExistsError):
+            RenderServer(self.path)
+
+        stale = os.path.join(self.directory.name, "stale.sock")
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.bind(stale)
+        server = RenderServer(stale)
+        server.server_close()
+        self.assertFalse(os.path.exists(stale))
+
+        regular = os.path.join(self.directory.name, "file")
+        open(regular, "w").close()
+        with self.assertRaises(FileExistsError):
+            RenderServer(regular)
+
+    def test_limits(self):
+        markdown = ">" * 40 + " deep\n"
+        with Client(self.path) as client:
+            self.assertEqual(client.render(markdown), render([markdown]))
+        path = os.path.join(self.directory.name, "untrusted.sock")
+        with RenderServer(path, limits=untrusted) as limited:
+            thread = threading.Thread(target=limited.serve_forever, args=(0.01,))
+            thread.start()
+            try:
+                self.assertEqual(render_remote(markdown, path).count("<blockquote>"), untrusted.max_depth)
+            finally:
+                limited.shutdown()
+                thread.join()
+
+        self.assertFalse(parse_args(["serve", "--socket", path]).untrusted)
+        self.assertTrue(parse_args(["serve", "--socket", path, "--untrusted"]).untrusted)
+
+    def test_main(self):
+        source = os.path.join(self.directory.name, "doc.md")
+        output = os.path.join(self.directory.name, "doc.html")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(documents[1])
+        self.assertEqual(main(["--socket", self.path, source, "-o", output]), 0)
+        with open(output, encoding="utf-8") as f:
+            self.assertEqual(f.read(), render(io.StringIO(documents[1])))
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            missing = os.path.join(self.directory.name, "missing.sock")
+            self.assertEqual(main(["--socket", missing, source]), 1)
+        self.assertIn(source, stderr.getvalue())
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            for argv in [[source], ["--socket"], ["--socket", self.path, "-x"], ["--socket", self.path, "a", "b"]]:
+                self.assertEqual(main(argv), 2, argv)
+        self.assertTrue(stderr.getvalue().startswith("usage:"))
+
+    def test_client_imports(self):
+        # The client process imports nothing slow to import.
+        code = "import sys, alys.client; print(sorted({'argparse', 'struct', 'alys.lexer'} & set(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
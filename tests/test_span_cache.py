@@ -0,0 +1,69 @@
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+from alys import SpanCache, render
+from alys.lexer import Lexer
+from alys.span_cache import entry_size
+from alys.span_transformer import SpanTransformer, engines
+from alys.token import Tag, Token
+
+
+class TestSpanCache(unittest.TestCase):
+    def test_lru(self):
+        cache = SpanCache(max_entries=2, max_bytes=None)
+        cache.put(("a",), "A")
+        cache.put(("b",), "B")
+        self.assertEqual(cache.get(("a",)), "A")
+        cache.put(("c",), "C")
+
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(cache.get(("c",)), "C")
+        self.assertEqual(cache.as_dict(), {
+            "entries": 2,
+            "bytes": entry_size(("a",), "A") + entry_size(("c",), "C"),
+            "hits": 2,
+            "misses": 1,
+            "hit_rate": 2 / 3,
+            "evictions": 1,
+        })
+
+    def test_max_bytes(self):
+        size = entry_size(("a",), "A")
+        cache = SpanCache(max_entries=None, max_bytes=2 * size)
+        for key in ["a", "b", "c"]:
+            cache.put((key,), key.upper())
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.bytes, 2 * size)
+
+        cache.put(("long",), "x" * 1000)
+        self.assertIsNone(cache.get(("long",)))
+        self.assertEqual(len(cache), 2)
+
+    def test_limits(self):
+        for kwargs in [{"max_entries": 0}, {"max_bytes": -1}]:
+            with self.assertRaises(ValueError):
+                SpanCache(**kwargs)
+
+    def test_shared(self):
+        cache = SpanCache()
+        content = 'a *b* [c](d"e) < f'
+        for engine in engines:
+            for escape in [True, False]:
+                want = SpanTransformer(Lexer(), escape=escape, engine=engine).render_spans(content)
+                for _ in range(2):
+                    token = Token(Tag.P, content)
+                    SpanTransformer(Lexer(), escape=escape, engine=engine, cache=cache).transform_spans(token)
+                    self.assertEqual(token.content, want, (engine, escape))
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+    def test_render(self):
+        lines = ["- *item*", "- *item*", "", "# `code`", "", "- *item*"]
+        cache = SpanCache()
+        self.assertEqual(render(lines, cache=cache), render(lines))
+        self.assertEqual(render(lines, cache=cache), render(lines))
+        self.assertEqual((cache.hits, cache.misses), (6, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ from alys import lexer
 from alys.token import Token, Tag
 
 sys.path.insert(0, "..")
-from alys.span_transformer import SpanTransformer
+from alys.span_transformer import SpanTransformer, engines
 
 
 class TestSpanTransformer(unittest.TestCase):
@@ -57,12 +57,75 @@ class TestSpanTransformer(unittest.TestCase):
             ("no_formatting", lexer.Token(lexer.Tag.P, "no_formatting")),
         ]
 
-        for test_case in test_cases:
-            l = lexer.Lexer()
-            text = test_case[0]
-            want = test_case[1]
-            l.lex(text)
-            s = SpanTransformer(l) 
-            s.transform_spans(l.get_latest_token())
-            got = l.get_latest_token()
-            self.assertEqual(got.content, want.content)
+        for engine in engines:
+            for test_case in test_cases:
+                l = lexer.Lexer()
+                text = test_case[0]
+                want = test_case[1]
+                l.lex(text)
+                s = SpanTransformer(l, engine=engine)
+                s.transform_spans(l.get_latest_token())
+                got = l.get_latest_token()
+                self.assertEqual(got.content, want.content)
+
+    def test_engines_agree(self):
+        # Nested "*" and "**" that both engines render alike.
+        lines = [
+            "**a*b*c**",
+            "*a**b**c*",
+            "**foo*bar*baz**",
+            "*foo**bar**baz*",
+            "***a* b**",
+            "*a **b***",
+            "**a** and *b*",
+            "*a*b*",
+            "*a**",
+            "__a _b_ c__",
+        ]
+        regex = SpanTransformer(lexer.Lexer(), engine="regex")
+        stack = SpanTransformer(lexer.Lexer(), engine="stack")
+        for line in lines:
+            self.assertEqual(stack.span_html(line), regex.span_html(line), line)
+
+    def test_iter_spans(self):
+        lines = ["*italic*", "", "    *code*"]
+        l = lexer.Lexer()
+        s = SpanTransformer(l)
+        got = [t.content for t in s.iter_spans(l.iter_tokens(lines))]
+        self.assertEqual(got, ["<i>italic</i>", "", "*code*"])
+
+    def test_escape(self):
+        test_cases = [
+            ("a < b", "a &lt; b"),
+            ("*a & b*", "<i>a &amp; b</i>"),
+            ('`"<br>"`', '<code>"&lt;br&gt;"</code>'),
+            ('![say "hi"](a.png)', '<img src="a.png" alt="say &quot;hi&quot;"/>'),
+            ('[x](a?b=1&c="2")', '<a href="a?b=1&amp;c=&quot;2&quot;">x</a>'),
+        ]
+
+        for engine in engines:
+            for test_case in test_cases:
+                l = lexer.Lexer()
+                l.lex(test_case[0])
+                s = SpanTransformer(l, engine=engine)
+                s.transform_spans(l.get_latest_token())
+                self.assertEqual(l.get_latest_token().content, test_case[1])
+
+        l = lexer.Lexer()
+        l.lex("*a < b*")
+        s = SpanTransformer(l, escape=False)
+        s.transform_spans(l.get_latest_token())
+        self.assertEqual(l.get_latest_token().content, "<i>a < b</i>")
+
+    def test_transform_twice(self):
+        for engine in ["regex", "stack"]:
+            token = Token(Tag.P, "*a < b*")
+            s = SpanTransformer(lexer.Lexer(), engine=engine)
+            for _ in range(2):
+                s.transform_spans(token)
+                self.assertEqual(token.content, "<i>a &lt; b</i>")
+            self.assertEqual(s.span_html("*a < b*"), "<i>a &lt; b</i>")
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            SpanTransformer(lexer.Lexer(), engine="peg")
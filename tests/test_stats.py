@@ -0,0 +1,54 @@
+import json
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+from alys import Stats, render
+from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer
+from alys.token import Tag, Token
+
+document = ["# title", "", "text with *span*", "more", "", "- item", "```", "code", "```"]
+
+
+class TestStats(unittest.TestCase):
+    def test_same_output(self):
+        self.assertEqual(render(document, stats=Stats()), render(document))
+
+    def test_classifiers(self):
+        stats = Stats()
+        lexer = Lexer(stats=stats)
+        for line in ["", "> quote", "text"]:
+            lexer.lex(line)
+        counts = stats.as_dict()["classifiers"]
+
+        # The blockquote content is lexed again as its own line.
+        self.assertEqual(counts["is_code_block"]["calls"], 4)
+        self.assertEqual(counts["is_empty"], {"calls": 4, "hits": 1, "hit_rate": 0.25})
+        self.assertEqual(counts["is_blockquote"]["hits"], 1)
+        self.assertEqual(counts["is_hr"]["calls"], 2)
+
+    def test_span_passes(self):
+        stats = Stats()
+        spans = SpanTransformer(Lexer(), stats=stats)
+        for content in ["plain", "*a*", "**a**"]:
+            spans.transform_spans(Token(Tag.P, content))
+        self.assertEqual(stats.as_dict()["spans"], {
+            "tokens": 3, "passes": 4, "max_passes": 2, "histogram": {"0": 1, "2": 2},
+        })
+
+    def test_render(self):
+        stats = Stats()
+        render(document, stats=stats)
+        result = json.loads(stats.to_json())
+
+        self.assertEqual(result["tags"], {"H1": 1, "EMPTY": 2, "P": 1, "LI": 1, "BACKTICKCODE": 1})
+        self.assertEqual(set(result["stages"]), {"lex", "spans", "blocks", "end_to_end"})
+        self.assertLessEqual(
+            result["stages"]["lex"] + result["stages"]["spans"] + result["stages"]["blocks"],
+            result["stages"]["end_to_end"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
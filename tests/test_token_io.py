@@ -0,0 +1,88 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, "..")
+from alys import dump_tokens, load_tokens
+from alys import token_io
+from alys.lexer import Lexer
+from alys.token import Tag, Token
+from alys.token_io import dumps_tokens, iter_load_tokens, loads_tokens
+from alys.token_store import TokenStore
+
+lines = [
+    "# *title*",
+    "",
+    "some **text**  ",
+    "über two lines",
+    "",
+    "- item",
+    "  1. nested `item`",
+    "      - deep",
+    ">>> quote",
+    "",
+    "```",
+    "a < b\n" * 100,
+    "```",
+    "_ _ _",
+    "lone \ud800 surrogate",
+]
+
+
+def lexed(tokens: list[Token] | TokenStore | None = None) -> list[Token] | TokenStore:
+    lexer = Lexer(tokens)
+    for line in lines:
+        lexer.lex(line)
+    return lexer.get_tokens()
+
+
+class TestTokenIO(unittest.TestCase):
+    def test_round_trip(self):
+        want = [str(token) for token in lexed()]
+        for tokens in [lexed(), lexed(TokenStore()), []]:
+            for block_tokens in [4096, 3, 1]:
+                with mock.patch.object(token_io, "block_tokens", block_tokens):
+                    data = dumps_tokens(tokens)
+                got = loads_tokens(data)
+                self.assertEqual([str(token) for token in got], want if len(tokens) else [], block_tokens)
+                self.assertTrue(all(type(token) is Token for token in got))
+
+    def test_file(self):
+        tokens = lexed()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tokens.bin")
+            with open(path, "wb") as f:
+                dump_tokens(iter(tokens), f)
+                f.write(b"trailing data")
+            with open(path, "rb") as f:
+                first = next(iter_load_tokens(f))
+                self.assertEqual(str(first), str(tokens[0]))
+            with open(path, "rb") as f:
+                self.assertEqual([str(token) for token in load_tokens(f)], [str(token) for token in tokens])
+                self.assertEqual(f.read(), b"trailing data")
+
+    def test_varints(self):
+        tokens = [Token(Tag.P, "x" * 300), Token(Tag.LI, "", depth=70_000, ordered=True), Token(Tag.EMPTY)]
+        got = loads_tokens(dumps_tokens(tokens))
+        self.assertEqual([str(token) for token in got], [str(token) for token in tokens])
+
+    def test_invalid(self):
+        data = dumps_tokens(lexed())
+        test_cases = [
+            b"",
+            b"PK\x03\x04\x00",
+            token_io.magic + bytes([token_io.format_version + 1]) + b"\x00",
+            data[:-1],
+            data[:len(data) // 2],
+        ]
+
+        for test_case in test_cases:
+            with self.assertRaises(ValueError):
+                load_tokens(io.BytesIO(test_case))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import unittest
+
+sys.path.insert(0, "..")
+from alys.block_transformer import BlockTransformer
+from alys.lexer import Lexer
+from alys.span_transformer import SpanTransformer
+from alys.token import Tag, Token
+from alys.token_store import TokenStore
+
+lines = [
+    "# *title*",
+    "",
+    "some **text**",
+    "over two lines",
+    "",
+    "  - item",
+    "    - nested `item`",
+    "> quote",
+    "",
+    "```",
+    "a < b",
+    "```",
+    "_ _ _",
+]
+
+
+def render(tokens: list[Token] | TokenStore) -> str:
+    l = Lexer(tokens)
+    for line in lines:
+        l.lex(line)
+    s = SpanTransformer(l)
+    b = BlockTransformer(l)
+    for token in s.iter_spans(l.get_tokens()):
+        b.transform_block(token)
+    return b.get_html()
+
+
+class TestTokenStore(unittest.TestCase):
+    def test_lex(self):
+        want = Lexer()
+        got = Lexer(TokenStore())
+        for line in lines:
+            want.lex(line)
+            got.lex(line)
+
+        self.assertIsInstance(got.get_tokens(), TokenStore)
+        self.assertEqual([t.tag for t in got.get_tokens()], [t.tag for t in want.get_tokens()])
+        self.assertEqual(
+            [t.content for t in got.get_tokens()], [t.content for t in want.get_tokens()]
+        )
+
+    def test_render(self):
+        self.assertEqual(render(TokenStore()), render([]))
+
+    def test_iter_tokens(self):
+        want = list(Lexer().iter_tokens(lines))
+        got = list(Lexer(TokenStore()).iter_tokens(lines))
+        self.assertEqual([str(t) for t in got], [str(t) for t in want])
+
+    def test_views(self):
+        store = TokenStore()
+        store.append(Token(Tag.EMPTY))
+        store.append(Token(Tag.P, "hello"))
+        store.append(Token(Tag.EMPTY))
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store[-2].tag, Tag.P)
+        self.assertEqual(store.contents[0], store.contents[2])
+
+        store[1].content = "world"
+        self.assertEqual(store[1].content, "world")
+        store[0] = Token(Tag.HR)
+        self.assertEqual(store[0].tag, Tag.HR)
+
+        copies = store[:2]
+        del store[:2]
+        self.assertEqual(len(store), 1)
+        self.assertEqual([str(t) for t in copies], [str(Token(Tag.HR)), str(Token(Tag.P, "world"))])
+
+        with self.assertRaises(IndexError):
+            store[1]
+
+    def test_strings_released(self):
+        store = TokenStore()
+        store.append(Token(Tag.P, "shared"))
+        store.append(Token(Tag.P, "shared"))
+        store.append(Token(Tag.P, "old"))
+        store[2].content = "new"
+        store[1] = Token(Tag.H1, "heading")
+        del store[0]
+        self.assertEqual(sorted(store.string_ids), ["", "heading", "new"])
+        self.assertEqual([t.content for t in store], ["heading", "new"])
+
+        # A streaming lex only holds the strings of the undrained tokens.
+        l = Lexer(TokenStore())
+        for token in l.iter_tokens(f"paragraph {i}\n" if i % 3 else "\n" for i in range(3000)):
+            self.assertLess(len(l.tokens.string_ids), 4)
+        self.assertEqual(len(l.tokens.string_ids), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, "..")
+from alys import vectorized
+from alys.lexer import Lexer
+from alys.vectorized import AMBIGUOUS, BLANK, BLOCKQUOTE, FENCE, LIST, SETEXT, TEXT
+
+vocabulary = [
+    "", "", "text", "more *text*", "a", "aaa", "aa a", "a  ", "==", "= =", "===  ", "```", "```js", "``",
+    "    code", "  - li", "# h", "#a", "- li", "- - -", "-  ", "* li", "1. li", "> q", "_ _ _", "br  ",
+    "café", "été", " x", "x\r", "\t", "\x1c- li",
+]
+
+
+def lex_file(document: bytes) -> list[str]:
+    with tempfile.NamedTemporaryFile("wb", suffix=".md", delete=False) as f:
+        f.write(document)
+    try:
+        lexer = Lexer()
+        lexer.lex_file(f.name)
+    finally:
+        os.unlink(f.name)
+    return [str(token) for token in lexer.get_tokens()]
+
+
+class TestVectorized(unittest.TestCase):
+    def test_split_lines(self):
+        test_cases = [
+            ("", []),
+            ("a", ["a"]),
+            ("a\n", ["a"]),
+            ("a\n\n", ["a", ""]),
+            ("a\r\nb\r", ["a", "b"]),
+        ]
+        for text, want in test_cases:
+            self.assertEqual(vectorized.split_lines(text), want, text)
+
+    def test_has_lone_cr(self):
+        test_cases = [
+            (b"", False),
+            (b"a\r\nb\r\n", False),
+            (b"a\rb", True),
+            (b"a\r\n\r", True),
+            (b"a\r\r\n", True),
+        ]
+        for data, want in test_cases:
+            self.assertEqual(vectorized.has_lone_cr(data), want, data)
+
+    @unittest.skipIf(vectorized.numpy is None, "numpy is not installed")
+    def test_classify_lines(self):
+        test_cases = [
+            ("", AMBIGUOUS),
+            ("text", TEXT),
+            ("a", SETEXT),
+            ("aaa  ", SETEXT),
+            ("aa a", AMBIGUOUS),
+            ("===", SETEXT),
+            ("= =", AMBIGUOUS),
+            ("---", SETEXT),
+            ("- li", LIST),
+            ("- - -", LIST),
+            ("-  ", SETEXT),
+            ("1. li", AMBIGUOUS),
+            ("# h", AMBIGUOUS),
+            ("###", AMBIGUOUS),
+            ("> q", BLOCKQUOTE),
+            ("```js", FENCE),
+            ("``", SETEXT),
+            ("    code", AMBIGUOUS),
+            ("été", AMBIGUOUS),
+        ]
+        lines = [line for line, _ in test_cases]
+        document = "\n".join(lines).encode("utf-8")
+        starts, ends, labels = vectorized.classify_lines(document)
+        self.assertEqual(labels[0], BLANK)
+        self.assertEqual(labels[1:], [label for _, label in test_cases[1:]])
+
+        text = document.decode("utf-8")
+        self.assertEqual([text[start:end] for start, end in zip(starts, ends)], lines)
+
+    def test_lex_bytes(self):
+        documents = [b"", b"a\n", b"a\r\n\r\n```\r\ncode\r\n```\r\n", b"hello\rworld\n# h\rx\n"]
+        rng = random.Random(0)
+        for _ in range(300):
+            lines = [rng.choice(vocabulary) for _ in range(rng.randint(1, 20))]
+            documents.append(("\n".join(lines) + rng.choice(["", "\n", "\r\n"])).encode("utf-8"))
+
+        for document in documents:
+            want = lex_file(document)
+            # Share 0 takes the array path whatever the document.
+            for numpy, share in [(vectorized.numpy, 0), (vectorized.numpy, vectorized.min_fenced_share), (None, 0)]:
+                with mock.patch.multiple(vectorized, numpy=numpy, min_fenced_share=share):
+                    lexer = Lexer()
+                    lexer.lex_bytes(document)
+                self.assertEqual([str(token) for token in lexer.get_tokens()], want, document)
+
+    def test_fenced_share(self):
+        test_cases = [
+            (b"", 0),
+            (b"text\n", 0),
+            (b"```\n", 0),
+            (b"```\ncode\n```\n", 1 / 3),
+            (b"```\r\ncode\r\n```\r\n", 1 / 3),
+            (b"a\n```js\ncode\n```js\n```\nb", 2 / 6),
+            (b"```\ncode\nmore", 2 / 3),
+            (b"```\na\n```\nb\n```\nc\n```\n", 2 / 7),
+        ]
+        for data, want in test_cases:
+            self.assertAlmostEqual(vectorized.fenced_share(data), want, msg=data)
+
+
+if __name__ == "__main__":
+    unittest.main()